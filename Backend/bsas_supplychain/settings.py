@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "supplychain.server_timing.ServerTimingMiddleware",
+    "supplychain.db_routers.PinToPrimaryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -62,21 +64,52 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "bsas_supplychain.wsgi.application"
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and health-checked
+# before reuse, so requests skip the TLS + SCRAM handshake. DB_POOL=True
+# uses an in-process psycopg 3 pool instead (needs psycopg[pool], see
+# requirements.txt). The backend reports connect time in Server-Timing.
+DB_POOL = os.environ.get("DB_POOL", "False").lower() == "true"
+
+_db_options = {
+    "sslmode": "require",
+    "channel_binding": "require",
+}
+if DB_POOL:
+    _db_options["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+        # Seconds a request waits for a free connection before failing
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+    }
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "supplychain.db_backends.postgresql",
         "NAME": os.environ.get("DB_NAME", "neondb"),
         "USER": os.environ.get("DB_USER", "neondb_owner"),
         "PASSWORD": os.environ.get("DB_PASSWORD", "npg_ts82zxHwmunf"),
         "HOST": os.environ.get("DB_HOST", "ep-soft-darkness-a16przuw-pooler.ap-southeast-1.aws.neon.tech"),
         "PORT": os.environ.get("DB_PORT", "5432"),
-        "OPTIONS": {
-            "sslmode": "require",
-            "channel_binding": "require",
-        },
+        # The pool manages connection lifetime itself
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": _db_options,
     }
 }
 
+# Read replica (see supplychain/db_routers.py): reads go there until the
+# request writes; without DB_REPLICA_HOST everything uses "default"
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "OPTIONS": dict(_db_options),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["supplychain.db_routers.PrimaryReplicaRouter"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -108,10 +141,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # simplejwt's JWTAuthentication, loading the user and stakeholder profile
+    # in one query through a short-lived per-process cache
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "supplychain.authentication.StakeholderJWTAuthentication",
     ],
+    # Keyset pagination on the primary key; only used when a request sends
+    # ?cursor= or ?page_size= unless PAGINATE_LISTS_BY_DEFAULT is set
+    "DEFAULT_PAGINATION_CLASS": "supplychain.pagination.KeysetCursorPagination",
+    "PAGE_SIZE": 50,
 }
+PAGINATE_LISTS_BY_DEFAULT = os.environ.get("PAGINATE_LISTS_BY_DEFAULT", "False").lower() == "true"
 
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
@@ -143,3 +183,155 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+
+# Seconds an authenticated user and profile are reused from the per-process
+# cache (see supplychain/authentication.py); saves invalidate it locally
+AUTH_USER_CACHE = {
+    "ENABLED": os.environ.get("AUTH_USER_CACHE_ENABLED", "True").lower() == "true",
+    "TTL": int(os.environ.get("AUTH_USER_CACHE_TTL", "30")),
+}
+
+# Blockchain Anchoring
+# Anchor critical events through the AnchorOutbox queue (drained by
+# `manage.py run_anchor_worker`) instead of inside the HTTP request.
+BLOCKCHAIN_ANCHOR_ASYNC = os.environ.get("BLOCKCHAIN_ANCHOR_ASYNC", "True").lower() == "true"
+
+# "single" anchors every event in its own transaction; "merkle" lets the
+# worker batch event hashes into one Merkle root per window (async only).
+BLOCKCHAIN_ANCHOR_MODE = os.environ.get("BLOCKCHAIN_ANCHOR_MODE", "single")
+
+# Anchor Merkle roots through HashAnchor.anchorRoot() instead of
+# anchorHash() with a synthetic batch id (requires the upgraded contract).
+BLOCKCHAIN_MERKLE_USE_ANCHOR_ROOT = os.environ.get("BLOCKCHAIN_MERKLE_USE_ANCHOR_ROOT", "False").lower() == "true"
+
+# RPC client (see supplychain/rpc_pool.py): POLYGON_AMOY_RPC_URL plus the
+# comma-separated POLYGON_AMOY_RPC_FALLBACK_URLS share one keep-alive session;
+# reads still unanswered after HEDGE_DELAY seconds go to a second endpoint
+BLOCKCHAIN_RPC = {
+    "POOL_SIZE": int(os.environ.get("BLOCKCHAIN_RPC_POOL_SIZE", "10")),
+    "CONNECT_TIMEOUT": float(os.environ.get("BLOCKCHAIN_RPC_CONNECT_TIMEOUT", "3")),
+    "TIMEOUT": float(os.environ.get("BLOCKCHAIN_RPC_TIMEOUT", "10")),
+    "METHOD_TIMEOUTS": {
+        "eth_getLogs": float(os.environ.get("BLOCKCHAIN_RPC_GET_LOGS_TIMEOUT", "30")),
+        "eth_sendRawTransaction": float(os.environ.get("BLOCKCHAIN_RPC_SEND_TIMEOUT", "20")),
+        "eth_estimateGas": 15,
+    },
+    "HEDGE_DELAY": float(os.environ.get("BLOCKCHAIN_RPC_HEDGE_DELAY", "0.5")),
+    "FAILURE_COOLDOWN": float(os.environ.get("BLOCKCHAIN_RPC_FAILURE_COOLDOWN", "30")),
+    "EWMA_ALPHA": 0.3,
+}
+
+# Local chain stand-in for offline and load testing (see supplychain/local_chain.py):
+# BLOCKCHAIN_BACKEND=eth-tester (in-process py-evm) or hardhat (local node,
+# spawned when not running) deploys HashAnchor locally instead of using Amoy
+LOCAL_CHAIN = {
+    "BACKEND": os.environ.get("BLOCKCHAIN_BACKEND", "amoy").lower(),
+    "ARTIFACT": os.environ.get(
+        "LOCAL_CHAIN_ARTIFACT",
+        str(BASE_DIR.parent / "blockchain" / "artifacts" / "contracts" / "HashAnchor.sol" / "HashAnchor.json"),
+    ),
+    "HARDHAT_URL": os.environ.get("LOCAL_CHAIN_HARDHAT_URL", "http://127.0.0.1:8545"),
+    "GRANT_ANCHORER_ROLE": os.environ.get("LOCAL_CHAIN_GRANT_ANCHORER_ROLE", "True").lower() == "true",
+    "BLOCK_TIME": float(os.environ.get("LOCAL_CHAIN_BLOCK_TIME", "0")),
+    "LATENCY": float(os.environ.get("LOCAL_CHAIN_LATENCY", "0")),
+    "LATENCY_JITTER": float(os.environ.get("LOCAL_CHAIN_LATENCY_JITTER", "0")),
+    "FAILURE_RATE": float(os.environ.get("LOCAL_CHAIN_FAILURE_RATE", "0")),
+    "SEED": int(os.environ["LOCAL_CHAIN_SEED"]) if os.environ.get("LOCAL_CHAIN_SEED") else None,
+    "ENDPOINTS": int(os.environ.get("LOCAL_CHAIN_ENDPOINTS", "1")),
+}
+
+# Public status endpoint and verify page read a per-process snapshot of the
+# node status (see supplychain/blockchain_status.py), refreshed in the
+# background; the circuit opens after FAILURE_THRESHOLD failed refreshes
+BLOCKCHAIN_STATUS = {
+    "REFRESH_INTERVAL": float(os.environ.get("BLOCKCHAIN_STATUS_REFRESH_INTERVAL", "30")),
+    "MAX_STALE": float(os.environ.get("BLOCKCHAIN_STATUS_MAX_STALE", "300")),
+    "FAILURE_THRESHOLD": int(os.environ.get("BLOCKCHAIN_STATUS_FAILURE_THRESHOLD", "3")),
+    "BREAKER_COOLDOWN": float(os.environ.get("BLOCKCHAIN_STATUS_BREAKER_COOLDOWN", "60")),
+}
+
+ANCHOR_WORKER = {
+    "CONCURRENCY": int(os.environ.get("ANCHOR_WORKER_CONCURRENCY", "1")),
+    "BATCH_SIZE": int(os.environ.get("ANCHOR_WORKER_BATCH_SIZE", "20")),
+    "POLL_INTERVAL": float(os.environ.get("ANCHOR_WORKER_POLL_INTERVAL", "2")),
+    "MAX_ATTEMPTS": int(os.environ.get("ANCHOR_WORKER_MAX_ATTEMPTS", "8")),
+    "RETRY_BASE_DELAY": float(os.environ.get("ANCHOR_WORKER_RETRY_BASE_DELAY", "5")),
+    "RETRY_MAX_DELAY": float(os.environ.get("ANCHOR_WORKER_RETRY_MAX_DELAY", "900")),
+    "LEASE_TIMEOUT": float(os.environ.get("ANCHOR_WORKER_LEASE_TIMEOUT", "300")),
+    "RECEIPT_POLL_INTERVAL": float(os.environ.get("ANCHOR_WORKER_RECEIPT_POLL_INTERVAL", "3")),
+    "STUCK_TIMEOUT": float(os.environ.get("ANCHOR_WORKER_STUCK_TIMEOUT", "120")),
+    "GAS_BUMP_PERCENT": int(os.environ.get("ANCHOR_WORKER_GAS_BUMP_PERCENT", "15")),
+    "MAX_REPLACEMENTS": int(os.environ.get("ANCHOR_WORKER_MAX_REPLACEMENTS", "5")),
+    "MERKLE_WINDOW_SECONDS": float(os.environ.get("ANCHOR_WORKER_MERKLE_WINDOW_SECONDS", "30")),
+    "MERKLE_MAX_LEAVES": int(os.environ.get("ANCHOR_WORKER_MERKLE_MAX_LEAVES", "256")),
+}
+
+# Local index of HashAnchored logs, maintained by `manage.py sync_anchor_index`
+ANCHOR_INDEX = {
+    "START_BLOCK": int(os.environ.get("HASH_ANCHOR_DEPLOY_BLOCK", "0")),
+    "CONFIRMATIONS": int(os.environ.get("ANCHOR_INDEX_CONFIRMATIONS", "12")),
+    "BLOCK_CHUNK": int(os.environ.get("ANCHOR_INDEX_BLOCK_CHUNK", "2000")),
+    "POLL_INTERVAL": float(os.environ.get("ANCHOR_INDEX_POLL_INTERVAL", "15")),
+}
+
+# File fields are served from /api/files/ under signed URLs valid for
+# 1-2x FILE_URL_MAX_AGE seconds. FILE_FIELDS_AS_DATA_URI restores the old
+# inline base64 data URIs in API responses.
+FILE_URL_MAX_AGE = int(os.environ.get("FILE_URL_MAX_AGE", str(6 * 60 * 60)))
+FILE_FIELDS_AS_DATA_URI = os.environ.get("FILE_FIELDS_AS_DATA_URI", "False").lower() == "true"
+
+# Content-addressed storage behind DatabaseFileField (see supplychain/blob_store.py).
+# Blobs of LARGE_BLOB_THRESHOLD bytes or more go to LARGE_BLOB_BACKEND when set;
+# move existing data with `manage.py migrate_blobs --backend <name>`.
+BLOB_STORE = {
+    "ENABLED": os.environ.get("BLOB_STORE_ENABLED", "True").lower() == "true",
+    "DEFAULT_BACKEND": os.environ.get("BLOB_STORE_BACKEND", "database"),
+    "LARGE_BLOB_BACKEND": os.environ.get("BLOB_STORE_LARGE_BACKEND") or None,
+    "LARGE_BLOB_THRESHOLD": int(os.environ.get("BLOB_STORE_LARGE_THRESHOLD", str(1024 * 1024))),
+    "FILESYSTEM_ROOT": os.environ.get("BLOB_STORE_ROOT", str(BASE_DIR / "blobstore")),
+}
+
+# Per-stakeholder cache of the dashboard responses (see supplychain/response_cache.py).
+# DASHBOARD_CACHE_BACKEND is "locmem" (per process), "file" (shared by the
+# workers of one host) or "redis" (any Redis-compatible server; needs redis-py).
+DASHBOARD_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "dashboards"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache" / "dashboards")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+_dashboard_cache_backend, _dashboard_cache_location = DASHBOARD_CACHE_BACKENDS[
+    os.environ.get("DASHBOARD_CACHE_BACKEND", "locmem")
+]
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "dashboards": {
+        "BACKEND": _dashboard_cache_backend,
+        "LOCATION": os.environ.get("DASHBOARD_CACHE_LOCATION", _dashboard_cache_location),
+        "KEY_PREFIX": "dashboards",
+    },
+}
+if not _dashboard_cache_backend.endswith("RedisCache"):
+    # Redis evicts by its own maxmemory policy
+    CACHES["dashboards"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", "10000"))}
+
+DASHBOARD_CACHE = {
+    "ENABLED": os.environ.get("DASHBOARD_CACHE_ENABLED", "True").lower() == "true",
+    "ALIAS": "dashboards",
+    "TTL": int(os.environ.get("DASHBOARD_CACHE_TTL", "30")),
+}
+
+# Public trace documents (see supplychain/trace_snapshots.py): seconds browsers
+# and shared caches (CDN, reverse proxy) may serve them before revalidating
+TRACE_SNAPSHOT = {
+    "MAX_AGE": int(os.environ.get("TRACE_SNAPSHOT_MAX_AGE", "60")),
+    "SHARED_MAX_AGE": int(os.environ.get("TRACE_SNAPSHOT_SHARED_MAX_AGE", "300")),
+}
+
+# Server-Timing response header with connect/query/total times (see
+# supplychain/server_timing.py); on by default in DEBUG
+SERVER_TIMING = {
+    "ENABLED": os.environ.get("SERVER_TIMING_ENABLED", str(DEBUG)).lower() == "true",
+}
@@ -6,6 +6,7 @@ from rest_framework import routers
 from supplychain import views
 from supplychain.admin_views import (
     AllKYCListView,
+    CacheStatsView,
     DashboardStatsView,
     KYCDecisionView,
     KYCDocumentPreviewView,
@@ -46,6 +47,7 @@ from supplychain.blockchain_views import (
     RetryAnchorView
 )
 from supplychain.batch_edit_views import EditBatchView, BatchEditLogView
+from supplychain.file_views import FileDownloadView
 
 router = routers.DefaultRouter()
 router.register(r"users", views.UserViewSet, basename="user")
@@ -70,6 +72,7 @@ urlpatterns = [
     path("api/auth/me/", MeView.as_view(), name="auth-me"),
     # Admin endpoints
     path("api/admin/stats/", DashboardStatsView.as_view(), name="admin-stats"),
+    path("api/admin/cache/stats/", CacheStatsView.as_view(), name="admin-cache-stats"),
     path("api/admin/kyc/pending/", PendingKYCListView.as_view(), name="admin-kyc-pending"),
     path("api/admin/kyc/all/", AllKYCListView.as_view(), name="admin-kyc-all"),
     path("api/admin/kyc/decide/<int:pk>/", KYCDecisionView.as_view(), name="admin-kyc-decide"),
@@ -114,5 +117,7 @@ urlpatterns = [
     # Batch edit endpoints
     path("api/batch/<str:batch_id>/edit/", EditBatchView.as_view(), name="batch-edit"),
     path("api/batch/<str:batch_id>/edit-logs/", BatchEditLogView.as_view(), name="batch-edit-logs"),
+    # Stored file downloads (signed URLs emitted by the serializers)
+    path("api/files/<str:model>/<int:pk>/<str:field>/", FileDownloadView.as_view(), name="file-download"),
 ]
 
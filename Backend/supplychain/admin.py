@@ -76,3 +76,53 @@ class BatchEventAdmin(admin.ModelAdmin):
     list_filter = ['event_type', 'timestamp']
     search_fields = ['batch__product_batch_id', 'performed_by__username']
     readonly_fields = ['timestamp']
+
+
+@admin.register(models.AnchorOutbox)
+class AnchorOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'batch_identifier', 'context', 'status', 'attempts', 'nonce', 'next_attempt_at', 'updated_at']
+    list_filter = ['status', 'context']
+    search_fields = ['batch_identifier', 'snapshot_hash', 'tx_hash']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(models.StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'backend', 'refcount', 'created_at']
+    list_filter = ['backend']
+    search_fields = ['sha256']
+    exclude = ['data']
+    readonly_fields = ['sha256', 'size', 'backend', 'refcount', 'created_at']
+
+
+@admin.register(models.StakeholderMetrics)
+class StakeholderMetricsAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'month', 'metric', 'status', 'dimension', 'role', 'count', 'quantity', 'amount']
+    list_filter = ['metric']
+    search_fields = ['profile__user__username']
+    readonly_fields = ['profile', 'month', 'metric', 'status', 'dimension', 'role', 'count', 'quantity', 'amount']
+
+
+@admin.register(models.MerkleProof)
+class MerkleProofAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'root_hash', 'leaf_index', 'leaf_count', 'created_at']
+    search_fields = ['root_hash', 'anchor_batch_id', 'event__batch__product_batch_id']
+    readonly_fields = ['created_at']
+
+
+@admin.register(models.AnchorRecordIndex)
+class AnchorRecordIndexAdmin(admin.ModelAdmin):
+    list_display = ['id', 'batch_key', 'record_index', 'context', 'block_number', 'tx_hash']
+    list_filter = ['context']
+    search_fields = ['batch_key', 'snapshot_hash', 'tx_hash']
+
+
+@admin.register(models.AnchorIndexCursor)
+class AnchorIndexCursorAdmin(admin.ModelAdmin):
+    list_display = ['id', 'contract_address', 'last_synced_block', 'updated_at']
+
+
+@admin.register(models.AnchorerNonce)
+class AnchorerNonceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'address', 'next_nonce', 'released_nonces', 'synced_at', 'updated_at']
+    search_fields = ['address']
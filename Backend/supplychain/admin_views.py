@@ -7,6 +7,14 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from supplychain import models
+from supplychain.response_cache import (
+    cache_response,
+    get_cache_stats,
+    get_dashboard_cache_settings,
+    invalidate_global,
+    invalidate_stakeholders,
+    reset_cache_stats,
+)
 from supplychain.serializers import (
     KYCRecordSerializer,
     StakeholderProfileSerializer,
@@ -96,6 +104,9 @@ class KYCDecisionView(APIView):
         profile.kyc_status = decision
         profile.save()
 
+        invalidate_stakeholders([profile.pk])
+        invalidate_global()
+
         return Response(
             {
                 "message": f"KYC {decision} successfully",
@@ -173,6 +184,7 @@ class DashboardStatsView(APIView):
 
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @cache_response("admin_stats", per_user=False)
     def get(self, request):
         stats = {
             "total_users": User.objects.count(),
@@ -208,6 +220,27 @@ class DashboardStatsView(APIView):
         return Response(stats)
 
 
+class CacheStatsView(APIView):
+    """Hit/miss counters of the dashboard response cache."""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        config = get_dashboard_cache_settings()
+        return Response(
+            {
+                "enabled": config["ENABLED"],
+                "ttl": config["TTL"],
+                "scopes": get_cache_stats(),
+            }
+        )
+
+    def delete(self, request):
+        """Reset the counters."""
+        reset_cache_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class KYCDocumentPreviewView(APIView):
     """Preview KYC document inline for admin review."""
     
@@ -0,0 +1,205 @@
+"""
+On-chain Anchor Index
+
+Keeps a local copy of the HashAnchor contract's HashAnchored logs in
+AnchorRecordIndex, so anchor history can be served from the database
+instead of one `getAnchor` RPC per record.
+
+`manage.py sync_anchor_index` tails the logs with eth_getLogs in block
+ranges, stopping CONFIRMATIONS blocks behind the chain head so reorged
+blocks are never indexed, and stores its progress in AnchorIndexCursor.
+Readers fall back to RPC only for anchors newer than the cursor.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+
+from .blockchain_status import blockchain_available
+from .models import AnchorIndexCursor, AnchorRecordIndex, BatchEvent
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_SETTINGS = {
+    "START_BLOCK": 0,
+    "CONFIRMATIONS": 12,
+    "BLOCK_CHUNK": 2000,
+    "MIN_BLOCK_CHUNK": 50,
+    "POLL_INTERVAL": 15.0,
+}
+
+
+def get_index_settings():
+    """Return the ANCHOR_INDEX settings merged over the defaults."""
+    config = dict(DEFAULT_INDEX_SETTINGS)
+    config.update(getattr(settings, "ANCHOR_INDEX", {}))
+    return config
+
+
+def anchor_batch_key(batch_id):
+    """On-chain key for a batch id: keccak256 of the id, hex without 0x."""
+    # HexBytes.hex() includes the 0x prefix before hexbytes 1.0 (web3 < 7)
+    return Web3.keccak(text=batch_id).hex().removeprefix("0x")
+
+
+def _contract_address(blockchain):
+    return blockchain.contract.address if blockchain and blockchain.contract else None
+
+
+def get_cursor_block(contract_address):
+    """Last fully indexed block for the contract, or None if it was never synced."""
+    cursor = AnchorIndexCursor.objects.filter(contract_address=contract_address).first()
+    return cursor.last_synced_block if cursor else None
+
+
+def sync_anchor_index(blockchain, config=None):
+    """
+    Copy HashAnchored logs up to head - CONFIRMATIONS into the index.
+
+    Block ranges are fetched BLOCK_CHUNK at a time; the chunk is halved
+    whenever the RPC node rejects a range (result limits vary by node).
+    Each chunk is stored together with the cursor, so an interrupted sync
+    resumes where it stopped.
+
+    Returns:
+        dict: {"from_block", "to_block", "records"} (to_block is None if already up to date)
+    """
+    config = config or get_index_settings()
+    contract_address = _contract_address(blockchain)
+
+    cursor, _ = AnchorIndexCursor.objects.get_or_create(
+        contract_address=contract_address,
+        defaults={'last_synced_block': config["START_BLOCK"] - 1}
+    )
+    target_block = blockchain.get_block_number() - config["CONFIRMATIONS"]
+    from_block = start_block = cursor.last_synced_block + 1
+    chunk = config["BLOCK_CHUNK"]
+    stored = 0
+
+    while from_block <= target_block:
+        to_block = min(from_block + chunk - 1, target_block)
+        try:
+            logs = blockchain.get_hash_anchored_logs(from_block, to_block)
+        except Exception as e:
+            if chunk <= config["MIN_BLOCK_CHUNK"]:
+                raise
+            chunk = max(chunk // 2, config["MIN_BLOCK_CHUNK"])
+            logger.warning(f"eth_getLogs {from_block}-{to_block} failed ({e}); retrying with {chunk} blocks")
+            continue
+
+        with transaction.atomic():
+            AnchorRecordIndex.objects.bulk_create(
+                [AnchorRecordIndex(**log) for log in logs],
+                update_conflicts=True,
+                unique_fields=['batch_key', 'record_index'],
+                update_fields=[
+                    'snapshot_hash', 'anchored_at', 'anchored_by', 'context',
+                    'tx_hash', 'block_number', 'log_index'
+                ],
+            )
+            cursor.last_synced_block = to_block
+            cursor.save(update_fields=['last_synced_block', 'updated_at'])
+
+        stored += len(logs)
+        from_block = to_block + 1
+
+    return {
+        "from_block": start_block,
+        "to_block": cursor.last_synced_block if start_block <= target_block else None,
+        "records": stored,
+    }
+
+
+def _record_to_anchor(record):
+    return {
+        "index": record.record_index,
+        "snapshot_hash": record.snapshot_hash,
+        "anchored_at": record.anchored_at,
+        "context": record.context,
+        "anchored_by": record.anchored_by,
+        "transaction_hash": record.tx_hash,
+        "block_number": record.block_number,
+    }
+
+
+def _rpc_to_anchor(index, anchor):
+    return {
+        "index": index,
+        "snapshot_hash": anchor['snapshot_hash'].hex(),
+        "anchored_at": anchor['anchored_at'],
+        "context": anchor['context'],
+        "anchored_by": anchor['anchored_by'],
+    }
+
+
+def _has_unsynced_anchors(batch, cursor_block):
+    """
+    True if the batch may have anchors the index has not seen yet.
+
+    Events record the block they were anchored in, so only events mined
+    after the cursor (or any, before the first sync) need an RPC lookup.
+    Merkle-batched events are anchored under their root's id instead.
+    """
+    anchored = BatchEvent.objects.filter(
+        batch=batch, blockchain_block_number__isnull=False, merkle_proof__isnull=True
+    )
+    if cursor_block is None:
+        return anchored.exists()
+    return anchored.filter(blockchain_block_number__gt=cursor_block).exists()
+
+
+def get_batch_anchors(batch, blockchain=None):
+    """
+    Anchor history of a batch, from the index with an RPC top-up for unsynced records.
+
+    Args:
+        batch: CropBatch instance
+        blockchain: BlockchainService used for the RPC fallback (None: index only)
+
+    Returns:
+        dict: {"anchor_count": int, "anchors": list, "source": "index" | "index+rpc"}
+    """
+    batch_id = batch.product_batch_id
+    cursor_block = get_cursor_block(_contract_address(blockchain)) if blockchain else None
+    records = AnchorRecordIndex.objects.filter(batch_key=anchor_batch_key(batch_id)).order_by('record_index')
+    anchors = [_record_to_anchor(record) for record in records]
+
+    if blockchain is None or not _has_unsynced_anchors(batch, cursor_block) or not blockchain_available():
+        return {"anchor_count": len(anchors), "anchors": anchors, "source": "index"}
+
+    indexed = {anchor["index"] for anchor in anchors}
+    anchor_count = blockchain.get_anchor_count(batch_id)
+    for i in range(anchor_count):
+        if i in indexed:
+            continue
+        anchor = blockchain.get_anchor_by_index(batch_id, i)
+        if anchor:
+            anchors.append(_rpc_to_anchor(i, anchor))
+
+    anchors.sort(key=lambda anchor: anchor["index"])
+    return {"anchor_count": max(anchor_count, len(anchors)), "anchors": anchors, "source": "index+rpc"}
+
+
+def get_latest_batch_anchor(batch, blockchain=None):
+    """
+    Most recent anchor of a batch, from the index unless newer anchors are unsynced.
+
+    Returns:
+        dict or None: Anchor record (same shape as get_batch_anchors entries)
+    """
+    cursor_block = get_cursor_block(_contract_address(blockchain)) if blockchain else None
+
+    if blockchain is not None and _has_unsynced_anchors(batch, cursor_block) and blockchain_available():
+        batch_id = batch.product_batch_id
+        anchor_count = blockchain.get_anchor_count(batch_id)
+        anchor = blockchain.get_latest_anchor(batch_id) if anchor_count else None
+        if anchor:
+            return _rpc_to_anchor(anchor_count - 1, anchor)
+
+    record = AnchorRecordIndex.objects.filter(
+        batch_key=anchor_batch_key(batch.product_batch_id)
+    ).order_by('-record_index').first()
+    return _record_to_anchor(record) if record else None
@@ -0,0 +1,570 @@
+"""
+Anchoring Outbox
+
+Durable, DB-backed queue that decouples blockchain anchoring from the
+HTTP request cycle. `log_batch_event` writes an AnchorOutbox row in the
+same transaction as the BatchEvent; `manage.py run_anchor_worker` claims
+rows, submits them to the HashAnchor contract and writes the transaction
+hash back onto the event.
+
+Rows move PENDING -> IN_PROGRESS -> SUBMITTED -> ANCHORED. Submission does
+not wait for the transaction to be mined: the worker broadcasts a whole
+batch of transactions (nonces come from the local NonceManager) and
+collects their receipts in a separate pass, rebroadcasting with a higher
+gas price when a transaction is stuck.
+
+The snapshot hash is computed at enqueue time so later changes to the
+batch (status, quantity after a split, ...) cannot leak into the anchor.
+"""
+
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .merkle import build_levels, merkle_proof, merkle_root
+from .models import AnchorOutbox, AnchorOutboxStatus, BatchEvent, CropBatch, MerkleProof
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKER_SETTINGS = {
+    "CONCURRENCY": 1,
+    "BATCH_SIZE": 20,
+    "POLL_INTERVAL": 2.0,
+    "MAX_ATTEMPTS": 8,
+    "RETRY_BASE_DELAY": 5.0,
+    "RETRY_MAX_DELAY": 900.0,
+    "LEASE_TIMEOUT": 300.0,
+    "RECEIPT_POLL_INTERVAL": 3.0,
+    "STUCK_TIMEOUT": 120.0,
+    "GAS_BUMP_PERCENT": 15,
+    "MAX_REPLACEMENTS": 5,
+    "MERKLE_WINDOW_SECONDS": 30.0,
+    "MERKLE_MAX_LEAVES": 256,
+}
+
+ANCHOR_MODE_SINGLE = "single"
+ANCHOR_MODE_MERKLE = "merkle"
+
+MERKLE_ROOT_CONTEXT = "MERKLE_ROOT"
+
+
+def get_worker_settings():
+    """Return the ANCHOR_WORKER settings merged over the defaults."""
+    config = dict(DEFAULT_WORKER_SETTINGS)
+    config.update(getattr(settings, "ANCHOR_WORKER", {}))
+    return config
+
+
+def get_anchor_mode():
+    """Return the configured anchoring mode ("single" or "merkle")."""
+    return getattr(settings, "BLOCKCHAIN_ANCHOR_MODE", ANCHOR_MODE_SINGLE)
+
+
+def compute_event_hash(event, batch, event_type, user):
+    """
+    Generate the deterministic snapshot hash for an event.
+
+    Returns:
+        bytes: 32-byte SHA256 hash
+    """
+    from .hash_generator import generate_batch_hash
+
+    # Events logged before the sequence column existed fall back to their position by timestamp
+    event_sequence = event.sequence
+    if event_sequence is None:
+        event_sequence = BatchEvent.objects.filter(batch=batch, timestamp__lte=event.timestamp).count()
+
+    return generate_batch_hash(
+        batch=batch,
+        event_type=event_type,
+        event_sequence=event_sequence,
+        actor_id=user.id if user else None
+    )
+
+
+def enqueue_event_anchor(event, batch, event_type, user):
+    """
+    Queue an event for asynchronous anchoring.
+
+    Must be called inside the transaction that created the event so the
+    event and its outbox row are committed (or rolled back) together.
+
+    Returns:
+        AnchorOutbox instance
+    """
+    snapshot_hash = compute_event_hash(event, batch, event_type, user)
+    return AnchorOutbox.objects.create(
+        event=event,
+        batch_identifier=batch.product_batch_id,
+        snapshot_hash=snapshot_hash.hex(),
+        context=event_type,
+    )
+
+
+def enqueue_event_anchors(entries):
+    """
+    Queue several events for anchoring with one INSERT.
+
+    Args:
+        entries: (event, batch, event_type, user) tuples; same
+            transaction rule as enqueue_event_anchor
+
+    Returns:
+        list: AnchorOutbox instances
+    """
+    return AnchorOutbox.objects.bulk_create([
+        AnchorOutbox(
+            event=event,
+            batch_identifier=batch.product_batch_id,
+            snapshot_hash=compute_event_hash(event, batch, event_type, user).hex(),
+            context=event_type,
+        )
+        for event, batch, event_type, user in entries
+    ])
+
+
+def requeue_event(event):
+    """
+    Put an event back on the outbox, resetting its retry budget.
+
+    Used by the retry-anchor endpoint for events whose anchoring was
+    given up on (or that predate the outbox).
+
+    Returns:
+        AnchorOutbox instance
+    """
+    with transaction.atomic():
+        item = AnchorOutbox.objects.select_for_update().filter(event=event).first()
+        if item is None:
+            return enqueue_event_anchor(event, event.batch, event.event_type, event.performed_by)
+
+        if item.status not in (
+            AnchorOutboxStatus.IN_PROGRESS, AnchorOutboxStatus.SUBMITTED, AnchorOutboxStatus.BATCHED
+        ):
+            item.status = AnchorOutboxStatus.PENDING
+            item.attempts = 0
+            item.next_attempt_at = timezone.now()
+            item.last_error = ''
+            item.merkle_root = None
+            item.save(update_fields=[
+                'status', 'attempts', 'next_attempt_at', 'last_error', 'merkle_root', 'updated_at'
+            ])
+            MerkleProof.objects.filter(event=event).delete()
+        return item
+
+
+def compute_backoff(attempts, config=None):
+    """
+    Exponential backoff with full jitter for the given attempt count.
+
+    Returns:
+        float: Delay in seconds before the next attempt
+    """
+    config = config or get_worker_settings()
+    ceiling = min(
+        config["RETRY_MAX_DELAY"],
+        config["RETRY_BASE_DELAY"] * (2 ** max(attempts - 1, 0))
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_items(worker_id, limit, config=None):
+    """
+    Claim up to `limit` due outbox rows for this worker.
+
+    Rows are locked with SKIP LOCKED so several workers can drain the
+    queue concurrently. IN_PROGRESS rows whose lease expired (the worker
+    holding them died) are reclaimed and the lost attempt is counted, so
+    a row that keeps crashing workers ends up marked FAILED.
+
+    Returns:
+        list of AnchorOutbox instances
+    """
+    config = config or get_worker_settings()
+    now = timezone.now()
+    lease_expiry = now - timedelta(seconds=config["LEASE_TIMEOUT"])
+
+    due = Q(status=AnchorOutboxStatus.PENDING, next_attempt_at__lte=now)
+    if get_anchor_mode() == ANCHOR_MODE_MERKLE:
+        # Event rows are rolled into Merkle roots; only roots are submitted
+        due &= Q(event__isnull=True)
+
+    with transaction.atomic():
+        items = list(
+            AnchorOutbox.objects.select_for_update(skip_locked=True).filter(
+                due | Q(status=AnchorOutboxStatus.IN_PROGRESS, locked_at__lt=lease_expiry)
+            ).order_by('next_attempt_at', 'id')[:limit]
+        )
+
+        claimed = []
+        for item in items:
+            if item.status == AnchorOutboxStatus.IN_PROGRESS:
+                item.attempts += 1
+                logger.warning(f"Reclaiming outbox item {item.id} from expired lease held by {item.locked_by}")
+                if item.attempts >= config["MAX_ATTEMPTS"]:
+                    _mark_failed(item, "Lease expired too many times; giving up")
+                    continue
+            item.status = AnchorOutboxStatus.IN_PROGRESS
+            item.locked_at = now
+            item.locked_by = worker_id
+            item.save(update_fields=['status', 'attempts', 'locked_at', 'locked_by', 'updated_at'])
+            claimed.append(item)
+
+    return claimed
+
+
+def claim_submitted(worker_id, limit, config=None):
+    """
+    Claim up to `limit` SUBMITTED rows whose receipt is due to be checked.
+
+    Claiming pushes `next_attempt_at` forward by RECEIPT_POLL_INTERVAL, so
+    other workers leave the row alone while its receipt is being fetched.
+
+    Returns:
+        list of AnchorOutbox instances
+    """
+    config = config or get_worker_settings()
+    now = timezone.now()
+
+    with transaction.atomic():
+        items = list(
+            AnchorOutbox.objects.select_for_update(skip_locked=True).filter(
+                status=AnchorOutboxStatus.SUBMITTED, next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id')[:limit]
+        )
+        for item in items:
+            item.next_attempt_at = now + timedelta(seconds=config["RECEIPT_POLL_INTERVAL"])
+            item.locked_by = worker_id
+            item.save(update_fields=['next_attempt_at', 'locked_by', 'updated_at'])
+
+    return items
+
+
+def build_merkle_batch(config=None, force=False):
+    """
+    Roll pending event rows into a single Merkle root row.
+
+    A root is only built once MERKLE_MAX_LEAVES rows are waiting or the
+    oldest has waited MERKLE_WINDOW_SECONDS (or `force` is set, to flush
+    whatever is pending). The event rows become
+    BATCHED and get a MerkleProof each; the new root row is PENDING and
+    is submitted like any other outbox row.
+
+    Returns:
+        AnchorOutbox: The root row, or None if the window is still open
+    """
+    config = config or get_worker_settings()
+    now = timezone.now()
+    window_start = now - timedelta(seconds=config["MERKLE_WINDOW_SECONDS"])
+
+    with transaction.atomic():
+        leaves = list(
+            AnchorOutbox.objects.select_for_update(skip_locked=True).filter(
+                status=AnchorOutboxStatus.PENDING,
+                event__isnull=False,
+                next_attempt_at__lte=now
+            ).order_by('id')[:config["MERKLE_MAX_LEAVES"]]
+        )
+        if not leaves:
+            return None
+        if not force and len(leaves) < config["MERKLE_MAX_LEAVES"] and leaves[0].created_at > window_start:
+            return None
+
+        levels = build_levels([bytes.fromhex(leaf.snapshot_hash) for leaf in leaves])
+        root_hex = merkle_root(levels).hex()
+        anchor_batch_id = f"MERKLE-{root_hex}"
+
+        root = AnchorOutbox.objects.create(
+            batch_identifier=anchor_batch_id,
+            snapshot_hash=root_hex,
+            context=MERKLE_ROOT_CONTEXT,
+        )
+
+        MerkleProof.objects.filter(event_id__in=[leaf.event_id for leaf in leaves]).delete()
+        MerkleProof.objects.bulk_create([
+            MerkleProof(
+                event_id=leaf.event_id,
+                root_hash=root_hex,
+                anchor_batch_id=anchor_batch_id,
+                leaf_index=index,
+                leaf_count=len(leaves),
+                siblings=merkle_proof(levels, index),
+            )
+            for index, leaf in enumerate(leaves)
+        ])
+
+        AnchorOutbox.objects.filter(id__in=[leaf.id for leaf in leaves]).update(
+            status=AnchorOutboxStatus.BATCHED,
+            merkle_root=root,
+            updated_at=now
+        )
+
+    logger.info(f"Batched {len(leaves)} event hash(es) under Merkle root {root_hex}")
+    return root
+
+
+def _root_leaf_count(item):
+    """Leaf count for anchorRoot(), or None to anchor through anchorHash()."""
+    if item.event_id is not None or not getattr(settings, "BLOCKCHAIN_MERKLE_USE_ANCHOR_ROOT", False):
+        return None
+    return item.merkle_leaves.count()
+
+
+def has_in_flight():
+    """True if any row has been broadcast but not yet confirmed."""
+    return AnchorOutbox.objects.filter(status=AnchorOutboxStatus.SUBMITTED).exists()
+
+
+def submit_item(item, blockchain=None, config=None):
+    """
+    Broadcast the anchor transaction for a claimed row without waiting for it.
+
+    Returns:
+        bool: True if the transaction was broadcast
+    """
+    from .blockchain_service import get_blockchain_service
+
+    blockchain = blockchain or get_blockchain_service()
+    config = config or get_worker_settings()
+
+    try:
+        submitted = blockchain.submit_anchor(
+            batch_id=item.batch_identifier,
+            snapshot_hash=bytes.fromhex(item.snapshot_hash),
+            context=item.context,
+            leaf_count=_root_leaf_count(item)
+        )
+    except Exception as e:
+        record_failure(item, e, config)
+        return False
+
+    now = timezone.now()
+    item.status = AnchorOutboxStatus.SUBMITTED
+    item.tx_hash = submitted['transaction_hash']
+    item.nonce = submitted['nonce']
+    item.gas_price = submitted['gas_price']
+    item.replaced_tx_hashes = []
+    item.submitted_at = now
+    item.next_attempt_at = now + timedelta(seconds=config["RECEIPT_POLL_INTERVAL"])
+    item.locked_at = None
+    item.save(update_fields=[
+        'status', 'tx_hash', 'nonce', 'gas_price', 'replaced_tx_hashes',
+        'submitted_at', 'next_attempt_at', 'locked_at', 'updated_at'
+    ])
+    return True
+
+
+def collect_receipt(item, blockchain=None, config=None):
+    """
+    Check whether a SUBMITTED row's transaction has been mined.
+
+    Any of the row's transaction hashes may be the one that lands, since a
+    stuck transaction is rebroadcast under a new hash with the same nonce.
+
+    Returns:
+        bool or None: True if anchored, False if failed, None if still pending
+    """
+    from .blockchain_service import NonceAlreadyUsedError, get_blockchain_service
+
+    blockchain = blockchain or get_blockchain_service()
+    config = config or get_worker_settings()
+
+    try:
+        result = _find_receipt(item, blockchain)
+    except Exception as e:
+        record_failure(item, e, config)
+        return False
+
+    if result is not None:
+        mark_anchored(item, result)
+        return True
+
+    stuck_since = timezone.now() - timedelta(seconds=config["STUCK_TIMEOUT"])
+    if item.submitted_at > stuck_since or len(item.replaced_tx_hashes) >= config["MAX_REPLACEMENTS"]:
+        return None
+
+    try:
+        replacement = blockchain.replace_anchor(
+            batch_id=item.batch_identifier,
+            snapshot_hash=bytes.fromhex(item.snapshot_hash),
+            context=item.context,
+            nonce=item.nonce,
+            previous_gas_price=item.gas_price,
+            bump_percent=config["GAS_BUMP_PERCENT"],
+            leaf_count=_root_leaf_count(item)
+        )
+    except NonceAlreadyUsedError as e:
+        # The nonce was mined; if not by one of our hashes, the anchor was lost
+        try:
+            result = _find_receipt(item, blockchain)
+        except Exception as receipt_error:
+            record_failure(item, receipt_error, config)
+            return False
+        if result is not None:
+            mark_anchored(item, result)
+            return True
+        record_failure(item, e, config)
+        return False
+    except Exception as e:
+        logger.warning(f"Rebroadcast of outbox item {item.id} failed, will retry: {e}")
+        return None
+
+    if replacement['transaction_hash'] != item.tx_hash:
+        item.replaced_tx_hashes = item.replaced_tx_hashes + [item.tx_hash]
+    item.tx_hash = replacement['transaction_hash']
+    item.gas_price = replacement['gas_price']
+    item.submitted_at = timezone.now()
+    item.save(update_fields=['tx_hash', 'gas_price', 'replaced_tx_hashes', 'submitted_at', 'updated_at'])
+    return None
+
+
+def _find_receipt(item, blockchain):
+    """Return the anchoring result for whichever of the row's transactions was mined."""
+    for tx_hash in [item.tx_hash] + list(item.replaced_tx_hashes):
+        result = blockchain.get_anchor_receipt(tx_hash)
+        if result is not None:
+            return result
+    return None
+
+
+def mark_anchored(item, result):
+    """Write the anchoring result back onto the event and batch."""
+    if item.event_id is None:
+        _mark_root_anchored(item, result)
+        return
+
+    event = item.event
+    batch = event.batch
+
+    with transaction.atomic():
+        event.blockchain_tx_hash = result['transaction_hash']
+        event.blockchain_block_number = result['block_number']
+        event.snapshot_hash = item.snapshot_hash
+        update_fields = ['blockchain_tx_hash', 'blockchain_block_number', 'snapshot_hash']
+        if 'blockchain_anchor_error' in event.metadata:
+            del event.metadata['blockchain_anchor_error']
+            update_fields.append('metadata')
+        event.save(update_fields=update_fields)
+
+        if batch.last_anchored_at is None or event.timestamp > batch.last_anchored_at:
+            batch.last_anchored_at = event.timestamp
+        batch.is_blockchain_verified = True
+        batch.save(update_fields=['last_anchored_at', 'is_blockchain_verified'])
+
+        item.status = AnchorOutboxStatus.ANCHORED
+        item.attempts += 1
+        item.locked_at = None
+        item.last_error = ''
+        item.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'updated_at'])
+
+    logger.info(
+        f"Successfully anchored batch {item.batch_identifier} "
+        f"at block {result['block_number']} "
+        f"(tx: {result['transaction_hash'][:20]}...)"
+    )
+
+
+def _mark_root_anchored(item, result):
+    """Write a Merkle root's anchoring result onto every event under it."""
+    leaves = list(
+        item.merkle_leaves.filter(status=AnchorOutboxStatus.BATCHED).select_related('event__batch')
+    )
+
+    events = []
+    batches = {}
+    for leaf in leaves:
+        event = leaf.event
+        event.blockchain_tx_hash = result['transaction_hash']
+        event.blockchain_block_number = result['block_number']
+        event.snapshot_hash = leaf.snapshot_hash
+        event.metadata.pop('blockchain_anchor_error', None)
+        events.append(event)
+
+        batch = batches.setdefault(event.batch_id, event.batch)
+        if batch.last_anchored_at is None or event.timestamp > batch.last_anchored_at:
+            batch.last_anchored_at = event.timestamp
+        batch.is_blockchain_verified = True
+
+    with transaction.atomic():
+        BatchEvent.objects.bulk_update(
+            events, ['blockchain_tx_hash', 'blockchain_block_number', 'snapshot_hash', 'metadata']
+        )
+        CropBatch.objects.bulk_update(list(batches.values()), ['last_anchored_at', 'is_blockchain_verified'])
+        AnchorOutbox.objects.filter(id__in=[leaf.id for leaf in leaves]).update(
+            status=AnchorOutboxStatus.ANCHORED,
+            last_error='',
+            updated_at=timezone.now()
+        )
+
+        item.status = AnchorOutboxStatus.ANCHORED
+        item.attempts += 1
+        item.locked_at = None
+        item.last_error = ''
+        item.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'updated_at'])
+
+    logger.info(
+        f"Successfully anchored Merkle root {item.snapshot_hash} covering {len(leaves)} event(s) "
+        f"at block {result['block_number']} "
+        f"(tx: {result['transaction_hash'][:20]}...)"
+    )
+
+
+def record_failure(item, error, config=None):
+    """
+    Record a failed anchoring attempt.
+
+    Schedules a retry with backoff, or marks the row FAILED (poison) once
+    the retry budget is exhausted.
+    """
+    config = config or get_worker_settings()
+    item.attempts += 1
+    item.last_error = str(error)
+    logger.error(f"Anchoring outbox item {item.id} failed (attempt {item.attempts}): {error}")
+
+    if item.attempts >= config["MAX_ATTEMPTS"]:
+        _mark_failed(item, str(error))
+        return
+
+    item.status = AnchorOutboxStatus.PENDING
+    item.locked_at = None
+    item.tx_hash = ''
+    item.nonce = None
+    item.replaced_tx_hashes = []
+    item.submitted_at = None
+    item.next_attempt_at = timezone.now() + timedelta(seconds=compute_backoff(item.attempts, config))
+    item.save(update_fields=[
+        'status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at',
+        'tx_hash', 'nonce', 'replaced_tx_hashes', 'submitted_at', 'updated_at'
+    ])
+
+
+def _mark_failed(item, error):
+    """Park a poison row and surface the error on the event for manual retry."""
+    item.status = AnchorOutboxStatus.FAILED
+    item.locked_at = None
+    item.last_error = error
+    item.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'updated_at'])
+
+    if item.event_id is None:
+        # A failed Merkle root fails every event under it
+        leaves = list(item.merkle_leaves.filter(status=AnchorOutboxStatus.BATCHED).select_related('event'))
+        for leaf in leaves:
+            leaf.status = AnchorOutboxStatus.FAILED
+            leaf.last_error = error
+            leaf.save(update_fields=['status', 'last_error', 'updated_at'])
+            leaf.event.metadata['blockchain_anchor_error'] = error
+            leaf.event.save(update_fields=['metadata'])
+        MerkleProof.objects.filter(event_id__in=[leaf.event_id for leaf in leaves]).delete()
+        logger.error(f"Merkle root {item.snapshot_hash} marked FAILED; {len(leaves)} event(s) need a manual retry")
+        return
+
+    event = item.event
+    event.metadata['blockchain_anchor_error'] = error
+    event.save(update_fields=['metadata'])
+    logger.error(f"Outbox item {item.id} for event {event.id} marked FAILED after {item.attempts} attempts")
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class SupplychainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "supplychain"
+
+    def ready(self):
+        from . import authentication, response_cache, stakeholder_metrics, trace_snapshots
+
+        stakeholder_metrics.connect_signals()
+        response_cache.connect_signals()
+        authentication.connect_signals()
+        trace_snapshots.connect_signals()
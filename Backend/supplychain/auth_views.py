@@ -217,7 +217,8 @@ class MeView(APIView):
         user = request.user
 
         try:
-            profile = models.StakeholderProfile.objects.get(user=user)
+            # Loaded with the user by StakeholderJWTAuthentication
+            profile = user.stakeholderprofile
         except models.StakeholderProfile.DoesNotExist:
             return Response(
                 {"message": "User profile not found"},
@@ -257,14 +258,13 @@ class MeView(APIView):
 
         data = request.data
         
-        # Update User fields
-        if "first_name" in data:
-            user.first_name = data["first_name"]
-        if "last_name" in data:
-            user.last_name = data["last_name"]
-        if "email" in data:
-            user.email = data["email"]
-        user.save()
+        # Update User fields; only these columns are written, since request.user
+        # may come from the authentication cache and be a few seconds old
+        user_fields = [field for field in ("first_name", "last_name", "email") if field in data]
+        for field in user_fields:
+            setattr(user, field, data[field])
+        if user_fields:
+            user.save(update_fields=user_fields)
 
         # Update Profile fields
         if "organization" in data:
@@ -0,0 +1,184 @@
+"""
+JWT Authentication with the Stakeholder Profile
+
+Almost every view reads `request.user.stakeholderprofile` (role checks,
+ownership checks), and simplejwt's JWTAuthentication loads the User row
+on every request, so an authenticated call started with one or two
+queries before doing any work. StakeholderJWTAuthentication loads the
+user and profile with one joined query and keeps the rows in a small
+per-process cache for AUTH_USER_CACHE["TTL"] seconds:
+
+    REST_FRAMEWORK = {
+        "DEFAULT_AUTHENTICATION_CLASSES": ["supplychain.authentication.StakeholderJWTAuthentication"],
+    }
+
+Each request gets its own User and StakeholderProfile instances built
+from the cached rows, so views can change them freely. Saving or deleting
+a user or profile (KYC decisions, admin edits, password changes, logins)
+drops its entry in this process when the transaction commits; other
+worker processes pick the change up within the TTL. Changes made with
+queryset.update() also wait for the TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import signals
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import StakeholderProfile
+
+DEFAULT_AUTH_USER_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "TTL": 30,
+    "MAX_ENTRIES": 5000,
+}
+
+# user id -> (expires_at, user row, profile row or None), least recently used first
+_entries = OrderedDict()
+_lock = threading.Lock()
+# Bumped by every invalidation; a load that raced with one is not cached
+_generation = 0
+
+
+def get_auth_user_cache_settings():
+    """Return the AUTH_USER_CACHE settings merged over the defaults."""
+    config = dict(DEFAULT_AUTH_USER_CACHE_SETTINGS)
+    config.update(getattr(settings, "AUTH_USER_CACHE", {}))
+    return config
+
+
+def _row(instance):
+    return instance._state.db, [getattr(instance, field.attname) for field in instance._meta.concrete_fields]
+
+
+def _build(model, row):
+    db, values = row
+    return model.from_db(db, None, values)
+
+
+def _instances(user_row, profile_row):
+    User = get_user_model()
+    user = _build(User, user_row)
+    if profile_row is None:
+        # Cache the absence so hasattr(user, "stakeholderprofile") needs no query
+        User.stakeholderprofile.related.set_cached_value(user, None)
+    else:
+        user.stakeholderprofile = _build(StakeholderProfile, profile_row)
+    return user
+
+
+def load_user(user_id):
+    """
+    User with `stakeholderprofile` already loaded, or None.
+
+    Served from the per-process cache when fresh; otherwise one query
+    joining the profile.
+    """
+    config = get_auth_user_cache_settings()
+    key = str(user_id)
+    now = time.monotonic()
+
+    if config["ENABLED"]:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None and entry[0] > now:
+                _entries.move_to_end(key)
+                return _instances(entry[1], entry[2])
+            generation = _generation
+
+    User = get_user_model()
+    user = (
+        User.objects.select_related("stakeholderprofile")
+        .filter(**{api_settings.USER_ID_FIELD: user_id})
+        .first()
+    )
+    if user is None or not config["ENABLED"]:
+        return user
+
+    try:
+        profile_row = _row(user.stakeholderprofile)
+    except StakeholderProfile.DoesNotExist:
+        profile_row = None
+    with _lock:
+        if generation == _generation:
+            _entries[key] = (now + config["TTL"], _row(user), profile_row)
+            _entries.move_to_end(key)
+            while len(_entries) > config["MAX_ENTRIES"]:
+                _entries.popitem(last=False)
+    return user
+
+
+def _forget(key):
+    global _generation
+    with _lock:
+        _entries.pop(key, None)
+        _generation += 1
+
+
+def invalidate_user(user_id):
+    """Drop a user's cached rows now and again when the transaction commits."""
+    key = str(user_id)
+    _forget(key)
+    transaction.on_commit(lambda: _forget(key))
+
+
+def clear_user_cache():
+    global _generation
+    with _lock:
+        _entries.clear()
+        _generation += 1
+
+
+class StakeholderJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user and profile through load_user()."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def _invalidate_user(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_user(instance.pk)
+
+
+def _invalidate_profile_user(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_user(instance.user_id)
+
+
+def connect_signals():
+    """Drop cached rows when a user or stakeholder profile is saved or deleted."""
+    User = get_user_model()
+    signals.post_save.connect(_invalidate_user, sender=User, dispatch_uid="auth_user_cache_user_save")
+    signals.post_delete.connect(_invalidate_user, sender=User, dispatch_uid="auth_user_cache_user_delete")
+    signals.post_save.connect(
+        _invalidate_profile_user, sender=StakeholderProfile, dispatch_uid="auth_user_cache_profile_save"
+    )
+    signals.post_delete.connect(
+        _invalidate_profile_user, sender=StakeholderProfile, dispatch_uid="auth_user_cache_profile_delete"
+    )
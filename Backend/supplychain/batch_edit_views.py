@@ -15,6 +15,7 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Q
 
 from .models import CropBatch, StakeholderRole, BatchEditLog, IntegrityStatus
+from .trace_snapshots import refresh_trace_snapshot
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -143,6 +144,8 @@ class EditBatchView(APIView):
                 if batch.integrity_status == IntegrityStatus.VERIFIED:
                     batch.integrity_status = IntegrityStatus.INTEGRITY_FAILED
                     batch.save(update_fields=['integrity_status'])
+
+                refresh_trace_snapshot(batch)
                 
                 logger.info(f"Batch {batch_id} edited by {user.username} ({user_role}): {edited_fields}")
             
@@ -0,0 +1,268 @@
+"""
+Content-addressed Blob Store
+
+DatabaseFileField columns hold a pointer to a StoredBlob row (keyed by the
+SHA-256 of the file) instead of the file itself, so the same certificate
+uploaded twice, or shared by a batch and its split children, is stored
+once. StoredBlob.refcount counts the columns pointing at each blob; it is
+maintained by DatabaseFileField.pre_save and on delete.
+
+Where the bytes live is pluggable. Each blob records its backend by name:
+"database" keeps them in StoredBlob.data (Postgres BYTEA), "filesystem"
+writes them under FILESYSTEM_ROOT and reads them back through mmap. Blobs
+of at least LARGE_BLOB_THRESHOLD bytes can be sent to a different backend
+than small ones. `manage.py migrate_blobs` moves existing inline files
+into the store, moves blobs between backends and garbage-collects blobs
+that are no longer referenced.
+"""
+
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .db_file_fields import compute_file_metadata
+from .models import StoredBlob
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_STORE_SETTINGS = {
+    "ENABLED": True,
+    "BACKENDS": {
+        "database": "supplychain.blob_store.DatabaseBlobBackend",
+        "filesystem": "supplychain.blob_store.FileSystemBlobBackend",
+    },
+    "DEFAULT_BACKEND": "database",
+    "LARGE_BLOB_BACKEND": None,
+    "LARGE_BLOB_THRESHOLD": 1024 * 1024,
+    "FILESYSTEM_ROOT": None,
+}
+
+_backends = {}
+
+# Per-thread reference tallies of an open batched_blob_references() block
+_batched = threading.local()
+
+
+def get_blob_store_settings():
+    """Return the BLOB_STORE settings merged over the defaults."""
+    config = dict(DEFAULT_BLOB_STORE_SETTINGS)
+    config.update(getattr(settings, "BLOB_STORE", {}))
+    return config
+
+
+def blob_store_enabled():
+    return get_blob_store_settings()["ENABLED"]
+
+
+class BlobBackend:
+    """Interface for the place blob bytes are kept."""
+
+    name = None
+
+    def write(self, blob, data):
+        """Store data for a StoredBlob that is about to be saved."""
+        raise NotImplementedError
+
+    def read(self, blob):
+        """Return the blob's data as a bytes-like object."""
+        raise NotImplementedError
+
+    def delete(self, blob):
+        """Remove the blob's data (called after its row is deleted)."""
+        raise NotImplementedError
+
+
+class DatabaseBlobBackend(BlobBackend):
+    """Keeps blob bytes in the StoredBlob row itself."""
+
+    name = "database"
+
+    def write(self, blob, data):
+        blob.data = bytes(data)
+
+    def read(self, blob):
+        if blob.data is None:
+            blob.data = StoredBlob.objects.filter(pk=blob.pk).values_list('data', flat=True).get()
+        return bytes(blob.data)
+
+    def delete(self, blob):
+        pass
+
+
+class FileSystemBlobBackend(BlobBackend):
+    """Keeps blob bytes in files named by their hash under FILESYSTEM_ROOT, read via mmap."""
+
+    name = "filesystem"
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(settings.BASE_DIR, "blobstore")
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def write(self, blob, data):
+        path = self.path(blob.sha256)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def read(self, blob):
+        with open(self.path(blob.sha256), "rb") as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def delete(self, blob):
+        try:
+            os.unlink(self.path(blob.sha256))
+        except FileNotFoundError:
+            pass
+
+
+def get_backend(name):
+    """Backend instance by name, as configured in BLOB_STORE['BACKENDS']."""
+    if name not in _backends:
+        config = get_blob_store_settings()
+        backend_class = import_string(config["BACKENDS"][name])
+        if issubclass(backend_class, FileSystemBlobBackend):
+            _backends[name] = backend_class(root=config["FILESYSTEM_ROOT"])
+        else:
+            _backends[name] = backend_class()
+    return _backends[name]
+
+
+def backend_for_size(size):
+    """Backend that new blobs of this size are written to."""
+    config = get_blob_store_settings()
+    if config["LARGE_BLOB_BACKEND"] and size >= config["LARGE_BLOB_THRESHOLD"]:
+        return get_backend(config["LARGE_BLOB_BACKEND"])
+    return get_backend(config["DEFAULT_BACKEND"])
+
+
+def acquire_blob(file):
+    """
+    Add a reference to the blob holding a DatabaseFile's data, storing it if new.
+
+    Sets `file.blob_sha`. Files that already point at a blob are only
+    counted again; their data is not loaded.
+
+    Returns:
+        str: SHA-256 hex of the blob
+    """
+    counts = getattr(_batched, "counts", None)
+    if file.blob_sha and counts is not None:
+        counts[file.blob_sha] += 1
+        return file.blob_sha
+
+    sha256 = file.blob_sha or compute_file_metadata(file.data)["sha256"]
+
+    with transaction.atomic():
+        if not StoredBlob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1):
+            data = file.data
+            backend = backend_for_size(len(data))
+            blob = StoredBlob(sha256=sha256, size=len(data), backend=backend.name, refcount=1)
+            backend.write(blob, data)
+            try:
+                with transaction.atomic():
+                    blob.save(force_insert=True)
+            except IntegrityError:
+                # Stored concurrently by another upload of the same file
+                StoredBlob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1)
+
+    file.blob_sha = sha256
+    return sha256
+
+
+@contextmanager
+def batched_blob_references():
+    """
+    Count the references rows in the block add to stored blobs once per blob.
+
+        with batched_blob_references():
+            CropBatch.objects.bulk_create(children)   # sharing the parent's documents
+
+    Inside the block acquire_blob() only tallies files that already point
+    at a blob; each blob's refcount is raised with one UPDATE on exit.
+    Use it inside the transaction that writes the rows.
+    """
+    if getattr(_batched, "counts", None) is not None:
+        # Nested: the outer block applies the counts
+        yield
+        return
+
+    _batched.counts = Counter()
+    try:
+        yield
+        counts = _batched.counts
+    finally:
+        _batched.counts = None
+    for sha256, count in counts.items():
+        StoredBlob.objects.filter(sha256=sha256).update(refcount=F('refcount') + count)
+
+
+def release_blob(sha256):
+    """
+    Drop a reference to a blob.
+
+    Unreferenced blobs are kept until `manage.py migrate_blobs --gc`, so a
+    save racing with the last release never points at deleted data.
+    """
+    StoredBlob.objects.filter(sha256=sha256, refcount__gt=0).update(refcount=F('refcount') - 1)
+
+
+def read_blob(sha256):
+    """Data of a stored blob as a bytes-like object."""
+    blob = StoredBlob.objects.get(sha256=sha256)
+    return get_backend(blob.backend).read(blob)
+
+
+def move_blob(blob, backend):
+    """Copy a blob's data to another backend and delete it from the old one."""
+    old_backend = get_backend(blob.backend)
+    if old_backend.name == backend.name:
+        return False
+
+    data = old_backend.read(blob)
+    blob.data = None
+    backend.write(blob, data)
+    blob.backend = backend.name
+    blob.save(update_fields=['backend', 'data'])
+    transaction.on_commit(lambda: old_backend.delete(blob))
+    return True
+
+
+def delete_unreferenced_blobs():
+    """
+    Delete blobs with no references left.
+
+    Returns:
+        int: Number of blobs deleted
+    """
+    deleted = 0
+    for sha256 in StoredBlob.objects.filter(refcount=0).values_list('sha256', flat=True).iterator():
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().defer('data').filter(sha256=sha256, refcount=0).first()
+            if blob is None:
+                continue
+            backend = get_backend(blob.backend)
+            blob.delete()
+            transaction.on_commit(lambda blob=blob, backend=backend: backend.delete(blob))
+            deleted += 1
+    return deleted
@@ -8,10 +8,13 @@ retrieving anchor records, and verifying data integrity.
 
 import logging
 import os
+import threading
+import time
 from typing import Optional, Dict, Any, Tuple
 from decimal import Decimal
 
 from web3 import Web3
+from web3.exceptions import TransactionNotFound
 from eth_account import Account
 from eth_abi import encode
 from dotenv import load_dotenv
@@ -59,6 +62,17 @@ HASH_ANCHOR_ABI = [
         "name": "HashAnchored",
         "type": "event"
     },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "bytes32", "name": "root", "type": "bytes32"},
+            {"indexed": False, "internalType": "uint256", "name": "leafCount", "type": "uint256"},
+            {"indexed": False, "internalType": "uint64", "name": "anchoredAt", "type": "uint64"},
+            {"indexed": False, "internalType": "address", "name": "anchoredBy", "type": "address"}
+        ],
+        "name": "RootAnchored",
+        "type": "event"
+    },
     {
         "inputs": [],
         "name": "ANCHORER_ROLE",
@@ -84,6 +98,16 @@ HASH_ANCHOR_ABI = [
         "stateMutability": "nonpayable",
         "type": "function"
     },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "root", "type": "bytes32"},
+            {"internalType": "uint256", "name": "leafCount", "type": "uint256"}
+        ],
+        "name": "anchorRoot",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
     {
         "inputs": [
             {"internalType": "bytes32", "name": "batchId", "type": "bytes32"},
@@ -113,6 +137,13 @@ HASH_ANCHOR_ABI = [
         "stateMutability": "view",
         "type": "function"
     },
+    {
+        "inputs": [{"internalType": "bytes32", "name": "root", "type": "bytes32"}],
+        "name": "getRootAnchoredAt",
+        "outputs": [{"internalType": "uint64", "name": "", "type": "uint64"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
     {
         "inputs": [{"internalType": "bytes32", "name": "batchId", "type": "bytes32"}],
         "name": "getLatestAnchor",
@@ -188,6 +219,38 @@ HASH_ANCHOR_ABI = [
     }
 ]
 
+# Chain ID of Polygon Amoy; transactions are signed with the connected node's chain ID
+POLYGON_AMOY_CHAIN_ID = 80002
+
+# Gas price is reused for this many seconds before asking the node again
+GAS_PRICE_CACHE_SECONDS = 15
+
+# Times submit_anchor resyncs the nonce and retries after a nonce conflict
+NONCE_RETRY_LIMIT = 3
+
+
+class NonceAlreadyUsedError(Exception):
+    """Raised when rebroadcasting with a nonce that has already been mined."""
+
+
+def _is_nonce_too_low_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return 'nonce too low' in message or 'nonce has already been used' in message
+
+
+def _is_nonce_conflict_error(error: Exception) -> bool:
+    """Errors meaning the nonce is taken and the local counter is out of sync."""
+    message = str(error).lower()
+    return (
+        _is_nonce_too_low_error(error)
+        or 'replacement transaction underpriced' in message
+    )
+
+
+def _is_already_known_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return 'already known' in message or 'known transaction' in message
+
 
 class BlockchainService:
     """
@@ -210,7 +273,12 @@ class BlockchainService:
         self.w3: Optional[Web3] = None
         self.contract = None
         self.account = None
+        self.chain_id = POLYGON_AMOY_CHAIN_ID
         self._init_error: Optional[str] = None
+        self._nonce_manager = None
+        self._gas_lock = threading.Lock()
+        self._gas_price_cache: Optional[Tuple[int, float]] = None
+        self._gas_limit_cache: Dict[str, int] = {}
         self._connect()
     
     def _connect(self) -> None:
@@ -221,13 +289,23 @@ class BlockchainService:
         structured error responses.
         """
         try:
-            # Get configuration from environment
-            rpc_url = os.getenv('POLYGON_AMOY_RPC_URL')
-            contract_address = os.getenv('HASH_ANCHOR_CONTRACT_ADDRESS')
-            private_key = os.getenv('ANCHORER_PRIVATE_KEY')
+            # Get configuration from environment (or the local chain, see local_chain.py)
+            from .local_chain import get_local_chain, local_chain_enabled
+            local_chain = get_local_chain() if local_chain_enabled() else None
+            if local_chain:
+                rpc_url = str(local_chain)
+                fallback_urls = []
+                contract_address = local_chain.contract_address
+                private_key = local_chain.anchorer.key
+            else:
+                rpc_url = os.getenv('POLYGON_AMOY_RPC_URL')
+                fallback_urls = [url.strip() for url in os.getenv('POLYGON_AMOY_RPC_FALLBACK_URLS', '').split(',') if url.strip()]
+                contract_address = os.getenv('HASH_ANCHOR_CONTRACT_ADDRESS')
+                private_key = os.getenv('ANCHORER_PRIVATE_KEY')
             
             # Diagnostic logging
             print(f"[Blockchain] RPC URL: {'SET' if rpc_url else 'MISSING'}")
+            print(f"[Blockchain] Fallback RPC URLs: {len(fallback_urls)}")
             print(f"[Blockchain] Contract Address: {contract_address or 'MISSING'}")
             print(f"[Blockchain] Private Key: {'SET' if private_key else 'MISSING'}")
             
@@ -244,8 +322,12 @@ class BlockchainService:
                 logger.error(self._init_error)
                 return
             
-            # Initialize Web3 connection
-            self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+            # Initialize Web3 connection (failover, hedged reads, per-call timeouts)
+            if local_chain:
+                self.w3 = local_chain.web3()
+            else:
+                from .rpc_pool import RPCPoolProvider
+                self.w3 = Web3(RPCPoolProvider([rpc_url] + fallback_urls))
             
             # Verify connection
             connected = self.w3.is_connected()
@@ -255,7 +337,8 @@ class BlockchainService:
                 logger.error(self._init_error)
                 return
             
-            logger.info(f"Connected to Polygon Amoy (Chain ID: {self.w3.eth.chain_id})")
+            self.chain_id = self.w3.eth.chain_id
+            logger.info(f"Connected to {local_chain or 'Polygon Amoy'} (Chain ID: {self.chain_id})")
             
             # Initialize account from private key
             self.account = Account.from_key(private_key)
@@ -294,6 +377,219 @@ class BlockchainService:
             # Truncate
             return data[:32]
     
+    def _get_nonce_manager(self):
+        """Lazily create the nonce manager for the anchorer wallet."""
+        if self._nonce_manager is None:
+            from .nonce_manager import NonceManager
+            self._nonce_manager = NonceManager(self.w3, self.account.address)
+        return self._nonce_manager
+    
+    def _get_cached_gas_price(self) -> int:
+        """Current gas price, refreshed at most every GAS_PRICE_CACHE_SECONDS."""
+        with self._gas_lock:
+            now = time.monotonic()
+            if self._gas_price_cache is None or now - self._gas_price_cache[1] > GAS_PRICE_CACHE_SECONDS:
+                self._gas_price_cache = (self.w3.eth.gas_price, now)
+            return self._gas_price_cache[0]
+    
+    def _anchor_call(self, batch_id: str, snapshot_hash: bytes, context: str, leaf_count: Optional[int] = None):
+        """
+        Prepare the contract call for an anchor.
+        
+        With `leaf_count`, `snapshot_hash` is a Merkle root and is anchored
+        through anchorRoot() instead of anchorHash().
+        
+        Returns:
+            tuple: (contract function call, gas cache key)
+        """
+        hash_bytes = self._ensure_bytes32(snapshot_hash)
+        if leaf_count is not None:
+            return self.contract.functions.anchorRoot(hash_bytes, leaf_count), 'anchorRoot'
+        return self.contract.functions.anchorHash(
+            self._batch_id_to_bytes32(batch_id), hash_bytes, context
+        ), context
+    
+    def _get_gas_limit(self, call, gas_key: str) -> int:
+        """
+        Gas limit for an anchor call.
+        
+        An anchor costs roughly the same for every call with the same
+        context, so the largest estimate seen per context is reused
+        instead of calling estimate_gas for every anchor.
+        """
+        with self._gas_lock:
+            cached = self._gas_limit_cache.get(gas_key)
+        if cached is not None:
+            return cached
+        
+        gas_limit = 200000
+        try:
+            estimated = call.estimate_gas({'from': self.account.address})
+            gas_limit = int(estimated * 1.3)  # 30% buffer
+            print(f"[Blockchain] Gas estimate   : {estimated} → using {gas_limit}")
+        except Exception as gas_err:
+            print(f"[Blockchain] Gas estimate failed (using default {gas_limit}): {gas_err}")
+            logger.warning(f"Gas estimation failed for context {gas_key}: {gas_err}")
+            return gas_limit
+        
+        with self._gas_lock:
+            gas_limit = max(gas_limit, self._gas_limit_cache.get(gas_key, 0))
+            self._gas_limit_cache[gas_key] = gas_limit
+        return gas_limit
+    
+    def _sign_and_send(self, call, gas_key: str, nonce: int, gas_price: int) -> str:
+        """
+        Build, sign and broadcast an anchor transaction.
+        
+        Returns:
+            str: Transaction hash (hex)
+        """
+        tx = call.build_transaction({
+            'from': self.account.address,
+            'nonce': nonce,
+            'gas': self._get_gas_limit(call, gas_key),
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        })
+        
+        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.key)
+        
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception as e:
+            # The node already has this exact transaction (e.g. rebroadcast)
+            if _is_already_known_error(e):
+                return signed_tx.hash.hex()
+            raise
+        
+        return tx_hash.hex()
+    
+    def submit_anchor(
+        self,
+        batch_id: str,
+        snapshot_hash: bytes,
+        context: str,
+        leaf_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Sign and broadcast an anchor transaction without waiting for it to be mined.
+        
+        The nonce comes from the local nonce manager, so many anchor
+        transactions can be in flight at once. Nonce conflicts reported by
+        the node ("nonce too low", underpriced replacement) trigger a resync
+        and a fresh nonce.
+        
+        Pass `leaf_count` to anchor a Merkle root through anchorRoot().
+        
+        Returns:
+            dict: Submitted transaction
+            {
+                "transaction_hash": str,
+                "nonce": int,
+                "gas_price": int
+            }
+            
+        Raises:
+            Exception: If the transaction cannot be broadcast
+        """
+        call, gas_key = self._anchor_call(batch_id, snapshot_hash, context, leaf_count)
+        nonce_manager = self._get_nonce_manager()
+        gas_price = self._get_cached_gas_price()
+        
+        for attempt in range(NONCE_RETRY_LIMIT):
+            nonce = nonce_manager.allocate()
+            try:
+                tx_hash = self._sign_and_send(call, gas_key, nonce, gas_price)
+            except Exception as e:
+                if _is_nonce_conflict_error(e):
+                    logger.warning(f"Nonce {nonce} rejected for batch {batch_id} ({e}); resyncing")
+                    nonce_manager.resync()
+                    continue
+                nonce_manager.release(nonce)
+                logger.error(f"Anchor submission failed for batch {batch_id}: {e}")
+                raise
+            
+            logger.info(f"Anchor for batch {batch_id} ('{context}') sent with nonce {nonce}: {tx_hash}")
+            return {
+                "transaction_hash": tx_hash,
+                "nonce": nonce,
+                "gas_price": gas_price
+            }
+        
+        raise Exception(f"Could not obtain a usable nonce for batch {batch_id} after {NONCE_RETRY_LIMIT} attempts")
+    
+    def replace_anchor(
+        self,
+        batch_id: str,
+        snapshot_hash: bytes,
+        context: str,
+        nonce: int,
+        previous_gas_price: int,
+        bump_percent: int = 15,
+        leaf_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Rebroadcast a stuck anchor transaction with the same nonce and a higher gas price.
+        
+        Raises:
+            NonceAlreadyUsedError: If the nonce was already mined, either by
+                this anchor or by some other transaction
+        
+        Returns:
+            dict: Same shape as submit_anchor()
+        """
+        gas_price = max(
+            previous_gas_price * (100 + bump_percent) // 100 + 1,
+            self._get_cached_gas_price()
+        )
+        call, gas_key = self._anchor_call(batch_id, snapshot_hash, context, leaf_count)
+        try:
+            tx_hash = self._sign_and_send(call, gas_key, nonce, gas_price)
+        except Exception as e:
+            if _is_nonce_too_low_error(e):
+                raise NonceAlreadyUsedError(f"Nonce {nonce} already used: {e}") from e
+            raise
+        
+        logger.info(f"Rebroadcast anchor for batch {batch_id} with nonce {nonce} at {gas_price} wei: {tx_hash}")
+        return {
+            "transaction_hash": tx_hash,
+            "nonce": nonce,
+            "gas_price": gas_price
+        }
+    
+    def get_anchor_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the receipt of a submitted anchor transaction.
+        
+        Returns:
+            dict: Same shape as anchor_batch_hash(), or None if not mined yet
+            
+        Raises:
+            Exception: If the transaction was mined but reverted
+        """
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        
+        if receipt['status'] != 1:
+            raise Exception(f"Transaction failed: {receipt}")
+        
+        return self._receipt_to_result(receipt)
+    
+    def _receipt_to_result(self, receipt) -> Dict[str, Any]:
+        """Convert a successful anchor receipt into the result dict."""
+        # Get record index from event logs
+        record_index = self._extract_record_index_from_logs(receipt['logs'])
+        
+        return {
+            "transaction_hash": receipt['transactionHash'].hex(),
+            "block_number": receipt['blockNumber'],
+            "gas_used": receipt['gasUsed'],
+            "record_index": record_index,
+            "status": True
+        }
+    
     def anchor_batch_hash(
         self, 
         batch_id: str, 
@@ -301,7 +597,7 @@ class BlockchainService:
         context: str
     ) -> Dict[str, Any]:
         """
-        Anchor a batch hash to the blockchain.
+        Anchor a batch hash to the blockchain and wait for the receipt.
         
         Args:
             batch_id: Unique batch identifier (e.g., "BATCH-20240305-ABC12345")
@@ -322,71 +618,25 @@ class BlockchainService:
             Exception: If transaction fails
         """
         try:
-            # Convert inputs to blockchain format
-            batch_id_bytes = self._batch_id_to_bytes32(batch_id)
-            hash_bytes = self._ensure_bytes32(snapshot_hash)
-
             # ── Debug logging ────────────────────────────────────────────────
             print(f"[Blockchain] Batch ID       : {batch_id}")
-            print(f"[Blockchain] Batch ID bytes32: {batch_id_bytes.hex()}")
-            print(f"[Blockchain] Hash bytes32   : {hash_bytes.hex()}")
+            print(f"[Blockchain] Hash bytes32   : {self._ensure_bytes32(snapshot_hash).hex()}")
             print(f"[Blockchain] Context        : {context}")
             print(f"[Blockchain] Sender         : {self.account.address}")
             print(f"[Blockchain] Contract       : {self.contract.address}")
             # ─────────────────────────────────────────────────────────────────
-
-            # Estimate gas with fallback
-            gas_limit = 200000
-            try:
-                estimated = self.contract.functions.anchorHash(
-                    batch_id_bytes, hash_bytes, context
-                ).estimate_gas({'from': self.account.address})
-                gas_limit = int(estimated * 1.3)  # 30% buffer
-                print(f"[Blockchain] Gas estimate   : {estimated} → using {gas_limit}")
-            except Exception as gas_err:
-                print(f"[Blockchain] Gas estimate failed (using default {gas_limit}): {gas_err}")
-                logger.warning(f"Gas estimation failed for batch {batch_id}: {gas_err}")
-
-            # Build transaction
-            tx = self.contract.functions.anchorHash(
-                batch_id_bytes,
-                hash_bytes,
-                context
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': gas_limit,
-                'gasPrice': self.w3.eth.gas_price,
-                'chainId': 80002  # Polygon Amoy
-            })
             
             logger.info(f"Anchoring batch {batch_id} with context '{context}'")
-            
-            # Sign transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.key)
-            
-            # Send transaction
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            logger.info(f"Transaction sent: {tx_hash.hex()}")
+            submitted = self.submit_anchor(batch_id, snapshot_hash, context)
             
             # Wait for receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+            receipt = self.w3.eth.wait_for_transaction_receipt(submitted['transaction_hash'], timeout=120)
             
             if receipt['status'] != 1:
                 raise Exception(f"Transaction failed: {receipt}")
             
-            # Get record index from event logs
-            record_index = self._extract_record_index_from_logs(receipt['logs'])
-            
-            result = {
-                "transaction_hash": receipt['transactionHash'].hex(),
-                "block_number": receipt['blockNumber'],
-                "gas_used": receipt['gasUsed'],
-                "record_index": record_index,
-                "status": True
-            }
-            
-            logger.info(f"Anchor successful: block {receipt['blockNumber']}, index {record_index}")
+            result = self._receipt_to_result(receipt)
+            logger.info(f"Anchor successful: block {receipt['blockNumber']}, index {result['record_index']}")
             return result
             
         except Exception as e:
@@ -470,6 +720,82 @@ class BlockchainService:
             logger.error(f"Failed to get anchor {index} for {batch_id}: {e}")
             return None
     
+    def get_root_anchored_at(self, root: bytes) -> int:
+        """
+        When a Merkle root was anchored, looked up the way the anchor worker
+        anchors it: through anchorRoot() when BLOCKCHAIN_MERKLE_USE_ANCHOR_ROOT
+        is set, otherwise through anchorHash() under the batch id
+        "MERKLE-<root hex>" (also checked with the flag set, for roots
+        anchored before it was turned on).
+        
+        Args:
+            root: 32-byte Merkle root
+            
+        Returns:
+            int: Block timestamp of the anchor, 0 if the root was never anchored
+            
+        Raises:
+            Exception: If the contract cannot be queried
+        """
+        from django.conf import settings
+        
+        root = self._ensure_bytes32(root)
+        if getattr(settings, "BLOCKCHAIN_MERKLE_USE_ANCHOR_ROOT", False):
+            anchored_at = self.contract.functions.getRootAnchoredAt(root).call()
+            if anchored_at:
+                return anchored_at
+        
+        # getLatestAnchor() reverts for unknown ids, so count first
+        batch_id_bytes = self._batch_id_to_bytes32(f"MERKLE-{root.hex()}")
+        count = self.contract.functions.getAnchorCount(batch_id_bytes).call()
+        for index in range(count):
+            record = self.contract.functions.getAnchor(batch_id_bytes, index).call()
+            if bytes(record[0]) == root:
+                return record[1]
+        return 0
+    
+    def get_block_number(self) -> int:
+        """Current chain head block number."""
+        return self.w3.eth.block_number
+    
+    def get_hash_anchored_logs(self, from_block: int, to_block: int) -> list:
+        """
+        Fetch HashAnchored events emitted in a block range (eth_getLogs).
+        
+        Args:
+            from_block: First block (inclusive)
+            to_block: Last block (inclusive)
+            
+        Returns:
+            list: Decoded anchor records
+            [{
+                "batch_key": str (hex keccak batch id, no 0x),
+                "snapshot_hash": str (hex, no 0x),
+                "record_index": int,
+                "anchored_at": int (timestamp),
+                "anchored_by": str (address),
+                "context": str,
+                "tx_hash": str,
+                "block_number": int,
+                "log_index": int
+            }]
+        """
+        logs = self.contract.events.HashAnchored().get_logs(from_block=from_block, to_block=to_block)
+        return [
+            {
+                "batch_key": log['args']['batchId'].hex().removeprefix("0x"),
+                "snapshot_hash": log['args']['snapshotHash'].hex().removeprefix("0x"),
+                "record_index": log['args']['recordIndex'],
+                "anchored_at": log['args']['anchoredAt'],
+                "anchored_by": log['args']['anchoredBy'],
+                "context": log['args']['context'],
+                "tx_hash": log['transactionHash'].hex(),
+                "block_number": log['blockNumber'],
+                "log_index": log['logIndex'],
+            }
+            for log in logs
+        ]
+    
     def verify_batch_integrity(self, batch) -> Dict[str, Any]:
         """
         Verify batch data integrity against blockchain records.
@@ -483,11 +809,13 @@ class BlockchainService:
         Returns:
             dict: Verification result with event-level breakdown
         """
-        from .hash_generator import generate_batch_hash
+        from .hash_generator import generate_batch_hash, verify_event_hash
         from .models import BatchEvent, IntegrityStatus
         
         try:
-            events = list(BatchEvent.objects.filter(batch=batch).order_by('timestamp'))
+            events = list(
+                BatchEvent.objects.filter(batch=batch).select_related('merkle_proof').order_by('timestamp', 'id')
+            )
             
             has_anchors = any(e.snapshot_hash for e in events)
             if not has_anchors:
@@ -502,10 +830,11 @@ class BlockchainService:
             verification_results = []
             all_match = True
             last_anchored_at = None
+            root_anchored_at = {}  # root hex -> on-chain timestamp (0: never anchored)
             
             # Verify sequentially
             for i, event in enumerate(events):
-                event_sequence = i + 1
+                event_sequence = event.sequence if event.sequence is not None else i + 1
                 if event.snapshot_hash:
                     last_anchored_at = event.timestamp
                     recomputed_hash = generate_batch_hash(
@@ -517,7 +846,23 @@ class BlockchainService:
                     
                     recomputed_hex = recomputed_hash.hex()
                     stored_hex = event.snapshot_hash
-                    matches = (recomputed_hex == stored_hex)
+                    
+                    # Events anchored under a Merkle root also need an inclusion
+                    # proof and the root on chain (looked up once per root)
+                    proof = getattr(event, 'merkle_proof', None)
+                    proof_data = None
+                    if proof is not None:
+                        proof_data = (proof.leaf_index, proof.leaf_count, proof.siblings, proof.root_hash)
+                        if proof.root_hash not in root_anchored_at:
+                            root_anchored_at[proof.root_hash] = self.get_root_anchored_at(
+                                bytes.fromhex(proof.root_hash)
+                            )
+                    matches, proof_verified = verify_event_hash(
+                        recomputed_hash,
+                        stored_hex,
+                        proof_data,
+                        root_anchored_at.get(proof.root_hash) if proof is not None else None
+                    )
                     
                     if not matches:
                         all_match = False
@@ -529,12 +874,17 @@ class BlockchainService:
                             recomputed_hash=recomputed_hex
                         )
                     
-                    verification_results.append({
+                    result = {
                         "event_type": event.event_type,
                         "verified": matches,
                         "current_hash": recomputed_hex,
                         "stored_hash": stored_hex
-                    })
+                    }
+                    if proof is not None:
+                        result["merkle_root"] = proof.root_hash
+                        result["merkle_proof_verified"] = proof_verified
+                        result["merkle_root_anchored_at"] = root_anchored_at[proof.root_hash] or None
+                    verification_results.append(result)
             
             current_status = "VERIFIED" if all_match else "INTEGRITY_FAILED"
             
@@ -638,6 +988,9 @@ class BlockchainService:
             "balance": None,
             "gas_price": None,
         }
+
+        if self.w3 is not None and hasattr(self.w3.provider, "stats"):
+            result["rpc_endpoints"] = self.w3.provider.stats()
         
         if self._init_error:
             result["error"] = self._init_error
@@ -682,7 +1035,12 @@ def get_blockchain_service() -> BlockchainService:
             svc.w3 = None
             svc.contract = None
             svc.account = None
+            svc.chain_id = POLYGON_AMOY_CHAIN_ID
             svc._init_error = str(e)
+            svc._nonce_manager = None
+            svc._gas_lock = threading.Lock()
+            svc._gas_price_cache = None
+            svc._gas_limit_cache = {}
             _blockchain_service = svc
     return _blockchain_service
 
@@ -0,0 +1,200 @@
+"""
+Cached Blockchain Status
+
+The public status endpoint and the consumer verify page used to probe the
+RPC node on every request (is_connected(), chain id, balance, gas price,
+role lookup), so their latency and the RPC bill followed public traffic.
+They now read a per-process snapshot instead:
+
+- the snapshot is taken once, then served as is; a request that finds it
+  older than BLOCKCHAIN_STATUS["REFRESH_INTERVAL"] seconds starts one
+  background refresh and is answered from the old snapshot
+  (stale-while-revalidate), so at most one refresh per interval reaches
+  the node from each process, and none while the site is idle
+- after FAILURE_THRESHOLD consecutive failed refreshes the circuit opens:
+  the chain is reported unavailable (`degraded`) and no refresh is tried
+  for BREAKER_COOLDOWN seconds; the first refresh after that decides
+  whether the circuit closes again
+- a snapshot older than MAX_STALE seconds is flagged `stale` in the
+  status response
+
+Only the first request of a process waits for the node.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .blockchain_service import get_blockchain_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCKCHAIN_STATUS_SETTINGS = {
+    "REFRESH_INTERVAL": 30,
+    "MAX_STALE": 300,
+    "FAILURE_THRESHOLD": 3,
+    "BREAKER_COOLDOWN": 60,
+}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def get_blockchain_status_settings():
+    """Return the BLOCKCHAIN_STATUS settings merged over the defaults."""
+    config = dict(DEFAULT_BLOCKCHAIN_STATUS_SETTINGS)
+    config.update(getattr(settings, "BLOCKCHAIN_STATUS", {}))
+    return config
+
+
+class BlockchainStatusMonitor:
+    """Snapshot of get_status_dict() with background refresh and a circuit breaker."""
+
+    def __init__(self, service_factory=get_blockchain_service):
+        self._service_factory = service_factory
+        self._lock = threading.Lock()
+        # Held for the whole of a refresh; never waited on once a snapshot exists
+        self._refresh_lock = threading.Lock()
+        self._status = None
+        self._updated_at = None  # datetime the snapshot was taken
+        self._checked_at = None  # monotonic time of the last refresh attempt
+        self._consecutive_failures = 0
+        self._opened_at = None  # monotonic time the circuit opened
+        self._refreshing = False  # a background refresh is running
+
+    def _circuit_state(self, now, config):
+        if self._opened_at is None:
+            return CIRCUIT_CLOSED
+        if now - self._opened_at < config["BREAKER_COOLDOWN"]:
+            return CIRCUIT_OPEN
+        return CIRCUIT_HALF_OPEN
+
+    def _refresh_due(self, now, config):
+        if self._checked_at is None:
+            return True
+        if self._circuit_state(now, config) == CIRCUIT_OPEN:
+            return False
+        return now - self._checked_at >= config["REFRESH_INTERVAL"]
+
+    def refresh(self):
+        """Probe the node now and record the outcome; returns whether it succeeded."""
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self):
+        config = get_blockchain_status_settings()
+        try:
+            status_data = self._service_factory().get_status_dict()
+            ok = status_data.get("connected", False) and "error" not in status_data
+        except Exception as e:
+            logger.warning(f"Blockchain status refresh failed: {e}")
+            status_data, ok = None, False
+
+        now = time.monotonic()
+        with self._lock:
+            self._checked_at = now
+            if ok:
+                if self._opened_at is not None:
+                    logger.info("Blockchain RPC recovered; circuit closed")
+                self._status = status_data
+                self._updated_at = timezone.now()
+                self._consecutive_failures = 0
+                self._opened_at = None
+                return True
+
+            if status_data is not None and (self._status is None or not self._status.get("connected")):
+                # Keep reporting why the node is unreachable
+                self._status = status_data
+                self._updated_at = timezone.now()
+            self._consecutive_failures += 1
+            state = self._circuit_state(now, config)
+            if state == CIRCUIT_HALF_OPEN or (
+                state == CIRCUIT_CLOSED and self._consecutive_failures >= config["FAILURE_THRESHOLD"]
+            ):
+                if state == CIRCUIT_CLOSED:
+                    logger.warning(
+                        f"Blockchain RPC failed {self._consecutive_failures} times in a row; "
+                        f"circuit open for {config['BREAKER_COOLDOWN']}s"
+                    )
+                self._opened_at = now
+            return False
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Blockchain status refresher crashed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _revalidate(self):
+        config = get_blockchain_status_settings()
+        now = time.monotonic()
+        with self._lock:
+            if not self._refresh_due(now, config) or self._refreshing:
+                return
+            first = self._checked_at is None
+            self._refreshing = not first
+        if first:
+            # Nothing to serve yet: the first caller probes, concurrent ones wait for it
+            with self._refresh_lock:
+                if self._checked_at is None:
+                    self._refresh_locked()
+            return
+        threading.Thread(target=self._refresh_in_background, name="blockchain-status", daemon=True).start()
+
+    def get_status(self):
+        """
+        Status dict for the status endpoint, from the snapshot.
+
+        Adds `updated_at` (ISO time the snapshot was taken),
+        `age_seconds`, `stale`, `degraded` and `circuit` to the fields of
+        BlockchainService.get_status_dict().
+        """
+        self._revalidate()
+        config = get_blockchain_status_settings()
+        now = time.monotonic()
+        with self._lock:
+            status_data = dict(self._status or {"connected": False, "error": "Blockchain status unavailable"})
+            updated_at = self._updated_at
+            circuit = self._circuit_state(now, config)
+
+        age = (timezone.now() - updated_at).total_seconds() if updated_at else None
+        degraded = circuit != CIRCUIT_CLOSED
+        if degraded:
+            status_data["connected"] = False
+        status_data.update({
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": age is None or age > config["MAX_STALE"],
+            "degraded": degraded,
+            "circuit": circuit,
+        })
+        return status_data
+
+    def is_available(self):
+        """Whether the last snapshot saw a connected node and the circuit is closed."""
+        self._revalidate()
+        config = get_blockchain_status_settings()
+        with self._lock:
+            if self._circuit_state(time.monotonic(), config) != CIRCUIT_CLOSED:
+                return False
+            return bool(self._status and self._status.get("connected"))
+
+
+_monitor = BlockchainStatusMonitor()
+
+
+def get_blockchain_status():
+    """Cached blockchain status (see BlockchainStatusMonitor.get_status)."""
+    return _monitor.get_status()
+
+
+def blockchain_available():
+    """Cached stand-in for BlockchainService.is_healthy() on request paths."""
+    return _monitor.is_available()
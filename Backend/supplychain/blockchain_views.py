@@ -14,11 +14,17 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
 
 from .models import CropBatch, BatchEvent
 from .hash_generator import generate_batch_hash
 from .blockchain_service import get_blockchain_service
+from .blockchain_status import blockchain_available, get_blockchain_status, get_blockchain_status_settings
+from .anchor_outbox import requeue_event
+from .anchor_index import get_batch_anchors, get_latest_batch_anchor
+from .event_logger import allocate_event_sequence
 from .batch_edit_views import get_tampered_fields
 
 # Configure logging
@@ -67,43 +73,50 @@ class AnchorBatchView(APIView):
             # Get optional context from request
             context = request.data.get('context', 'MANUAL_ANCHOR')
             
-            # Step 1: Generate batch hash
             logger.info(f"Manual anchor requested for batch {batch_id}")
             
-            # Determine next sequence number
-            current_event_count = BatchEvent.objects.filter(batch=batch).count()
-            next_sequence = current_event_count + 1
+            # Step 1: Record the anchor event, which assigns its sequence number
+            with transaction.atomic():
+                event = BatchEvent.objects.create(
+                    batch=batch,
+                    event_type='BLOCKCHAIN_ANCHOR',
+                    performed_by=user,
+                    sequence=allocate_event_sequence(batch),
+                    metadata={
+                        'context': context,
+                        'manual': True
+                    }
+                )
             
+            # Step 2: Generate batch hash
             snapshot_hash = generate_batch_hash(
                 batch=batch, 
                 event_type='BLOCKCHAIN_ANCHOR', 
-                event_sequence=next_sequence,
+                event_sequence=event.sequence,
                 actor_id=user.id
             )
             
-            # Step 2: Get blockchain service
+            # Step 3: Get blockchain service
             blockchain = get_blockchain_service()
             
-            # Step 3: Anchor to blockchain
-            result = blockchain.anchor_batch_hash(
-                batch_id=batch.product_batch_id,
-                snapshot_hash=snapshot_hash,
-                context=context
-            )
-            
-            # Step 4: Create BatchEvent for this anchor
-            event = BatchEvent.objects.create(
-                batch=batch,
-                event_type='BLOCKCHAIN_ANCHOR',
-                performed_by=user,
-                metadata={
-                    'transaction_hash': result['transaction_hash'],
-                    'block_number': result['block_number'],
-                    'gas_used': result['gas_used'],
-                    'context': context,
-                    'manual': True
-                }
-            )
+            # Step 4: Anchor to blockchain
+            try:
+                result = blockchain.anchor_batch_hash(
+                    batch_id=batch.product_batch_id,
+                    snapshot_hash=snapshot_hash,
+                    context=context
+                )
+            except Exception:
+                # Nothing was anchored, so the event did not happen
+                event.delete()
+                raise
+            
+            event.metadata.update({
+                'transaction_hash': result['transaction_hash'],
+                'block_number': result['block_number'],
+                'gas_used': result['gas_used']
+            })
+            event.save(update_fields=['metadata'])
             
             # Step 5: Update batch status
             batch.last_anchored_at = event.timestamp
@@ -179,8 +192,8 @@ class VerifyBatchView(APIView):
             # Get blockchain service
             blockchain = get_blockchain_service()
             
-            # Check if service is healthy
-            if not blockchain.is_healthy():
+            # Check the cached health instead of probing the node per request
+            if not blockchain_available():
                 # Still check for tampered fields from edit logs even if blockchain is unavailable
                 tampered_fields = get_tampered_fields(batch)
                 has_tampered_data = len(tampered_fields) > 0
@@ -195,7 +208,7 @@ class VerifyBatchView(APIView):
                     "tampered": has_tampered_data,
                     "tampered_fields": tampered_fields if has_tampered_data else [],
                     "message": "Data integrity check failed. Tampering detected." if has_tampered_data else "Blockchain service is not available. Verification pending.",
-                    "blockchain_record": None,
+                    "blockchain_record": get_latest_batch_anchor(batch),
                     "batch_status": {
                         "last_anchored_at": batch.last_anchored_at.isoformat() if batch.last_anchored_at else None,
                         "is_blockchain_verified": batch.is_blockchain_verified
@@ -224,6 +237,7 @@ class VerifyBatchView(APIView):
                 "stored_hash": None,  # Will be populated from verification_results
                 "tampered": not verification_result.get('verified', False) and verification_result.get('status') == 'INTEGRITY_FAILED',
                 "verification_results": verification_result.get('verification_results', []),
+                "blockchain_record": get_latest_batch_anchor(batch, blockchain),
                 "batch_status": {
                     "integrity_status": batch.integrity_status,
                     "is_blockchain_verified": batch.is_blockchain_verified,
@@ -284,7 +298,9 @@ class BatchAnchorsListView(APIView):
     GET /api/batch/{id}/anchors/
     
     Retrieve all blockchain anchors for a specific batch.
-    Returns complete anchor history from the blockchain.
+    Returns complete anchor history from the local anchor index
+    (see `manage.py sync_anchor_index`), topped up over RPC for
+    anchors mined after the last synced block.
     """
     permission_classes = []  # Public endpoint for anchor history
     
@@ -304,44 +320,17 @@ class BatchAnchorsListView(APIView):
                 Q(product_batch_id=batch_id) | Q(public_batch_id=batch_id)
             )
             
-            # Get blockchain service
+            # Get blockchain service (only used for anchors the index has not synced yet)
             blockchain = get_blockchain_service()
             
-            # Check if service is healthy
-            if not blockchain.is_healthy():
-                return Response({
-                    "success": True,
-                    "batch_id": batch.product_batch_id,
-                    "anchor_count": 0,
-                    "anchors": [],
-                    "message": "Blockchain service unavailable. No anchors loaded."
-                }, status=status.HTTP_200_OK)
-            
-            # Get anchor count
-            anchor_count = blockchain.get_anchor_count(batch.product_batch_id)
-            
-            # Retrieve all anchors
-            anchors = []
-            for i in range(anchor_count):
-                try:
-                    anchor = blockchain.get_anchor_by_index(batch.product_batch_id, i)
-                    if anchor:
-                        anchors.append({
-                            "index": i,
-                            "snapshot_hash": anchor['snapshot_hash'].hex(),
-                            "anchored_at": anchor['anchored_at'],
-                            "context": anchor['context'],
-                            "anchored_by": anchor['anchored_by']
-                        })
-                except Exception as e:
-                    logger.warning(f"Failed to retrieve anchor {i} for {batch_id}: {e}")
-                    continue
+            result = get_batch_anchors(batch, blockchain)
             
             return Response({
                 "success": True,
                 "batch_id": batch.product_batch_id,
-                "anchor_count": anchor_count,
-                "anchors": anchors
+                "anchor_count": result["anchor_count"],
+                "anchors": result["anchors"],
+                "source": result["source"]
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -365,6 +354,9 @@ class BlockchainStatusView(APIView):
     - Account balance
     - Gas prices
     - Total anchors
+
+    Served from the per-process snapshot in blockchain_status.py, which is
+    refreshed in the background at most every REFRESH_INTERVAL seconds.
     """
     permission_classes = []  # Public endpoint
     
@@ -379,12 +371,16 @@ class BlockchainStatusView(APIView):
             - wallet_loaded: bool
             - contract_address: str
             - wallet_address: str
+            - updated_at: str (time the snapshot was taken)
+            - stale: bool
+            - degraded: bool (circuit breaker open after repeated RPC failures)
         """
         try:
-            blockchain = get_blockchain_service()
-            status_data = blockchain.get_status_dict()
+            status_data = get_blockchain_status()
             status_data["success"] = True
-            return Response(status_data, status=status.HTTP_200_OK)
+            response = Response(status_data, status=status.HTTP_200_OK)
+            patch_cache_control(response, public=True, max_age=int(get_blockchain_status_settings()["REFRESH_INTERVAL"]))
+            return response
             
         except Exception as e:
             logger.error(f"Failed to get blockchain status: {e}")
@@ -405,16 +401,18 @@ class RetryAnchorView(APIView):
     
     Retry blockchain anchoring for a failed event.
     Useful when previous anchoring failed due to network issues.
+    The event is put back on the anchoring outbox and picked up by
+    the anchor worker.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request, event_id):
         """
-        Retry blockchain anchoring for an event.
+        Queue an event for another anchoring attempt.
         
         Response:
             - success: bool
-            - new_transaction_hash: str (if successful)
+            - status: str (outbox status)
             - message: str
         """
         try:
@@ -436,37 +434,15 @@ class RetryAnchorView(APIView):
                     "error": "Permission denied"
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Get blockchain service
-            blockchain = get_blockchain_service()
-            
-            # Generate hash
-            snapshot_hash = generate_batch_hash(event.batch)
-            
-            # Anchor to blockchain
-            result = blockchain.anchor_batch_hash(
-                batch_id=event.batch.product_batch_id,
-                snapshot_hash=snapshot_hash,
-                context=f"RETRY_{event.event_type}"
-            )
-            
-            # Update event
-            event.blockchain_tx_hash = result['transaction_hash']
-            event.blockchain_block_number = result['block_number']
-            event.snapshot_hash = snapshot_hash.hex()
-            
-            # Remove error from metadata if present
-            if 'blockchain_anchor_error' in event.metadata:
-                del event.metadata['blockchain_anchor_error']
-            
-            event.save(update_fields=['blockchain_tx_hash', 'blockchain_block_number', 'snapshot_hash', 'metadata'])
+            item = requeue_event(event)
             
             return Response({
                 "success": True,
-                "message": "Anchor retry successful",
+                "message": "Anchor retry queued",
                 "event_id": event_id,
-                "transaction_hash": result['transaction_hash'],
-                "block_number": result['block_number']
-            }, status=status.HTTP_200_OK)
+                "status": item.status,
+                "attempts": item.attempts
+            }, status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             logger.error(f"Anchor retry failed for event {event_id}: {e}")
@@ -2,6 +2,8 @@
 Views for Bulk Batch Split functionality.
 Allows distributors to divide a batch into multiple smaller batches atomically.
 """
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
 from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,9 +12,14 @@ from rest_framework.permissions import IsAuthenticated
 import uuid
 
 from . import models
-from .event_logger import log_batch_event
+from .db_file_fields import copy_file_fields
+from .transitions import Transition
+from .transport_fees import inherited_transport_fee
 from .models import BatchEventType, BatchStatus, StakeholderRole
 
+# Precision of CropBatch.quantity
+QUANTITY_PLACES = Decimal('0.01')
+
 
 class BulkSplitBatchView(APIView):
     """
@@ -82,21 +89,22 @@ class BulkSplitBatchView(APIView):
                         status=status.HTTP_403_FORBIDDEN
                     )
 
-                # Quantity Validation
-                parent_quantity = float(parent_batch.quantity)
-                total_child_quantity = 0.0
+                # Quantity Validation, in Decimal at the precision of the quantity column
+                parent_quantity = parent_batch.quantity
+                child_quantities = []
                 for s in splits:
                     try:
-                        total_child_quantity += float(s.get('quantity', 0))
-                    except (ValueError, TypeError):
+                        quantity = Decimal(str(s.get('quantity', 0))).quantize(QUANTITY_PLACES, rounding=ROUND_HALF_UP)
+                    except (InvalidOperation, ValueError, TypeError, AttributeError):
                         return Response(
                             {"success": False, "message": "Invalid quantity in one of the splits."},
                             status=status.HTTP_400_BAD_REQUEST
                         )
+                    child_quantities.append(quantity)
 
-                # Allow a very tiny margin for floating point errors if necessary, 
-                # but business logic says it must match parent. Let's be strict but use round.
-                if round(total_child_quantity, 2) != round(parent_quantity, 2):
+                # The children's stored quantities must add up to the parent's exactly
+                total_child_quantity = sum(child_quantities, Decimal('0'))
+                if total_child_quantity != parent_quantity:
                     return Response(
                         {
                             "success": False, 
@@ -106,60 +114,65 @@ class BulkSplitBatchView(APIView):
                     )
 
                 created_children = []
-                # Create Child Batches
-                for split_info in splits:
-                    child_batch = models.CropBatch.objects.create(
-                        farmer=parent_batch.farmer,
-                        current_owner=request.user,
-                        status=BatchStatus.STORED,
-                        farm_location=parent_batch.farm_location,
-                        is_child_batch=True,
-                        parent_batch=parent_batch,
-                        crop_type=parent_batch.crop_type,
-                        quantity=split_info['quantity'],
-                        harvest_date=parent_batch.harvest_date,
-                        farmer_base_price_per_unit=parent_batch.farmer_base_price_per_unit,
-                        distributor_margin_per_unit=parent_batch.distributor_margin_per_unit,
-                    )
-                    
-                    # Create split record
-                    models.BatchSplit.objects.create(
-                        parent_batch=parent_batch,
-                        split_label=split_info.get('label', f"Split from {parent_batch.product_batch_id}"),
-                        quantity=split_info['quantity'],
-                        child_batch=child_batch,
-                        notes=split_info.get('notes', '')
-                    )
-                    
-                    # Log creation of child batch
-                    log_batch_event(
-                        batch=child_batch,
-                        event_type=BatchEventType.CREATED,
-                        user=request.user,
+                # Children point at the parent's documents in the blob store
+                shared_documents = copy_file_fields(parent_batch, models.CropBatch.SHARED_DOCUMENT_FIELDS)
+                # Children, split records and events are written with one INSERT each; their
+                # anchors go to the outbox (Merkle-batched in merkle mode), not the request
+                with Transition(request.user, defer_anchoring=True) as transition:
+                    # Create Child Batches
+                    for split_info, quantity in zip(splits, child_quantities):
+                        child_batch = models.CropBatch(
+                            **shared_documents,
+                            **inherited_transport_fee(parent_batch),
+                            farmer=parent_batch.farmer,
+                            current_owner=request.user,
+                            status=BatchStatus.STORED,
+                            farm_location=parent_batch.farm_location,
+                            is_child_batch=True,
+                            parent_batch=parent_batch,
+                            crop_type=parent_batch.crop_type,
+                            quantity=quantity,
+                            harvest_date=parent_batch.harvest_date,
+                            farmer_base_price_per_unit=parent_batch.farmer_base_price_per_unit,
+                            distributor_margin_per_unit=parent_batch.distributor_margin_per_unit,
+                        )
+                        child_batch.assign_identifiers()
+                        transition.add(child_batch)
+                        
+                        # Create split record
+                        transition.add(models.BatchSplit(
+                            parent_batch=parent_batch,
+                            split_label=split_info.get('label', f"Split from {parent_batch.product_batch_id}"),
+                            quantity=quantity,
+                            child_batch=child_batch,
+                            notes=split_info.get('notes', '')
+                        ))
+                        
+                        # Log creation of child batch
+                        transition.log_event(
+                            child_batch,
+                            BatchEventType.CREATED,
+                            metadata={
+                                "action": "SPLIT_FROM_PARENT",
+                                "parent_batch_id": parent_batch.product_batch_id
+                            }
+                        )
+                        created_children.append(child_batch)
+
+                    # Update Parent Batch
+                    old_status = parent_batch.status
+                    transition.update(parent_batch, status=BatchStatus.FULLY_SPLIT, quantity=0)
+
+                    # Log parent split event
+                    transition.log_event(
+                        parent_batch,
+                        BatchEventType.FULLY_SPLIT,
                         metadata={
-                            "action": "SPLIT_FROM_PARENT",
-                            "parent_batch_id": parent_batch.product_batch_id
+                            "old_status": old_status,
+                            "child_count": len(created_children),
+                            "child_batch_ids": [c.product_batch_id for c in created_children]
                         }
                     )
-                    created_children.append(child_batch)
-
-                # Update Parent Batch
-                old_status = parent_batch.status
-                parent_batch.status = BatchStatus.FULLY_SPLIT
-                parent_batch.quantity = 0
-                parent_batch.save()
-
-                # Log parent split event
-                log_batch_event(
-                    batch=parent_batch,
-                    event_type=BatchEventType.FULLY_SPLIT,
-                    user=request.user,
-                    metadata={
-                        "old_status": old_status,
-                        "child_count": len(created_children),
-                        "child_batch_ids": [c.product_batch_id for c in created_children]
-                    }
-                )
 
                 return Response(
                     {
@@ -1,9 +1,16 @@
+import hashlib
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 from . import models
+from .file_serving import build_file_url, file_representation, wants_data_uri
+from .trace_lookup import MODES, resolve_trace_batch
+from .trace_snapshots import build_trace_document, get_trace_snapshot, get_trace_snapshot_settings
 
 
 class BatchTraceView(APIView):
@@ -14,23 +21,21 @@ class BatchTraceView(APIView):
     permission_classes = []  # Public endpoint
     
     def get(self, request, public_id):
-        # Get batch by public_batch_id OR product_batch_id (human readable)
-        from django.db.models import Q
-        try:
-            # We first try exact matches, then fallback to partial product_batch_id matches.
-            # Using first() after order_by('-created_at') to ensure we get a result.
-            batch = models.CropBatch.objects.select_related(
-                'farmer__user', 
-                'parent_batch'
-            ).filter(
-                Q(public_batch_id__iexact=public_id) | 
-                Q(product_batch_id__iexact=public_id) |
-                Q(product_batch_id__icontains=public_id)
-            ).order_by('-created_at').first()
-            
-            if not batch:
-                raise models.CropBatch.DoesNotExist
-        except models.CropBatch.DoesNotExist:
+        # Get batch by public_batch_id OR product_batch_id (human readable), any case.
+        # ?match=prefix also accepts the start of a product_batch_id (newest match wins).
+        match = request.query_params.get('match', 'exact')
+        if match not in MODES:
+            return Response(
+                {"success": False, "message": f"match must be one of: {', '.join(MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        batch = resolve_trace_batch(
+            public_id,
+            mode=match,
+            queryset=models.CropBatch.objects.select_related('farmer__user', 'parent_batch', 'trace_snapshot'),
+        )
+        if batch is None:
             return Response(
                 {"success": False, "message": "Batch not found or not listed for sale."},
                 status=status.HTTP_404_NOT_FOUND
@@ -45,89 +50,23 @@ class BatchTraceView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Fetch Listing for price breakdown and retailer info
-        listing = models.RetailListing.objects.select_related(
-            'retailer__user'
-        ).filter(batch=batch).last()
-        
-        # Calculate parent batch quantity if split
-        parent_qty = batch.quantity
-        if batch.is_child_batch and batch.parent_batch:
-            parent_qty = batch.parent_batch.quantity
-
-        # Fetch Timeline from BatchEvents
-        # Sorted oldest to newest
-        events = models.BatchEvent.objects.filter(batch=batch).order_by('timestamp')
-        timeline = []
-        for event in events:
-            timeline.append({
-                "stage": event.get_event_type_display(),
-                "actor": event.performed_by.username if event.performed_by else "System",
-                "timestamp": event.timestamp.isoformat()
-            })
+        if wants_data_uri(request):
+            # Inline QR data URIs are not part of the snapshot
+            response_data = build_trace_document(batch)
+            response_data["qr_code_url"] = file_representation(batch, "qr_code_image", request)
+            return Response(response_data, status=status.HTTP_200_OK)
 
-        # Fetch stakeholder info from TransportRequests
-        transport_requests = models.TransportRequest.objects.select_related(
-            'transporter__user',
-            'to_party__user',
-            'from_party__user',
-        ).filter(batch=batch).order_by('created_at')
+        snapshot = get_trace_snapshot(batch)
+        qr_code_url = build_file_url(batch, "qr_code_image", request) if snapshot.has_qr_code else None
+        etag = quote_etag(hashlib.sha256(f"{snapshot.etag}:{qr_code_url}".encode()).hexdigest())
 
-        # First transport request (farmer → distributor leg)
-        transporter_data = None
-        distributor_data = None
-        for tr in transport_requests:
-            if tr.transporter and transporter_data is None:
-                transporter_data = {
-                    "name": tr.transporter.user.username,
-                    "company_name": tr.transporter.organization or tr.transporter.user.username,
-                    "pickup_date": tr.pickup_at.isoformat() if tr.pickup_at else None,
-                    "delivery_date": tr.delivered_at.isoformat() if tr.delivered_at else None,
-                    "vehicle_details": tr.vehicle_details or None,
-                }
-            # The distributor is the to_party of the first transport request to a distributor
-            if tr.to_party and tr.to_party.role == 'distributor' and distributor_data is None:
-                distributor_data = {
-                    "name": tr.to_party.user.username,
-                    "company_name": tr.to_party.organization or tr.to_party.user.username,
-                    "location": tr.to_party.address or None,
-                }
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response({**snapshot.document, "qr_code_url": qr_code_url}, status=status.HTTP_200_OK)
+        return self._with_cache_headers(response, etag)
 
-        # Retailer info from listing
-        retailer_data = None
-        if listing and listing.retailer:
-            retailer_data = {
-                "name": listing.retailer.user.username,
-                "shop_name": listing.retailer.organization or listing.retailer.user.username,
-                "location": listing.retailer.address or None,
-                "listed_date": listing.created_at.isoformat() if listing.created_at else None,
-            }
-        
-        # Build response according to SPEC
-        response_data = {
-            "product_name": batch.crop_type,
-            "batch_id": batch.product_batch_id,
-            "quantity": f"{batch.quantity} kg",
-            "retail_price": listing.total_price if listing else 0,
-            "status": batch.get_status_display(),
-            "origin": {
-                "farmer_name": batch.farmer.user.username,
-                "farm_location": batch.farm_location,
-                "harvest_date": batch.harvest_date.isoformat(),
-                "parent_batch_quantity": f"{parent_qty} kg"
-            },
-            "transporter": transporter_data,
-            "distributor": distributor_data,
-            "retailer": retailer_data,
-            "price_breakdown": {
-                "farmer_price": float(listing.farmer_base_price) if listing else 0,
-                "transport_cost": float(listing.transport_fees) if listing else 0,
-                "distributor_margin": float(listing.distributor_margin) if listing else 0,
-                "retailer_margin": float(listing.retailer_margin) if listing else 0,
-                "total_price": float(listing.total_price) if listing else 0
-            },
-            "timeline": timeline,
-            "qr_code_url": batch.qr_code_image.url if batch.qr_code_image else None
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+    def _with_cache_headers(self, response, etag):
+        config = get_trace_snapshot_settings()
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=config["MAX_AGE"], s_maxage=config["SHARED_MAX_AGE"])
+        return response
@@ -0,0 +1,34 @@
+"""
+Postgres backend with timed connection setup.
+
+Django's postgresql backend (persistent connections, health checks and the
+psycopg 3 pool all work unchanged) that reports the time spent opening
+connections and health-checking reused ones to supplychain.server_timing:
+
+    DATABASES = {"default": {"ENGINE": "supplychain.db_backends.postgresql", ...}}
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from supplychain.server_timing import record_timing
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        # A new TLS + SCRAM handshake, or a connection taken from the pool
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_timing("db-connect", time.perf_counter() - start)
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or not self.health_check_enabled or self.health_check_done:
+            return
+        start = time.perf_counter()
+        try:
+            super().close_if_health_check_failed()
+        finally:
+            record_timing("db-health", time.perf_counter() - start)
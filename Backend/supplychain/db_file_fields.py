@@ -1,28 +1,138 @@
 """
 Custom database file storage fields for storing files in PostgreSQL BYTEA columns.
 Uses base64 encoding for JSON serialization.
+
+When the blob store is enabled (settings.BLOB_STORE), the column holds a
+short pointer to a content-addressed StoredBlob instead of the bytes, so
+identical files are stored once. See blob_store.py.
 """
 
 import base64
+import hashlib
 import mimetypes
+import time
 from io import BytesIO
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import signals
 from django.db.models.fields.files import FieldFile
 
+# Column value of a file kept in the blob store: prefix + 64 hex chars of SHA-256.
+# Starts with a NUL byte, which none of the uploaded formats begin with.
+BLOB_POINTER_PREFIX = b'\x00blob:sha256:'
+_BLOB_POINTER_LENGTH = len(BLOB_POINTER_PREFIX) + 64
+
+# Leading bytes of the formats users upload, for when no content type was stored
+_MAGIC_CONTENT_TYPES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_content_type(data):
+    """Guess a content type from the first bytes of file data."""
+    if not data:
+        return 'application/octet-stream'
+    head = bytes(data[:16])
+    for magic, content_type in _MAGIC_CONTENT_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def make_blob_pointer(sha256):
+    """Column value that refers to a stored blob."""
+    return BLOB_POINTER_PREFIX + sha256.encode('ascii')
+
+
+def parse_blob_pointer(value):
+    """SHA-256 hex of a blob pointer column value, or None for inline file bytes."""
+    if value is None or len(value) != _BLOB_POINTER_LENGTH:
+        return None
+    value = bytes(value)
+    if not value.startswith(BLOB_POINTER_PREFIX):
+        return None
+    return value[len(BLOB_POINTER_PREFIX):].decode('ascii')
+
+
+def compute_file_metadata(data, content_type=None):
+    """
+    Metadata stored next to a file column.
+
+    Returns:
+        dict or None: {"size", "content_type", "sha256"}, None for an empty file
+    """
+    if not data:
+        return None
+    if not content_type or content_type == 'application/octet-stream':
+        content_type = sniff_content_type(data)
+    return {
+        "size": len(data),
+        "content_type": content_type,
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def file_metadata_attname(field_name):
+    """Name of the FileMetadataField that describes a file field."""
+    return f"{field_name}_meta"
+
+
+def get_file_metadata(instance, field_name):
+    """Stored size/content type/hash of a file field, without loading the file."""
+    return getattr(instance, file_metadata_attname(field_name), None)
+
+
+def copy_file_fields(source, field_names):
+    """
+    Model kwargs that give a new instance the same files as `source`.
+
+    Blob-backed files are shared by pointer (the blob's refcount goes up
+    on save) and their metadata is copied, so no file data is loaded.
+    """
+    kwargs = {}
+    for name in field_names:
+        value = getattr(source, name)
+        if value:
+            kwargs[name] = value
+            kwargs[file_metadata_attname(name)] = get_file_metadata(source, name)
+    return kwargs
+
 
 class DatabaseFile:
-    """Wrapper for file data stored in database."""
+    """
+    Wrapper for file data stored in database.
+
+    Files kept in the blob store carry only `blob_sha`; their data is
+    read from the store on first access.
+    """
     
-    def __init__(self, data=None, name=None, content_type=None):
-        self.data = data
+    def __init__(self, data=None, name=None, content_type=None, blob_sha=None):
+        self._data = data
         self.name = name
         self.content_type = content_type or 'application/octet-stream'
-        self._size = len(data) if data else 0
+        self.blob_sha = blob_sha
+    
+    @property
+    def data(self):
+        if self._data is None and self.blob_sha:
+            from .blob_store import read_blob
+            self._data = read_blob(self.blob_sha)
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self.blob_sha = None
     
     @property
     def size(self):
-        return self._size
+        return len(self.data) if self else 0
     
     @property
     def url(self):
@@ -44,7 +154,7 @@ class DatabaseFile:
         return BytesIO(self.data) if self.data else None
     
     def __bool__(self):
-        return bool(self.data)
+        return bool(self.blob_sha) or bool(self._data)
 
 
 class DatabaseFileField(models.BinaryField):
@@ -66,12 +176,52 @@ class DatabaseFileField(models.BinaryField):
         kwargs.pop('storage', None)
         return name, path, args, kwargs
     
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            signals.pre_delete.connect(self._release_blob_on_delete, sender=cls)
+    
     def from_db_value(self, value, expression, connection):
         """Convert database value to Python object."""
         if value is None:
             return None
+        blob_sha = parse_blob_pointer(value)
+        if blob_sha:
+            return DatabaseFile(blob_sha=blob_sha)
         return DatabaseFile(data=bytes(value))
     
+    def _stored_blob_sha(self, model_instance):
+        """SHA of the blob the saved row points to, from the metadata column."""
+        metadata = getattr(model_instance, file_metadata_attname(self.name), None)
+        return metadata.get('sha256') if metadata and metadata.get('blob') else None
+    
+    def pre_save(self, model_instance, add):
+        """Move the file into the blob store and keep blob refcounts in step."""
+        value = self.to_python(super().pre_save(model_instance, add))
+        from .blob_store import acquire_blob, blob_store_enabled, release_blob
+        
+        # The metadata column records what the saved row points to; without
+        # one there is nothing to refcount against, so files stay inline.
+        has_metadata = hasattr(model_instance, file_metadata_attname(self.name))
+        if not has_metadata or not blob_store_enabled():
+            return value
+        
+        old_sha = None if add else self._stored_blob_sha(model_instance)
+        if value and not (value.blob_sha and value.blob_sha == old_sha):
+            acquire_blob(value)
+        new_sha = value.blob_sha if value else None
+        if old_sha and old_sha != new_sha:
+            release_blob(old_sha)
+        
+        setattr(model_instance, self.attname, value)
+        return value
+    
+    def _release_blob_on_delete(self, sender, instance, **kwargs):
+        from .blob_store import release_blob
+        blob_sha = self._stored_blob_sha(instance)
+        if blob_sha:
+            release_blob(blob_sha)
+    
     def to_python(self, value):
         """Convert value to Python object."""
         if value is None:
@@ -94,6 +244,8 @@ class DatabaseFileField(models.BinaryField):
         if value is None:
             return None
         if isinstance(value, DatabaseFile):
+            if value.blob_sha:
+                return make_blob_pointer(value.blob_sha)
             return value.data
         if isinstance(value, bytes):
             return value
@@ -117,8 +269,117 @@ class DatabaseFileField(models.BinaryField):
         return None
 
 
+class DatabaseFileModelMixin:
+    """
+    Saves rows with DatabaseFileFields in a transaction.
+
+    DatabaseFileField.pre_save changes blob refcounts before the row's
+    INSERT/UPDATE runs; inside the same transaction those changes roll
+    back when the write fails, instead of leaving a released blob the row
+    still points at.
+
+        class KYCRecord(DatabaseFileModelMixin, models.Model):
+    """
+
+    def save_base(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save_base(*args, using=using, **kwargs)
+
+
 class DatabaseImageField(DatabaseFileField):
     """
     A field for storing image data in the database as BYTEA.
     """
     pass
+
+
+class FileMetadataField(models.JSONField):
+    """
+    Size, content type, SHA-256 and upload time (unix seconds, "uploaded_at")
+    of a DatabaseFileField, kept in a small JSON column so they can be read
+    without loading the file itself.
+
+    Refreshed on save whenever the source file column is loaded on the
+    instance (i.e. it was read or assigned); deferred files keep their
+    stored metadata.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        source = model_instance._meta.get_field(self.source)
+        if source.attname not in model_instance.__dict__:
+            return getattr(model_instance, self.attname)
+
+        value = model_instance.__dict__[source.attname]
+        current = getattr(model_instance, self.attname)
+        blob_sha = value.blob_sha if isinstance(value, DatabaseFile) else None
+        if blob_sha and current and current.get('sha256') == blob_sha and current.get('blob'):
+            # Unchanged or shared blob: nothing to recompute, no data to load
+            return current
+
+        if isinstance(value, DatabaseFile):
+            metadata = compute_file_metadata(value.data, value.content_type)
+        else:
+            metadata = compute_file_metadata(source.get_prep_value(value))
+
+        if metadata and current and current.get('sha256') == metadata['sha256']:
+            # Same file re-saved; keep the content type and time recorded at upload
+            metadata = dict(current)
+        if metadata:
+            metadata.setdefault('uploaded_at', int(time.time()))
+            metadata.pop('blob', None)
+            if blob_sha:
+                metadata['blob'] = True
+        setattr(model_instance, self.attname, metadata)
+        return metadata
+
+
+def _database_file_fields(model):
+    return [f.name for f in model._meta.concrete_fields if isinstance(f, DatabaseFileField)]
+
+
+class DeferredFileQuerySet(models.QuerySet):
+    """
+    QuerySet that leaves DatabaseFileField columns unloaded, including on
+    models joined through select_related(). Accessing a deferred file
+    fetches just that column; only() still loads exactly what it names.
+    """
+
+    def select_related(self, *fields):
+        clone = super().select_related(*fields)
+        deferred = []
+        for lookup in fields or ():
+            model, path = self.model, []
+            for part in (lookup or '').split('__'):
+                try:
+                    model = model._meta.get_field(part).related_model
+                except Exception:
+                    # Invalid lookups are reported by select_related itself
+                    break
+                if model is None:
+                    break
+                path.append(part)
+                prefix = '__'.join(path)
+                deferred.extend(f"{prefix}__{name}" for name in _database_file_fields(model))
+        return clone.defer(*deferred) if deferred else clone
+
+
+class DeferredFileManager(models.Manager.from_queryset(DeferredFileQuerySet)):
+    """Default manager for models with file columns: files load on first access."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        file_fields = _database_file_fields(self.model)
+        return queryset.defer(*file_fields) if file_fields else queryset
@@ -0,0 +1,80 @@
+"""
+Read/Write Database Routing
+
+When DB_REPLICA_HOST is set, settings.py adds a "replica" alias (a Neon
+read replica or any hot standby) next to "default". PrimaryReplicaRouter
+sends reads there, with read-your-writes semantics per request:
+
+- writes always go to "default"
+- once a request has written, its later reads go to "default" too, so it
+  never reads a replica that has not caught up with its own write
+- reads inside transaction.atomic() go to "default" (the transaction's
+  connection)
+- use_primary() forces "default" for a block, e.g. for reads that must
+  see another request's latest write
+
+PinToPrimaryMiddleware resets the per-request state. Without a replica
+alias every query goes to "default".
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+
+# Whether the current request has written (outside requests: the thread)
+_wrote = ContextVar("db_wrote", default=False)
+# Whether a use_primary() block is open
+_forced = ContextVar("db_use_primary", default=False)
+
+
+@contextmanager
+def use_primary():
+    """Route the reads of the block to the primary."""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_configured() or _wrote.get() or _forced.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes for the rest of the request
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PinToPrimaryMiddleware:
+    """Start each request reading from the replica again."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _wrote.reset(token)
@@ -2,8 +2,8 @@
 Distributor Dashboard Views
 Provides analytics and metrics specific to the logged-in distributor.
 """
-from django.db.models import Count, Sum, Q
-from django.db.models.functions import TruncMonth
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,7 +11,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
 from . import models
-from .models import StakeholderRole, CropBatch, TransportRequest
+from .models import StakeholderRole
+from .payment_analytics import get_payment_summary
+from .response_cache import cache_response
+from .stakeholder_metrics import OUTGOING_TRANSPORTS, OWNED_BATCHES, ProfileMetrics
+
+CENTS = Decimal('0.01')
 
 
 class DistributorDashboardView(APIView):
@@ -23,6 +28,7 @@ class DistributorDashboardView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cache_response("distributor_dashboard")
     def get(self, request):
         # Verify user is a distributor
         try:
@@ -38,8 +44,9 @@ class DistributorDashboardView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get batches where distributor is the current owner
-        distributor_batches = CropBatch.objects.filter(current_owner=request.user)
+        # Totals come from the StakeholderMetrics rollup (one query);
+        # OWNED_BATCHES are the batches this distributor currently owns
+        metrics = ProfileMetrics(profile)
 
         # --- METRICS SECTION ---
         # Incoming Batches: Delivered to distributor but not yet stored
@@ -48,105 +55,79 @@ class DistributorDashboardView(APIView):
             'ARRIVED_AT_DISTRIBUTOR',
             'ARRIVAL_CONFIRMED_BY_DISTRIBUTOR'
         ]
-        incoming_batches = distributor_batches.filter(
-            status__in=incoming_statuses
-        ).count()
+        incoming_batches = metrics.count(OWNED_BATCHES, statuses=incoming_statuses)
 
         # Current Inventory: Stored or fully split batches
         inventory_statuses = ['STORED', 'FULLY_SPLIT']
-        inventory_count = distributor_batches.filter(
-            status__in=inventory_statuses
-        ).count()
+        inventory_count = metrics.count(OWNED_BATCHES, statuses=inventory_statuses)
 
         # Current Inventory Quantity (in kg)
-        inventory_quantity_result = distributor_batches.filter(
-            status__in=inventory_statuses
-        ).aggregate(total=Sum('quantity'))
-        inventory_quantity = float(inventory_quantity_result['total'] or 0)
+        inventory_quantity = float(metrics.quantity(OWNED_BATCHES, statuses=inventory_statuses))
 
         # Outgoing Shipments: Transport requests initiated by distributor
-        outgoing_requests = TransportRequest.objects.filter(
-            from_party=profile
-        ).exclude(
-            status__in=['DELIVERED', 'REJECTED']
-        ).count()
+        outgoing_requests = metrics.count(
+            OUTGOING_TRANSPORTS, exclude_statuses=['DELIVERED', 'REJECTED']
+        )
 
         # Total Outgoing (all time)
-        total_outgoing = TransportRequest.objects.filter(
-            from_party=profile,
-            status='DELIVERED'
-        ).count()
+        total_outgoing = metrics.count(OUTGOING_TRANSPORTS, statuses=['DELIVERED'])
 
         # Total Revenue: Sum of distributor margin from delivered batches
-        # Calculate from batches where distributor stored them
-        stored_batches = distributor_batches.filter(
+        # Calculate from batches where distributor stored them, summed from
+        # the batches themselves rather than the rollup
+        total_revenue = models.CropBatch.objects.filter(
+            current_owner=request.user,
             status__in=['STORED', 'FULLY_SPLIT', 'TRANSPORT_REQUESTED_TO_RETAILER',
-                       'IN_TRANSIT_TO_RETAILER', 'ARRIVED_AT_RETAILER',
-                       'ARRIVAL_CONFIRMED_BY_RETAILER', 'DELIVERED_TO_RETAILER', 'LISTED', 'SOLD']
-        )
-        total_revenue = sum(
-            float(batch.quantity) * float(batch.distributor_margin_per_unit)
-            for batch in stored_batches
-        ) if stored_batches.exists() else 0
+                        'IN_TRANSIT_TO_RETAILER', 'ARRIVED_AT_RETAILER',
+                        'ARRIVAL_CONFIRMED_BY_RETAILER', 'DELIVERED_TO_RETAILER', 'LISTED', 'SOLD']
+        ).margin_for_distributor()
 
         # --- INVENTORY DISTRIBUTION (for Doughnut Chart) ---
         # Group inventory by crop_type
-        inventory_by_crop = distributor_batches.filter(
-            status__in=inventory_statuses
-        ).values('crop_type').annotate(
-            count=Count('id'),
-            total_quantity=Sum('quantity')
-        ).order_by('-total_quantity')
+        inventory_by_crop = sorted(
+            metrics.group(OWNED_BATCHES, by='dimension', statuses=inventory_statuses).items(),
+            key=lambda item: -item[1][1]
+        )
 
         inventory_distribution = {}
-        for item in inventory_by_crop:
-            crop = item['crop_type']
+        for crop, (count, quantity, _) in inventory_by_crop:
             inventory_distribution[crop] = {
-                'count': item['count'],
-                'quantity': float(item['total_quantity'] or 0)
+                'count': count,
+                'quantity': float(quantity)
             }
 
         # --- MONTHLY ACTIVITY (for Bar/Line Chart) ---
         # Get monthly incoming and outgoing counts for the last 12 months
-        twelve_months_ago = timezone.now() - timezone.timedelta(days=365)
+        twelve_months_ago = (timezone.now() - timezone.timedelta(days=365)).date().replace(day=1)
 
         # Incoming: Batches delivered to distributor by month
-        incoming_monthly = distributor_batches.filter(
-            status__in=['DELIVERED_TO_DISTRIBUTOR', 'STORED', 'FULLY_SPLIT'],
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
+        incoming_monthly = metrics.group(
+            OWNED_BATCHES, by='month',
+            statuses=['DELIVERED_TO_DISTRIBUTOR', 'STORED', 'FULLY_SPLIT'],
+            since=twelve_months_ago
+        )
 
         # Outgoing: Transport requests to retailers by month
-        outgoing_monthly = TransportRequest.objects.filter(
-            from_party=profile,
-            status__in=['DELIVERED', 'IN_TRANSIT_TO_RETAILER', 'ARRIVED_AT_RETAILER'],
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
+        outgoing_monthly = metrics.group(
+            OUTGOING_TRANSPORTS, by='month',
+            statuses=['DELIVERED', 'IN_TRANSIT_TO_RETAILER', 'ARRIVED_AT_RETAILER'],
+            since=twelve_months_ago
+        )
 
         # Build monthly activity map
         months_set = set()
         incoming_map = {}
         outgoing_map = {}
 
-        for item in incoming_monthly:
-            if item['month']:
-                month_key = item['month'].strftime('%b')
-                months_set.add(month_key)
-                incoming_map[month_key] = item['count']
+        for month, (count, _, _) in sorted(incoming_monthly.items()):
+            month_key = month.strftime('%b')
+            months_set.add(month_key)
+            incoming_map[month_key] = count
 
-        for item in outgoing_monthly:
-            if item['month']:
-                month_key = item['month'].strftime('%b')
-                months_set.add(month_key)
-                outgoing_map[month_key] = item['count']
+        for month, (count, _, _) in sorted(outgoing_monthly.items()):
+            month_key = month.strftime('%b')
+            months_set.add(month_key)
+            outgoing_map[month_key] = count
 
         # Sort months chronologically (Jan, Feb, Mar, etc.)
         month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
@@ -160,23 +141,11 @@ class DistributorDashboardView(APIView):
         }
 
         # --- PAYMENT-DERIVED FINANCIAL METRICS ---
-        from .models import Payment, PaymentStatus, PaymentType, StakeholderRole as SR
-        
-        paid_to_farmers = Payment.objects.filter(
-            payer=profile, payee_role=SR.FARMER, status=PaymentStatus.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        received_from_retailers = Payment.objects.filter(
-            payee=profile, payer_role=SR.RETAILER, status=PaymentStatus.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        paid_transport = Payment.objects.filter(
-            payer=profile, payment_type=PaymentType.TRANSPORT_SHARE, status=PaymentStatus.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        pending_payments_count = Payment.objects.filter(
-            payer=profile, status=PaymentStatus.PENDING
-        ).count()
+        payments = get_payment_summary(profile)
+        paid_to_farmers = payments.paid_to_farmers
+        received_from_retailers = payments.received_from_retailers
+        paid_transport = payments.paid_transport
+        pending_payments_count = payments.paid_pending_count
 
         # Build response
         response_data = {
@@ -186,7 +155,7 @@ class DistributorDashboardView(APIView):
                 'inventory_quantity': round(inventory_quantity, 2),
                 'outgoing_shipments': outgoing_requests,
                 'total_outgoing': total_outgoing,
-                'total_revenue': round(total_revenue, 2),
+                'total_revenue': float(total_revenue.quantize(CENTS, rounding=ROUND_HALF_UP)),
             },
             'financial': {
                 'paid_to_farmers': float(paid_to_farmers),
@@ -8,7 +8,7 @@ from rest_framework.permissions import IsAuthenticated
 
 from . import models
 from .batch_validators import BatchStatusTransitionValidator
-from .event_logger import log_batch_event
+from .transitions import Transition
 from .models import BatchEventType, BatchStatus, PaymentStatus, FinancialStatus
 from .view_utils import check_batch_locked
 
@@ -83,20 +83,15 @@ class StoreBatchView(APIView):
         print(f"DEBUG: StoreBatchView request.data={request.data}")
         margin = request.data.get('distributor_margin_per_unit', 0)
         try:
-            batch.distributor_margin_per_unit = float(margin)
+            margin = float(margin)
         except (ValueError, TypeError):
-            batch.distributor_margin_per_unit = 0
+            margin = 0
             
-        batch.status = BatchStatus.STORED
-        batch.save()
-        
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.STORED,
-            user=request.user,
-            metadata={}
-        )
+        with Transition(request.user) as transition:
+            transition.update(batch, distributor_margin_per_unit=margin, status=BatchStatus.STORED)
+            
+            # Log event
+            transition.log_event(batch, BatchEventType.STORED, metadata={})
         
         return Response({
             "success": True,
@@ -183,29 +178,28 @@ class RequestTransportToRetailerView(APIView):
         if is_locked:
             return lock_response
         
-        # Create transport request
-        transport_request = models.TransportRequest.objects.create(
-            batch=batch,
-            requested_by=distributor_profile,
-            from_party=distributor_profile,
-            to_party=retailer,
-            status='PENDING'
-        )
-        
-        # Update batch status
-        batch.status = BatchStatus.TRANSPORT_REQUESTED_TO_RETAILER
-        batch.save()
-        
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.TRANSPORT_REQUESTED_TO_RETAILER,
-            user=request.user,
-            metadata={
-                'retailer': retailer.user.username,
-                'transport_request_id': transport_request.id,
-            }
-        )
+        with Transition(request.user) as transition:
+            # Create transport request (its id goes into the event metadata)
+            transport_request = models.TransportRequest.objects.create(
+                batch=batch,
+                requested_by=distributor_profile,
+                from_party=distributor_profile,
+                to_party=retailer,
+                status='PENDING'
+            )
+            
+            # Update batch status
+            transition.update(batch, status=BatchStatus.TRANSPORT_REQUESTED_TO_RETAILER)
+            
+            # Log event
+            transition.log_event(
+                batch,
+                BatchEventType.TRANSPORT_REQUESTED_TO_RETAILER,
+                metadata={
+                    'retailer': retailer.user.username,
+                    'transport_request_id': transport_request.id,
+                }
+            )
         
         return Response({
             "success": True,
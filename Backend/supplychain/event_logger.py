@@ -3,7 +3,13 @@ Helper utilities for batch event logging.
 Integrates with blockchain for critical event anchoring.
 """
 import logging
-from supplychain.models import BatchEvent, BatchEventType
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from supplychain.anchor_outbox import enqueue_event_anchors
+from supplychain.models import BatchEvent, BatchEventType, CropBatch
+from supplychain.response_cache import invalidate_batch_stakeholders, invalidate_global
+from supplychain.trace_snapshots import refresh_trace_snapshot
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,23 +26,48 @@ CRITICAL_BLOCKCHAIN_EVENTS = {
 }
 
 
-def log_batch_event(batch, event_type, user, metadata=None, anchor_to_blockchain=True):
+def allocate_event_sequence(batch):
     """
-    Create a batch event log entry.
+    Return the next per-batch event sequence number.
     
-    For critical events, automatically anchors a hash of the batch data
-    to the blockchain for tamper-proof verification.
-    
-    Args:
-        batch: CropBatch instance
-        event_type: BatchEventType choice
-        user: User who performed the action
-        metadata: Optional dict with additional context
-        anchor_to_blockchain: Whether to anchor critical events (default: True)
+    Must be called inside the transaction that creates the event. The
+    batch row is locked so concurrent events on the same batch get
+    distinct, gap-free numbers; the current maximum is an index lookup
+    on (batch, sequence). Batches whose older events predate the
+    sequence column continue from their event count until
+    `manage.py backfill_event_sequences` has run.
+    """
+    return allocate_event_sequences([batch.pk])[batch.pk]
+
+
+def allocate_event_sequences(batch_ids):
+    """
+    Next event sequence number of each batch, with one lock and one
+    aggregate query for all of them (see allocate_event_sequence).
     
     Returns:
-        BatchEvent instance
+        dict: batch id -> next sequence number
     """
+    batch_ids = sorted(set(batch_ids))
+    # Locked in id order so concurrent callers cannot deadlock
+    locked = list(CropBatch.objects.select_for_update().filter(pk__in=batch_ids).order_by('pk').values_list('pk', flat=True))
+    if len(locked) != len(batch_ids):
+        raise CropBatch.DoesNotExist(f"Batches not found: {sorted(set(batch_ids) - set(locked))}")
+    
+    next_sequence = dict.fromkeys(batch_ids, 1)
+    for row in (
+        BatchEvent.objects.filter(batch_id__in=batch_ids)
+        .values('batch_id')
+        .annotate(last=Max('sequence'), total=Count('id'))
+        .order_by()
+    ):
+        last_sequence = row['last'] if row['last'] is not None else row['total']
+        next_sequence[row['batch_id']] = last_sequence + 1
+    return next_sequence
+
+
+def build_event_metadata(batch, user, metadata=None):
+    """Event metadata with the standard batch and performer fields added."""
     # Ensure metadata is a dict
     if metadata is None:
         metadata = {}
@@ -53,28 +84,109 @@ def log_batch_event(batch, event_type, user, metadata=None, anchor_to_blockchain
     # Add ownership info if relevant
     if batch.current_owner:
         metadata['current_owner'] = batch.current_owner.username
+    return metadata
+
+
+def log_batch_event(batch, event_type, user, metadata=None, anchor_to_blockchain=True):
+    """
+    Create a batch event log entry.
     
-    # Create the event record
-    event = BatchEvent.objects.create(
-        batch=batch,
-        event_type=event_type,
-        performed_by=user,
-        metadata=metadata
-    )
+    For critical events, a hash of the batch data is queued on the
+    anchoring outbox in the same transaction as the event, and anchored
+    to the blockchain by `manage.py run_anchor_worker`. Set
+    BLOCKCHAIN_ANCHOR_ASYNC=False to anchor inline instead.
+    
+    Args:
+        batch: CropBatch instance
+        event_type: BatchEventType choice
+        user: User who performed the action
+        metadata: Optional dict with additional context
+        anchor_to_blockchain: Whether to anchor critical events (default: True)
     
-    # Anchor to blockchain for critical events
-    if anchor_to_blockchain and event_type in CRITICAL_BLOCKCHAIN_EVENTS:
-        try:
-            _anchor_event_to_blockchain(event, batch, event_type, user)
-        except Exception as e:
-            # Log error but don't fail the event creation
-            # The event is still valid even if blockchain anchoring fails
-            logger.error(f"Blockchain anchoring failed for event {event.id}: {e}")
-            # Store failure info in metadata for retry later
-            event.metadata['blockchain_anchor_error'] = str(e)
-            event.save(update_fields=['metadata'])
+    Returns:
+        BatchEvent instance
+    """
+    return log_batch_events([(batch, event_type, metadata)], user, anchor_to_blockchain)[0]
+
+
+def log_batch_events(entries, user, anchor_to_blockchain=True, defer_anchoring=False):
+    """
+    Create several batch events performed by one user.
+    
+    Same as calling log_batch_event for each entry, but the events and
+    their outbox rows are written with one INSERT each, and the batches
+    are locked for sequence numbers together. Events of the same batch
+    get consecutive sequence numbers in entry order.
+    
+    Args:
+        entries: (batch, event_type, metadata) tuples
+        user: User who performed the actions
+        anchor_to_blockchain: Whether to anchor critical events (default: True)
+        defer_anchoring: Queue critical events on the anchoring outbox even
+            when BLOCKCHAIN_ANCHOR_ASYNC is off, instead of anchoring them
+            one by one in the request (for high-volume writers such as splits)
+    
+    Returns:
+        list: BatchEvent instances, in entry order
+    """
+    anchor_async = defer_anchoring or getattr(settings, 'BLOCKCHAIN_ANCHOR_ASYNC', True)
+
+    # Errors propagate, so a caller's transaction needs no savepoint of its own
+    with transaction.atomic(savepoint=False):
+        next_sequence = allocate_event_sequences(batch.pk for batch, _, _ in entries)
+        events = []
+        for batch, event_type, metadata in entries:
+            events.append(BatchEvent(
+                batch=batch,
+                event_type=event_type,
+                performed_by=user,
+                sequence=next_sequence[batch.pk],
+                metadata=build_event_metadata(batch, user, metadata)
+            ))
+            next_sequence[batch.pk] += 1
+        BatchEvent.objects.bulk_create(events)
+
+        to_anchor = [
+            (event, batch, event_type, user)
+            for event, (batch, event_type, _) in zip(events, entries)
+            if anchor_to_blockchain and event_type in CRITICAL_BLOCKCHAIN_EVENTS
+        ]
+
+        # Queue critical events for anchoring alongside the events themselves
+        if to_anchor and anchor_async:
+            try:
+                with transaction.atomic():
+                    enqueue_event_anchors(to_anchor)
+            except Exception as e:
+                # The events are still valid even if they could not be queued
+                logger.error(f"Failed to queue blockchain anchoring for events {[item[0].id for item in to_anchor]}: {e}")
+                for event, _, _, _ in to_anchor:
+                    event.metadata['blockchain_anchor_error'] = str(e)
+                BatchEvent.objects.bulk_update([item[0] for item in to_anchor], ['metadata'])
+
+        batches = list({batch.pk: batch for batch, _, _ in entries}.values())
+        # Cached dashboards of everyone the batches touch are stale once this commits
+        invalidate_batch_stakeholders(batches, user)
+        for batch in batches:
+            # The public trace document of a listed batch includes these events
+            refresh_trace_snapshot(batch)
+        if any(event_type == BatchEventType.CREATED for _, event_type, _ in entries):
+            invalidate_global()
+
+    # Anchor to blockchain inline when the outbox is disabled
+    if to_anchor and not anchor_async:
+        for event, batch, event_type, _ in to_anchor:
+            try:
+                _anchor_event_to_blockchain(event, batch, event_type, user)
+            except Exception as e:
+                # Log error but don't fail the event creation
+                # The event is still valid even if blockchain anchoring fails
+                logger.error(f"Blockchain anchoring failed for event {event.id}: {e}")
+                # Store failure info in metadata for retry later
+                event.metadata['blockchain_anchor_error'] = str(e)
+                event.save(update_fields=['metadata'])
     
-    return event
+    return events
 
 
 def _anchor_event_to_blockchain(event, batch, event_type, user):
@@ -95,22 +207,13 @@ def _anchor_event_to_blockchain(event, batch, event_type, user):
         Exception: If blockchain operation fails
     """
     # Import here to avoid circular imports
-    from .hash_generator import generate_batch_hash
+    from .anchor_outbox import compute_event_hash
     from .blockchain_service import get_blockchain_service
-    from .models import BatchEvent
     
     logger.info(f"Anchoring event {event.id} for batch {batch.product_batch_id} to blockchain")
     
-    # Calculate event sequence number (1-based index)
-    event_sequence = BatchEvent.objects.filter(batch=batch, timestamp__lte=event.timestamp).count()
-    
     # Step 1: Generate deterministic hash of event payload
-    batch_hash = generate_batch_hash(
-        batch=batch, 
-        event_type=event_type, 
-        event_sequence=event_sequence, 
-        actor_id=user.id if user else None
-    )
+    batch_hash = compute_event_hash(event, batch, event_type, user)
     logger.debug(f"Generated payload hash: {batch_hash.hex()[:16]}... for batch {batch.product_batch_id}")
     
     # Step 2: Get blockchain service
@@ -143,6 +246,15 @@ def _anchor_event_to_blockchain(event, batch, event_type, user):
     )
 
 
+def ownership_transfer_metadata(from_user, to_user, reason=None):
+    """Metadata of an ownership transfer event."""
+    return {
+        'from_owner': from_user.username if from_user else None,
+        'to_owner': to_user.username if to_user else None,
+        'reason': reason or 'Standard workflow transition'
+    }
+
+
 def log_ownership_transfer(batch, from_user, to_user, event_type, user_performing_action, reason=None):
     """
     Log a specific ownership transfer event.
@@ -158,17 +270,11 @@ def log_ownership_transfer(batch, from_user, to_user, event_type, user_performin
     Returns:
         BatchEvent instance
     """
-    metadata = {
-        'from_owner': from_user.username if from_user else None,
-        'to_owner': to_user.username if to_user else None,
-        'reason': reason or 'Standard workflow transition'
-    }
-    
     return log_batch_event(
         batch=batch,
         event_type=event_type,
         user=user_performing_action,
-        metadata=metadata
+        metadata=ownership_transfer_metadata(from_user, to_user, reason)
     )
 
 
@@ -1,11 +1,18 @@
 """Farmer dashboard views for user-specific analytics."""
-from django.db.models import Count, Sum, Q
+from decimal import ROUND_HALF_UP, Decimal
+
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from supplychain import models
+from supplychain.payment_analytics import get_payment_summary
+from supplychain.response_cache import cache_response
+from supplychain.stakeholder_metrics import FARMER_BATCHES, ProfileMetrics
+
+
+CENTS = Decimal('0.01')
 
 
 class IsFarmerUser:
@@ -36,6 +43,7 @@ class FarmerDashboardView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cache_response("farmer_dashboard")
     def get(self, request):
         # Verify user is a farmer
         is_farmer, result = IsFarmerUser.check_farmer_role(request.user)
@@ -47,14 +55,12 @@ class FarmerDashboardView(APIView):
         
         farmer_profile = result
         
-        # Get all batches for this farmer (exclude child batches - show only original)
-        farmer_batches = models.CropBatch.objects.filter(
-            farmer=farmer_profile,
-            is_child_batch=False
-        )
+        # Totals come from the StakeholderMetrics rollup (one query);
+        # FARMER_BATCHES only counts original batches, not split children
+        metrics = ProfileMetrics(farmer_profile)
         
         # Calculate metrics
-        total_batches = farmer_batches.count()
+        total_batches = metrics.count(FARMER_BATCHES)
         
         # Active batches: exclude suspended, completed (sold), and fully split
         active_statuses = [
@@ -72,45 +78,48 @@ class FarmerDashboardView(APIView):
             models.BatchStatus.DELIVERED_TO_RETAILER,
             models.BatchStatus.LISTED,
         ]
-        active_batches = farmer_batches.filter(status__in=active_statuses).count()
+        active_batches = metrics.count(FARMER_BATCHES, statuses=active_statuses)
         
         # Completed batches: SOLD status
-        completed_batches = farmer_batches.filter(status=models.BatchStatus.SOLD).count()
+        sold = [models.BatchStatus.SOLD]
+        completed_batches = metrics.count(FARMER_BATCHES, statuses=sold)
         
-        # Calculate total revenue from sold batches
-        # Revenue = quantity * farmer_base_price_per_unit for sold batches
-        sold_batches = farmer_batches.filter(status=models.BatchStatus.SOLD)
-        total_revenue = sum(
-            float(batch.quantity) * float(batch.farmer_base_price_per_unit)
-            for batch in sold_batches
-        ) if sold_batches.exists() else 0
+        # Total revenue from sold batches: quantity * farmer_base_price_per_unit,
+        # summed from the batches themselves rather than the rollup
+        total_revenue = models.CropBatch.objects.filter(
+            farmer=farmer_profile, is_child_batch=False, status__in=sold
+        ).revenue_for_farmer()
         
         # Batch status distribution
-        status_distribution = (
-            farmer_batches.values('status')
-            .annotate(count=Count('id'))
-            .order_by('-count')
+        status_distribution = sorted(
+            metrics.group(FARMER_BATCHES, by='status').items(),
+            key=lambda item: -item[1][0]
         )
         
         # Format status distribution with labels
         status_dist_formatted = []
-        for item in status_distribution:
-            status_label = dict(models.BatchStatus.choices).get(item['status'], item['status'])
+        for batch_status, (count, _, _) in status_distribution:
+            status_label = dict(models.BatchStatus.choices).get(batch_status, batch_status)
             status_dist_formatted.append({
-                'status': item['status'],
+                'status': batch_status,
                 'label': status_label,
-                'count': item['count']
+                'count': count
             })
         
         # Crop type distribution
-        crop_distribution = (
-            farmer_batches.values('crop_type')
-            .annotate(count=Count('id'))
-            .order_by('-count')
-        )
+        crop_distribution = [
+            {'crop_type': crop_type, 'count': count}
+            for crop_type, (count, _, _) in sorted(
+                metrics.group(FARMER_BATCHES, by='dimension').items(),
+                key=lambda item: -item[1][0]
+            )
+        ]
         
         # Recent batches (last 10)
-        recent_batches = farmer_batches.order_by('-created_at')[:10]
+        recent_batches = models.CropBatch.objects.filter(
+            farmer=farmer_profile,
+            is_child_batch=False
+        ).order_by('-created_at')[:10]
         recent_batches_data = []
         for batch in recent_batches:
             recent_batches_data.append({
@@ -130,23 +139,11 @@ class FarmerDashboardView(APIView):
         # Check if farmer has no batches (for empty state)
         has_batches = total_batches > 0
         
-        # Payment-derived financial metrics (from Payment model only)
-        total_received = models.Payment.objects.filter(
-            payee=farmer_profile,
-            payment_type=models.PaymentType.BATCH_PAYMENT,
-            status=models.PaymentStatus.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        total_paid_transport = models.Payment.objects.filter(
-            payer=farmer_profile,
-            payment_type=models.PaymentType.TRANSPORT_SHARE,
-            status=models.PaymentStatus.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        pending_confirmations = models.Payment.objects.filter(
-            payee=farmer_profile,
-            status=models.PaymentStatus.AWAITING_CONFIRMATION
-        ).count()
+        # Payment-derived financial metrics (settled payments only)
+        payments = get_payment_summary(farmer_profile)
+        total_received = payments.received_batch_payments
+        total_paid_transport = payments.paid_transport
+        pending_confirmations = payments.awaiting_confirmation_count
         
         return Response({
             "success": True,
@@ -155,7 +152,7 @@ class FarmerDashboardView(APIView):
                     "total_batches": total_batches,
                     "active_batches": active_batches,
                     "completed_batches": completed_batches,
-                    "total_revenue": round(total_revenue, 2),
+                    "total_revenue": float(total_revenue.quantize(CENTS, rounding=ROUND_HALF_UP)),
                 },
                 "financial": {
                     "total_received": float(total_received),
@@ -164,7 +161,7 @@ class FarmerDashboardView(APIView):
                     "pending_confirmations": pending_confirmations,
                 },
                 "status_distribution": status_dist_formatted,
-                "crop_distribution": list(crop_distribution),
+                "crop_distribution": crop_distribution,
                 "recent_batches": recent_batches_data,
                 "has_batches": has_batches,
             }
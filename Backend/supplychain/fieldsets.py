@@ -0,0 +1,112 @@
+"""
+Sparse Fieldsets
+
+Lets GET requests choose which serializer fields are rendered:
+
+    ?fields=id,status,product_batch_id
+    ?fields=id,status,batch_details.product_batch_id
+    ?fields=id,status&expand=batch_details
+
+`fields` keeps only the named fields; a dotted name picks fields of a
+nested serializer. `expand` adds nested serializers in full on top of
+`fields`. Without `fields` every field is rendered, as before, so
+`expand` on its own changes nothing.
+
+Fieldsets are parsed into a hashable form (a sorted tuple of
+(name, sub-fieldset or None) pairs) so the query planner can cache a
+plan per fieldset and skip joins for nested serializers that are not
+rendered.
+"""
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _add_path(tree, path):
+    head, _, rest = path.partition(".")
+    if rest:
+        subtree = tree.setdefault(head, {})
+        if subtree is not None:
+            _add_path(subtree, rest)
+    else:
+        # The whole field wins over a selection of its subfields
+        tree[head] = None
+
+
+def _freeze(tree):
+    return tuple(sorted(
+        (name, None if subtree is None else _freeze(subtree))
+        for name, subtree in tree.items()
+    ))
+
+
+def parse_fieldset(fields, expand=None):
+    """
+    Parse `fields` / `expand` query values into a fieldset.
+
+    Returns:
+        tuple | None: Frozen fieldset, or None to render every field
+    """
+    if not fields:
+        return None
+    tree = {}
+    for value in (fields, expand or ""):
+        for path in value.split(","):
+            path = path.strip()
+            if path:
+                _add_path(tree, path)
+    return _freeze(tree)
+
+
+def apply_fieldset(serializer, fieldset, prefix=""):
+    """
+    Drop the fields of a serializer (or ListSerializer) not in the fieldset.
+
+    Raises:
+        ValidationError: if the fieldset names an unknown field
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    wanted = dict(fieldset)
+    unknown = [prefix + name for name in wanted if name not in serializer.fields]
+    if unknown:
+        raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+
+    for name in list(serializer.fields):
+        if name not in wanted:
+            serializer.fields.pop(name)
+
+    for name, subset in wanted.items():
+        if subset is None:
+            continue
+        field = serializer.fields[name]
+        if not isinstance(field, serializers.BaseSerializer):
+            raise ValidationError({"fields": f"{prefix}{name} has no subfields"})
+        apply_fieldset(field, subset, prefix=f"{prefix}{name}.")
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin for `?fields=` / `?expand=` on GET requests.
+
+    Place it before QueryPlannerMixin so the planner only joins the
+    relations the requested fields read.
+    """
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            params = self.request.query_params
+            if self.request.method in SAFE_METHODS:
+                self._fieldset = parse_fieldset(params.get("fields"), params.get("expand"))
+            else:
+                self._fieldset = None
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            apply_fieldset(serializer, fieldset)
+        return serializer
@@ -0,0 +1,105 @@
+"""
+File Serving Helpers
+
+Builds and checks the URLs under which DatabaseFileField contents are
+served by `file_views.FileDownloadView`:
+
+    /api/files/<model>/<pk>/<field>/?exp=<unix time>&sig=<signature>
+
+Browsers load these from <img src> / window.open, which cannot send the
+JWT header, so access is granted by an HMAC signature over the path and
+an expiry time instead. Expiry is rounded up to FILE_URL_MAX_AGE buckets,
+so the same file keeps the same URL (and stays in browser caches) for a
+while instead of changing on every response.
+
+Setting FILE_FIELDS_AS_DATA_URI (or passing ?file_format=data_uri) keeps
+the old inline base64 data URIs for clients that still expect them.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.signing import Signer
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+from . import models
+from .db_file_fields import get_file_metadata
+
+# URL model name -> (model class, servable file fields)
+SERVABLE_FILE_FIELDS = {
+    "cropbatch": (models.CropBatch, {"organic_certificate", "quality_test_report", "qr_code_image"}),
+    "kycrecord": (models.KYCRecord, {"document_file"}),
+    "transportrequest": (models.TransportRequest, {"delivery_proof"}),
+    "inspectionreport": (models.InspectionReport, {"report_file"}),
+}
+
+_signer = Signer(salt="supplychain.file_serving")
+
+
+def _url_max_age():
+    return getattr(settings, "FILE_URL_MAX_AGE", 6 * 60 * 60)
+
+
+def _signature(model_name, pk, field_name, expires):
+    return _signer.signature(f"{model_name}:{pk}:{field_name}:{expires}")
+
+
+def get_servable_model(model_name, field_name):
+    """Return the model class for a servable (model, field) pair, or None."""
+    entry = SERVABLE_FILE_FIELDS.get(model_name)
+    if entry is None or field_name not in entry[1]:
+        return None
+    return entry[0]
+
+
+def build_file_url(instance, field_name, request=None):
+    """
+    Signed download URL for a file field of a model instance.
+
+    Returns:
+        str: Absolute URL if a request is given, otherwise a path
+    """
+    model_name = instance._meta.model_name
+    max_age = _url_max_age()
+    expires = (int(time.time()) // max_age + 2) * max_age
+
+    path = reverse("file-download", args=[model_name, instance.pk, field_name])
+    url = f"{path}?exp={expires}&sig={_signature(model_name, instance.pk, field_name, expires)}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def check_file_signature(model_name, pk, field_name, expires, signature):
+    """True if the signature matches and has not expired."""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return constant_time_compare(signature or "", _signature(model_name, pk, field_name, expires))
+
+
+def wants_data_uri(request=None):
+    """True if file fields should be rendered as inline data URIs."""
+    if request is not None and request.GET.get("file_format") == "data_uri":
+        return True
+    return getattr(settings, "FILE_FIELDS_AS_DATA_URI", False)
+
+
+def file_representation(instance, field_name, request=None):
+    """
+    API representation of a file field: a signed download URL, or the
+    legacy data URI when wants_data_uri() is set.
+
+    Deferred file columns are not loaded for URLs; the stored metadata
+    says whether there is a file.
+    """
+    if wants_data_uri(request) or get_servable_model(instance._meta.model_name, field_name) is None:
+        value = getattr(instance, field_name)
+        return value.url if value else None
+    if field_name in instance.get_deferred_fields():
+        has_file = bool(get_file_metadata(instance, field_name))
+    else:
+        has_file = bool(getattr(instance, field_name))
+    return build_file_url(instance, field_name, request) if has_file else None
@@ -0,0 +1,129 @@
+"""
+File download endpoint for DatabaseFileField contents.
+
+Streams a single file column with ETag and Last-Modified revalidation
+and HTTP Range support, so documents and images are fetched once, cached
+by the browser and never inflate JSON responses. URLs are produced by
+`file_serving.build_file_url` and authorised by their signature.
+"""
+
+import hashlib
+import re
+
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.views import APIView
+
+from .db_file_fields import file_metadata_attname, get_file_metadata, sniff_content_type
+from .file_serving import check_file_signature, get_servable_model
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _iter_chunks(data, start, end):
+    """Yield data[start:end] in STREAM_CHUNK_SIZE pieces without copying the whole file."""
+    view = memoryview(data)
+    for offset in range(start, end, STREAM_CHUNK_SIZE):
+        yield bytes(view[offset:min(offset + STREAM_CHUNK_SIZE, end)])
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Returns:
+        tuple or None: (start, end) with end exclusive, None to serve the
+        whole file (no/unsupported header), or False if unsatisfiable
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        return False
+    return start, end
+
+
+class FileDownloadView(APIView):
+    """Stream one stored file. Access is granted by the signed URL, not the JWT."""
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, model, pk, field):
+        model_class = get_servable_model(model, field)
+        if model_class is None or not check_file_signature(
+            model, pk, field, request.GET.get("exp"), request.GET.get("sig")
+        ):
+            raise Http404("File not found")
+
+        # Revalidate from the metadata column before touching the file itself
+        instance = model_class.objects.only(file_metadata_attname(field)).filter(pk=pk).first()
+        if instance is None:
+            raise Http404("File not found")
+
+        metadata = get_file_metadata(instance, field)
+        # Files stored before uploaded_at was recorded are served without Last-Modified
+        last_modified = metadata.get("uploaded_at") if metadata else None
+        if metadata:
+            etag = quote_etag(metadata["sha256"])
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return self._with_cache_headers(not_modified, etag, last_modified)
+
+        # Loads just this column (it is deferred on the instance)
+        stored = getattr(instance, field)
+        if not stored or not stored.data:
+            raise Http404("File not found")
+
+        data = stored.data
+        size = len(data)
+        if not metadata:
+            etag = quote_etag(hashlib.sha256(data).hexdigest())
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return self._with_cache_headers(not_modified, etag, last_modified)
+
+        byte_range = _parse_range(request.headers.get("Range"), size)
+        if_range = request.headers.get("If-Range")
+        if byte_range and if_range and if_range != etag:
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return self._with_cache_headers(response, etag, last_modified)
+
+        start, end = byte_range or (0, size)
+        response = StreamingHttpResponse(
+            _iter_chunks(data, start, end),
+            status=206 if byte_range else 200,
+            content_type=metadata["content_type"] if metadata else sniff_content_type(data),
+        )
+        response["Content-Length"] = str(end - start)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        response["Content-Disposition"] = "inline"
+        return self._with_cache_headers(response, etag, last_modified)
+
+    def _with_cache_headers(self, response, etag, last_modified):
+        response["ETag"] = etag
+        response["Accept-Ranges"] = "bytes"
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # The signed URL is the capability, so only the requesting browser may cache it
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
@@ -11,6 +11,7 @@ import json
 from decimal import Decimal
 from typing import Optional, Dict, Any
 
+from supplychain.merkle import verify_proof
 from supplychain.models import BatchEventType
 
 
@@ -131,7 +132,21 @@ def generate_batch_hash(batch, event_type: str, event_sequence: int, actor_id: O
     # Step 1: Get canonical payload representation
     payload = generate_event_payload(batch, event_type, event_sequence, actor_id)
     
-    # Step 2: Convert to deterministic JSON string
+    # Step 2: Hash its canonical JSON form
+    return hash_event_payload(payload)
+
+
+def hash_event_payload(payload: dict) -> bytes:
+    """
+    Hash a payload built by generate_event_payload().
+    
+    Pure function of the payload (no database access), so payloads can be
+    built in one process and hashed in others.
+    
+    Returns:
+        bytes: 32-byte SHA256 hash
+    """
+    # Convert to deterministic JSON string
     canonical_json = json.dumps(
         payload,
         sort_keys=True,
@@ -139,7 +154,7 @@ def generate_batch_hash(batch, event_type: str, event_sequence: int, actor_id: O
         default=str
     )
     
-    # Step 3: Generate SHA256 hash
+    # Generate SHA256 hash
     hash_obj = hashlib.sha256(canonical_json.encode('utf-8'))
     hash_bytes = hash_obj.digest()
     
@@ -147,6 +162,41 @@ def generate_batch_hash(batch, event_type: str, event_sequence: int, actor_id: O
     return hash_bytes
 
 
+def verify_event_hash(recomputed: bytes, stored_hex: str, proof=None, root_anchored_at: Optional[int] = None):
+    """
+    Per-event integrity check shared by verify_batch_integrity and the
+    verify_all_batches sweep.
+    
+    The recomputed hash must equal the stored (anchored) one. An event
+    anchored under a Merkle root must also prove inclusion in that root,
+    and the root must be anchored on chain.
+    
+    Args:
+        recomputed: Hash recomputed from the current batch data
+        stored_hex: Hash stored when the event was anchored
+        proof: (leaf_index, leaf_count, siblings, root_hex), or None for an
+               event anchored on its own
+        root_anchored_at: On-chain timestamp of the proof's root (0 if never
+                          anchored; None if it could not be looked up)
+        
+    Returns:
+        tuple: (verified, proof_verified). verified is None when only the
+               unknown root timestamp keeps the event from verifying;
+               proof_verified is None without a proof
+    """
+    matches = recomputed.hex() == stored_hex
+    if proof is None:
+        return matches, None
+    
+    leaf_index, leaf_count, siblings, root_hex = proof
+    proof_verified = verify_proof(recomputed, leaf_index, leaf_count, siblings, bytes.fromhex(root_hex))
+    if not (matches and proof_verified):
+        return False, proof_verified
+    if root_anchored_at is None:
+        return None, proof_verified
+    return root_anchored_at > 0, proof_verified
+
+
 def validate_hash_format(hash_bytes: bytes) -> bool:
     """Validate that the hash is in the correct format for blockchain."""
     if not isinstance(hash_bytes, bytes):
@@ -0,0 +1,361 @@
+"""
+Local Blockchain Stand-in
+
+Runs BlockchainService against a local chain instead of Polygon Amoy, so
+anchoring, verification and grant_anchorer_role can be exercised (and
+load-tested with `manage.py benchmark_anchoring`) without testnet access.
+Selected by BLOCKCHAIN_BACKEND:
+
+- "amoy" (default): the real network, from POLYGON_AMOY_RPC_URL
+- "eth-tester": an in-process py-evm chain
+  (`pip install "eth-tester[py-evm]"`); every process gets its own chain
+- "hardhat": a hardhat node at LOCAL_CHAIN["HARDHAT_URL"], spawned with
+  `npx hardhat node` from blockchain/ when nothing answers there; the
+  spawned node stops with the process
+
+HashAnchor is deployed from the hardhat compile output
+(LOCAL_CHAIN["ARTIFACT"], built by `npx hardhat compile` when missing) by
+the first hardhat account, which keeps DEFAULT_ADMIN_ROLE. The service
+signs with the second account; it gets ANCHORER_ROLE at deploy time
+unless LOCAL_CHAIN["GRANT_ANCHORER_ROLE"] is False, which leaves that to
+`manage.py grant_anchorer_role` (the deployer key is the default there).
+On a hardhat node that already has the contract, the deployment is reused.
+
+Knobs for load tests:
+
+- BLOCK_TIME: seconds between blocks; 0 mines every transaction at once
+- LATENCY, LATENCY_JITTER: seconds added to every RPC call
+- FAILURE_RATE: share of RPC calls failing with a ConnectionError before
+  reaching the chain (SEED makes the sequence repeatable)
+- ENDPOINTS: hardhat only; that many simulated endpoints (each with its
+  own latency and failures) behind the RPCPoolProvider, to exercise
+  failover and hedged reads
+"""
+
+import atexit
+import json
+import logging
+import random
+import subprocess
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import rlp
+from django.conf import settings
+from eth_account import Account
+from eth_utils import keccak, to_canonical_address, to_checksum_address
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+from web3.providers.rpc import HTTPProvider
+
+from .rpc_pool import RPCPoolProvider
+
+logger = logging.getLogger(__name__)
+
+BLOCKCHAIN_DIR = Path(__file__).resolve().parent.parent.parent / "blockchain"
+
+BACKEND_AMOY = "amoy"
+BACKEND_ETH_TESTER = "eth-tester"
+BACKEND_HARDHAT = "hardhat"
+
+# Well-known hardhat development accounts #0 (deployer/admin) and #1 (anchorer);
+# never use them on a public network
+HARDHAT_DEPLOYER_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+HARDHAT_ANCHORER_KEY = "0x59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d"
+
+DEFAULT_LOCAL_CHAIN_SETTINGS = {
+    "BACKEND": BACKEND_AMOY,
+    "ARTIFACT": str(BLOCKCHAIN_DIR / "artifacts" / "contracts" / "HashAnchor.sol" / "HashAnchor.json"),
+    "HARDHAT_URL": "http://127.0.0.1:8545",
+    "HARDHAT_START_TIMEOUT": 60,
+    "GRANT_ANCHORER_ROLE": True,
+    "BLOCK_TIME": 0,
+    "LATENCY": 0,
+    "LATENCY_JITTER": 0,
+    "FAILURE_RATE": 0,
+    "SEED": None,
+    "ENDPOINTS": 1,
+}
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+class LocalChainError(Exception):
+    pass
+
+
+def get_local_chain_settings():
+    """Return the LOCAL_CHAIN settings merged over the defaults."""
+    config = dict(DEFAULT_LOCAL_CHAIN_SETTINGS)
+    if settings.configured:
+        config.update(getattr(settings, "LOCAL_CHAIN", {}))
+    return config
+
+
+def local_chain_enabled():
+    return get_local_chain_settings()["BACKEND"] != BACKEND_AMOY
+
+
+# =============================================================================
+# Latency and failure injection
+# =============================================================================
+
+class FaultInjector:
+    """Delays and fails RPC calls at the configured rates."""
+
+    def __init__(self, latency=0, jitter=0, failure_rate=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def before_request(self, method):
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"Injected RPC failure ({method})")
+
+
+class SimulatedTesterProvider(EthereumTesterProvider):
+    """
+    EthereumTesterProvider with fault injection, safe to share between threads.
+
+    With a block time, raw transactions are held until the next
+    mine_block() and only then executed, so receipts appear at block
+    intervals. (eth-tester's own pending pool rejects EIP-155 signatures
+    on its default chain ID.)
+    """
+
+    def __init__(self, ethereum_tester, faults, lock, block_time=0):
+        super().__init__(ethereum_tester)
+        self.faults = faults
+        self.lock = lock
+        self._held = [] if block_time else None
+
+    def make_request(self, method, params):
+        self.faults.before_request(method)
+        # py-evm is not thread-safe
+        with self.lock:
+            if method == "eth_sendRawTransaction" and self._held is not None:
+                self._held.append(params[0])
+                return {"id": 0, "jsonrpc": "2.0", "result": Web3.to_hex(keccak(hexstr=params[0]))}
+            return super().make_request(method, params)
+
+    def mine_block(self):
+        with self.lock:
+            held, self._held = self._held, []
+            if not held:
+                self.ethereum_tester.mine_blocks()
+            # Threads may have sent nonces out of order; retry until no progress
+            while held:
+                failed = []
+                for raw_transaction in held:
+                    try:
+                        self.ethereum_tester.send_raw_transaction(raw_transaction)
+                    except Exception as e:
+                        failed.append((raw_transaction, e))
+                if len(failed) == len(held):
+                    for _, error in failed:
+                        logger.warning(f"Local chain dropped a transaction: {error}")
+                    break
+                held = [raw_transaction for raw_transaction, _ in failed]
+
+
+class SimulatedHTTPProvider(HTTPProvider):
+    """HTTPProvider with fault injection, one per simulated endpoint."""
+
+    def __init__(self, endpoint_uri, faults, label):
+        super().__init__(endpoint_uri)
+        self.faults = faults
+        self.label = label
+
+    def __str__(self):
+        return f"{self.endpoint_uri} ({self.label})"
+
+    def make_request(self, method, params):
+        self.faults.before_request(method)
+        return super().make_request(method, params)
+
+
+def _fault_injector(config, offset=0):
+    seed = config["SEED"] + offset if config["SEED"] is not None else None
+    return FaultInjector(config["LATENCY"], config["LATENCY_JITTER"], config["FAILURE_RATE"], seed)
+
+
+# =============================================================================
+# Deployment
+# =============================================================================
+
+def load_artifact(path):
+    """HashAnchor ABI and bytecode from the hardhat compile output."""
+    path = Path(path)
+    if not path.exists():
+        logger.info("HashAnchor artifact missing; running npx hardhat compile")
+        try:
+            subprocess.run(["npx", "hardhat", "compile"], cwd=BLOCKCHAIN_DIR, check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise LocalChainError(f"{path} not found and `npx hardhat compile` failed in {BLOCKCHAIN_DIR}: {e}")
+    with open(path) as f:
+        artifact = json.load(f)
+    return artifact["abi"], artifact["bytecode"]
+
+
+def _first_contract_address(deployer):
+    """Address of the first contract a fresh account deploys (nonce 0)."""
+    return to_checksum_address(keccak(rlp.encode([to_canonical_address(deployer), 0]))[12:])
+
+
+def deploy_hash_anchor(w3, abi, bytecode, deployer, anchorer, grant_anchorer_role=True):
+    """Deploy HashAnchor with `deployer` as admin, or reuse its first deployment."""
+    address = _first_contract_address(deployer.address)
+    if w3.eth.get_transaction_count(deployer.address) > 0 and w3.eth.get_code(address):
+        logger.info(f"Reusing HashAnchor at {address}")
+        return address, False
+
+    initial_anchorer = anchorer.address if grant_anchorer_role else deployer.address
+    tx = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(deployer.address, initial_anchorer).build_transaction({
+        "from": deployer.address,
+        "nonce": w3.eth.get_transaction_count(deployer.address),
+    })
+    signed_tx = w3.eth.account.sign_transaction(tx, deployer.key)
+    receipt = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed_tx.raw_transaction), timeout=60)
+    if receipt["status"] != 1:
+        raise LocalChainError(f"HashAnchor deployment failed: {receipt}")
+    logger.info(f"HashAnchor deployed at {receipt['contractAddress']}")
+    return receipt["contractAddress"], True
+
+
+def _forget_anchorer_nonce(address):
+    """Drop the nonce manager's row for a wallet on a chain that was just created."""
+    from .models import AnchorerNonce
+
+    AnchorerNonce.objects.filter(address=address).delete()
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+class LocalChain:
+    """A running local chain with HashAnchor deployed."""
+
+    def __init__(self, backend, provider, contract_address, deployer, anchorer, stop=None):
+        self.backend = backend
+        self.provider = provider
+        self.contract_address = contract_address
+        self.deployer = deployer
+        self.anchorer = anchorer
+        self._stop = stop
+
+    def __str__(self):
+        return f"{self.backend} chain, HashAnchor at {self.contract_address}"
+
+    def web3(self):
+        return Web3(self.provider)
+
+    def stop(self):
+        if self._stop:
+            self._stop()
+            self._stop = None
+
+
+def _start_eth_tester(config, deployer, anchorer, abi, bytecode):
+    try:
+        from eth_tester import EthereumTester, PyEVMBackend
+    except ImportError:
+        raise LocalChainError('BLOCKCHAIN_BACKEND=eth-tester needs `pip install "eth-tester[py-evm]"`')
+
+    tester = EthereumTester(PyEVMBackend())
+    w3 = Web3(EthereumTesterProvider(tester))
+    funder = w3.eth.accounts[0]
+    for account in (deployer, anchorer):
+        w3.eth.send_transaction({"from": funder, "to": account.address, "value": w3.to_wei(1000, "ether")})
+    contract_address, _ = deploy_hash_anchor(w3, abi, bytecode, deployer, anchorer, config["GRANT_ANCHORER_ROLE"])
+
+    provider = SimulatedTesterProvider(tester, _fault_injector(config), threading.Lock(), config["BLOCK_TIME"])
+    stopping = threading.Event()
+    if config["BLOCK_TIME"]:
+
+        def mine():
+            while not stopping.wait(config["BLOCK_TIME"]):
+                provider.mine_block()
+
+        threading.Thread(target=mine, name="eth-tester-miner", daemon=True).start()
+    return LocalChain(BACKEND_ETH_TESTER, provider, contract_address, deployer, anchorer, stop=stopping.set), True
+
+
+def _start_hardhat(config, deployer, anchorer, abi, bytecode):
+    url = config["HARDHAT_URL"]
+    w3 = Web3(HTTPProvider(url))
+    process = None
+    if not w3.is_connected():
+        parsed = urlparse(url)
+        logger.info(f"Starting hardhat node on {parsed.hostname}:{parsed.port}")
+        try:
+            process = subprocess.Popen(
+                ["npx", "hardhat", "node", "--hostname", parsed.hostname, "--port", str(parsed.port or 8545)],
+                cwd=BLOCKCHAIN_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise LocalChainError(f"Could not start `npx hardhat node`: {e}")
+        atexit.register(process.terminate)
+        deadline = time.monotonic() + config["HARDHAT_START_TIMEOUT"]
+        while not w3.is_connected():
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.terminate()
+                raise LocalChainError(f"hardhat node did not come up on {url}")
+            time.sleep(0.5)
+
+    contract_address, deployed = deploy_hash_anchor(w3, abi, bytecode, deployer, anchorer, config["GRANT_ANCHORER_ROLE"])
+    if config["BLOCK_TIME"]:
+        w3.provider.make_request("evm_setAutomine", [False])
+        w3.provider.make_request("evm_setIntervalMining", [int(config["BLOCK_TIME"] * 1000)])
+
+    endpoints = [
+        SimulatedHTTPProvider(url, _fault_injector(config, offset=i), label=f"simulated endpoint {i + 1}")
+        for i in range(max(1, config["ENDPOINTS"]))
+    ]
+    stop = process.terminate if process else None
+    return LocalChain(BACKEND_HARDHAT, RPCPoolProvider(endpoints), contract_address, deployer, anchorer, stop), deployed
+
+
+BACKENDS = {
+    BACKEND_ETH_TESTER: _start_eth_tester,
+    BACKEND_HARDHAT: _start_hardhat,
+}
+
+
+def start_local_chain(config=None):
+    """Start (or attach to) the configured local chain and deploy HashAnchor."""
+    config = config or get_local_chain_settings()
+    if config["BACKEND"] not in BACKENDS:
+        raise LocalChainError(
+            f"Unknown BLOCKCHAIN_BACKEND {config['BACKEND']!r} (expected one of: amoy, {', '.join(BACKENDS)})"
+        )
+    abi, bytecode = load_artifact(config["ARTIFACT"])
+    deployer = Account.from_key(HARDHAT_DEPLOYER_KEY)
+    anchorer = Account.from_key(HARDHAT_ANCHORER_KEY)
+
+    chain, fresh = BACKENDS[config["BACKEND"]](config, deployer, anchorer, abi, bytecode)
+    if fresh:
+        _forget_anchorer_nonce(anchorer.address)
+    logger.info(f"Local {chain}")
+    return chain
+
+
+def get_local_chain():
+    """The process-wide local chain, started on first use."""
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            _chain = start_local_chain()
+        return _chain
@@ -0,0 +1,105 @@
+"""
+Management Command: backfill_event_sequences
+
+Assigns BatchEvent.sequence to events logged before the column existed.
+Each batch's events are numbered 1..n in (timestamp, id) order, which is
+the order verify_batch_integrity used to derive sequence numbers.
+
+Usage:
+    python manage.py backfill_event_sequences
+    python manage.py backfill_event_sequences --dry-run
+    python manage.py backfill_event_sequences --chunk-size 200
+
+Safe to run while the app is serving traffic: every batch is renumbered
+under the same row lock log_batch_event takes to allocate a sequence.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from supplychain.models import BatchEvent, CropBatch
+
+
+class Command(BaseCommand):
+    help = "Backfill per-batch BatchEvent.sequence numbers for existing events."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Batches processed per query chunk (default: 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Report what would change without writing.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+
+        batches_updated = events_updated = tied_events = 0
+        last_pk = 0
+
+        while True:
+            batch_ids = list(
+                CropBatch.objects.filter(pk__gt=last_pk, events__sequence__isnull=True)
+                .order_by('pk').values_list('pk', flat=True).distinct()[:chunk_size]
+            )
+            if not batch_ids:
+                break
+            last_pk = batch_ids[-1]
+
+            for batch_id in batch_ids:
+                updated, tied = self._backfill_batch(batch_id, dry_run)
+                if updated:
+                    batches_updated += 1
+                    events_updated += updated
+                tied_events += tied
+
+            self.stdout.write(f"Processed batches up to id {last_pk}: {events_updated} event(s) numbered so far")
+
+        prefix = "[dry run] Would number" if dry_run else "Numbered"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {events_updated} event(s) across {batches_updated} batch(es)"
+        ))
+        if tied_events:
+            self.stdout.write(self.style.WARNING(
+                f"{tied_events} event(s) share a timestamp with a later event; anchors computed "
+                f"for them before this backfill may not verify"
+            ))
+
+    def _backfill_batch(self, batch_id, dry_run):
+        """
+        Number one batch's unsequenced events.
+
+        Returns:
+            tuple: (events updated, events whose timestamp ties with a later event)
+        """
+        with transaction.atomic():
+            CropBatch.objects.select_for_update().filter(pk=batch_id).values_list('pk', flat=True).get()
+            events = list(BatchEvent.objects.filter(batch_id=batch_id).order_by('timestamp', 'id'))
+
+            taken = {event.sequence for event in events if event.sequence is not None}
+            to_update = []
+            tied = 0
+            for i, event in enumerate(events):
+                if event.sequence is not None:
+                    continue
+                if i + 1 < len(events) and events[i + 1].timestamp == event.timestamp:
+                    tied += 1
+                if i + 1 in taken:
+                    self.stdout.write(self.style.WARNING(
+                        f"Batch {batch_id}: sequence {i + 1} already taken; leaving event {event.id} unnumbered"
+                    ))
+                    continue
+                event.sequence = i + 1
+                to_update.append(event)
+
+            if to_update and not dry_run:
+                BatchEvent.objects.bulk_update(to_update, ['sequence'])
+
+        return len(to_update), tied
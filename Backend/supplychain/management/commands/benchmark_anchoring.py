@@ -0,0 +1,132 @@
+"""
+Management Command: benchmark_anchoring
+
+Measures anchoring throughput against the local chain stand-in
+(BLOCKCHAIN_BACKEND=eth-tester or hardhat, see supplychain/local_chain.py):
+submits --count anchor transactions from --concurrency threads through
+BlockchainService.submit_anchor (local nonce manager, cached gas price),
+then waits for every receipt and verifies the anchors on the contract.
+
+Usage:
+    BLOCKCHAIN_BACKEND=eth-tester python manage.py benchmark_anchoring
+    BLOCKCHAIN_BACKEND=hardhat LOCAL_CHAIN_BLOCK_TIME=2 LOCAL_CHAIN_LATENCY=0.15 \\
+        LOCAL_CHAIN_FAILURE_RATE=0.05 python manage.py benchmark_anchoring --count 500 --concurrency 8
+
+Refuses to run against Polygon Amoy, where every anchor costs gas.
+"""
+
+import hashlib
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from supplychain.blockchain_service import get_blockchain_service
+from supplychain.local_chain import local_chain_enabled
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark anchor submission and confirmation against the local chain."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100, help="Anchors to submit (default: 100).")
+        parser.add_argument("--concurrency", type=int, default=4, help="Submitting threads (default: 4).")
+        parser.add_argument(
+            "--receipt-timeout",
+            type=float,
+            default=300,
+            help="Seconds to wait for all receipts (default: 300).",
+        )
+
+    def handle(self, *args, **options):
+        if not local_chain_enabled():
+            raise CommandError(
+                "benchmark_anchoring spends gas on the configured network; "
+                "select a local chain with BLOCKCHAIN_BACKEND=eth-tester or hardhat"
+            )
+        blockchain = get_blockchain_service()
+        if not blockchain.is_healthy():
+            raise CommandError(f"Blockchain service is not healthy: {blockchain._init_error}")
+
+        run = uuid.uuid4().hex[:8]
+        jobs = [
+            (f"BENCH-{run}-{i:05d}", hashlib.sha256(f"{run}:{i}".encode()).digest())
+            for i in range(options["count"])
+        ]
+
+        def submit(job):
+            batch_id, snapshot_hash = job
+            start = time.perf_counter()
+            try:
+                submitted = blockchain.submit_anchor(batch_id, snapshot_hash, "BENCHMARK")
+                return batch_id, submitted["transaction_hash"], time.perf_counter() - start, None
+            except Exception as e:
+                return batch_id, None, time.perf_counter() - start, e
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(submit, jobs))
+        submit_seconds = time.perf_counter() - start
+
+        submitted = [(batch_id, tx_hash) for batch_id, tx_hash, _, error in results if error is None]
+        errors = [error for _, _, _, error in results if error is not None]
+        latencies = [elapsed * 1000 for _, _, elapsed, _ in results]
+        self.stdout.write(
+            f"submitted {len(submitted)}/{len(jobs)} in {submit_seconds:.2f}s "
+            f"({len(submitted) / submit_seconds:.1f} tx/s)  "
+            f"p50={_percentile(latencies, 50):.1f}ms  p95={_percentile(latencies, 95):.1f}ms"
+        )
+        for error in errors[:5]:
+            self.stderr.write(f"  submit failed: {error}")
+
+        # Collect receipts
+        pending = dict(submitted)
+        blocks, reverted = set(), 0
+        deadline = time.monotonic() + options["receipt_timeout"]
+        while pending and time.monotonic() < deadline:
+            for batch_id, tx_hash in list(pending.items()):
+                try:
+                    receipt = blockchain.get_anchor_receipt(tx_hash)
+                except OSError:
+                    # RPC failure (e.g. LOCAL_CHAIN_FAILURE_RATE); ask again next round
+                    continue
+                except Exception:
+                    reverted += 1
+                    pending.pop(batch_id)
+                    continue
+                if receipt:
+                    blocks.add(receipt["block_number"])
+                    pending.pop(batch_id)
+            if pending:
+                time.sleep(0.2)
+        total_seconds = time.perf_counter() - start
+        confirmed = len(submitted) - len(pending) - reverted
+        self.stdout.write(
+            f"confirmed {confirmed} in {total_seconds:.2f}s ({confirmed / total_seconds:.1f} anchors/s) "
+            f"across {len(blocks)} block(s); reverted={reverted} unconfirmed={len(pending)}"
+        )
+
+        # Spot-check what the contract stored
+        mismatched = 0
+        for batch_id, snapshot_hash in jobs[:: max(1, len(jobs) // 20)]:
+            if batch_id in pending or batch_id not in dict(submitted):
+                continue
+            for _ in range(3):
+                # get_latest_anchor() returns None on RPC failures too
+                anchor = blockchain.get_latest_anchor(batch_id)
+                if anchor:
+                    break
+            if not anchor or anchor["snapshot_hash"] != snapshot_hash:
+                mismatched += 1
+        style = self.style.SUCCESS if not (errors or reverted or pending or mismatched) else self.style.WARNING
+        self.stdout.write(style(f"verification mismatches: {mismatched}"))
@@ -0,0 +1,109 @@
+"""
+Management Command: benchmark_bulk_split
+
+Times BulkSplitBatchView on 10-, 100- and 1000-way splits of a stored
+batch and prints the wall time and number of queries of each request.
+
+Usage:
+    python manage.py benchmark_bulk_split                     # 10/100/1000-way
+    python manage.py benchmark_bulk_split --ways 50 500 --repeat 5
+
+Each split runs against a fresh synthetic batch inside a transaction that
+is rolled back at the end, so the database is left as it was. Anchoring
+is not exercised: split events are queued on the outbox, which the
+rollback empties again.
+"""
+
+import math
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from supplychain.bulk_split_views import BulkSplitBatchView
+from supplychain.models import BatchStatus, CropBatch, StakeholderProfile, StakeholderRole
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark bulk batch splits of increasing fan-out."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ways",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000],
+            help="Number of children per split (default: 10 100 1000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Splits per fan-out; the median is reported (default: 3).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic batches rolled back")
+
+    def _run(self, options):
+        farmer, distributor = self._profiles()
+        view = BulkSplitBatchView.as_view()
+        factory = APIRequestFactory()
+
+        for ways in options["ways"]:
+            timings, query_counts = [], []
+            for _ in range(options["repeat"]):
+                parent = CropBatch.objects.create(
+                    farmer=farmer,
+                    current_owner=distributor.user,
+                    status=BatchStatus.STORED,
+                    crop_type="Benchmark",
+                    quantity=Decimal(ways),
+                    harvest_date=timezone.now().date(),
+                    farmer_base_price_per_unit=Decimal("10.00"),
+                )
+                splits = [{"quantity": "1.00", "label": f"Part {i + 1}"} for i in range(ways)]
+                request = factory.post(f"/api/batch/{parent.pk}/bulk-split/", {"splits": splits}, format="json")
+                force_authenticate(request, user=distributor.user)
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = view(request, batch_id=parent.pk)
+                    timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 201:
+                    self.stderr.write(f"{ways}-way split failed: {response.status_code} {response.data}")
+                    return
+                query_counts.append(len(queries))
+
+            timings.sort()
+            median = timings[math.ceil(len(timings) / 2) - 1]
+            self.stdout.write(
+                f"{ways:>5}-way split  median={median:9.1f}ms  "
+                f"per child={median / ways:7.2f}ms  queries={max(query_counts)}"
+            )
+
+    def _profiles(self):
+        suffix = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        farmer = StakeholderProfile.objects.create(
+            user=User.objects.create(username=f"benchmark-farmer-{suffix}"), role=StakeholderRole.FARMER
+        )
+        distributor = StakeholderProfile.objects.create(
+            user=User.objects.create(username=f"benchmark-distributor-{suffix}"), role=StakeholderRole.DISTRIBUTOR
+        )
+        return farmer, distributor
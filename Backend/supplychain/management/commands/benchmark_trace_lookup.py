@@ -0,0 +1,183 @@
+"""
+Management Command: benchmark_trace_lookup
+
+Measures public trace id resolution (supplychain/trace_lookup.py) on a
+table of the given size and prints p50/p95/p99 latencies per lookup kind,
+next to the icontains query BatchTraceView used before.
+
+Usage:
+    python manage.py benchmark_trace_lookup                       # 1M batches
+    python manage.py benchmark_trace_lookup --batches 100000 --samples 500
+    python manage.py benchmark_trace_lookup --explain             # also print query plans
+
+Synthetic batches are bulk-inserted inside a transaction that is rolled
+back at the end, so the database is left as it was (the table only needs
+room for the rows while the benchmark runs).
+"""
+
+import math
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from supplychain.models import CropBatch, StakeholderProfile, StakeholderRole
+from supplychain.trace_lookup import (
+    PREFIX,
+    exact_match,
+    normalized_match,
+    prefix_match,
+    resolve_trace_batch,
+)
+
+INSERT_CHUNK = 10000
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark public trace id lookups at a given table size."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batches",
+            type=int,
+            default=1_000_000,
+            help="Table size to benchmark at; synthetic rows are added up to it (default: 1000000).",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=1000,
+            help="Lookups per kind (default: 1000).",
+        )
+        parser.add_argument(
+            "--legacy-samples",
+            type=int,
+            default=50,
+            help="Lookups with the old icontains query, which scans the table (default: 50, 0 to skip).",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            default=False,
+            help="Print the query plan of each lookup step.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic batches rolled back")
+
+    def _run(self, options):
+        added = self._fill(options["batches"])
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE supplychain_cropbatch")
+        self.stdout.write(f"{CropBatch.objects.count()} batches ({added} synthetic)")
+
+        ids = self._sample_ids(options["samples"])
+        cases = [
+            ("exact product_batch_id", lambda b: resolve_trace_batch(b[0])),
+            ("exact public_batch_id", lambda b: resolve_trace_batch(b[1])),
+            ("mixed-case product_batch_id", lambda b: resolve_trace_batch(b[0].lower())),
+            ("prefix (?match=prefix)", lambda b: resolve_trace_batch(b[0][:-2].lower(), mode=PREFIX)),
+            ("not found", lambda b: resolve_trace_batch(str(uuid.uuid4()))),
+        ]
+        for label, lookup in cases:
+            self._report(label, [self._time(lookup, batch_ids) for batch_ids in ids])
+
+        if options["legacy_samples"]:
+            legacy = lambda b: self._legacy_lookup(b[0].lower())
+            self._report(
+                "legacy icontains", [self._time(legacy, batch_ids) for batch_ids in ids[:options["legacy_samples"]]]
+            )
+
+        if options["explain"]:
+            product_id = ids[0][0]
+            queryset = CropBatch.objects.all()
+            for label, step_queryset in [
+                ("exact", exact_match(queryset, product_id)),
+                ("normalized", normalized_match(queryset, product_id.lower())),
+                ("prefix", prefix_match(queryset, product_id[:-2])),
+            ]:
+                self.stdout.write(f"\n{label}:\n{step_queryset[:1].explain()}")
+
+    def _fill(self, size):
+        missing = size - CropBatch.objects.count()
+        if missing <= 0:
+            return 0
+
+        profile = StakeholderProfile.objects.filter(role=StakeholderRole.FARMER).select_related("user").first()
+        if profile is None:
+            user = get_user_model().objects.create(username=f"benchmark-{uuid.uuid4().hex[:8]}")
+            profile = StakeholderProfile.objects.create(user=user, role=StakeholderRole.FARMER)
+
+        today = timezone.now().date()
+        for start in range(0, missing, INSERT_CHUNK):
+            CropBatch.objects.bulk_create(
+                [
+                    CropBatch(
+                        farmer=profile,
+                        current_owner=profile.user,
+                        crop_type="Benchmark",
+                        quantity=1,
+                        harvest_date=today,
+                        product_batch_id=f"BATCH-{today:%Y%m%d}-{uuid.uuid4().hex[:12].upper()}",
+                        public_batch_id=str(uuid.uuid4()),
+                    )
+                    for _ in range(min(INSERT_CHUNK, missing - start))
+                ]
+            )
+            self.stdout.write(f"  inserted {min(start + INSERT_CHUNK, missing)}/{missing}", ending="\r")
+        self.stdout.write("")
+        return missing
+
+    def _sample_ids(self, samples):
+        bounds = CropBatch.objects.order_by("pk").values_list("pk", flat=True)
+        low, high = bounds.first(), bounds.last()
+        ids = []
+        for _ in range(samples):
+            ids.append(
+                CropBatch.objects.filter(pk__gte=random.randint(low, high))
+                .order_by("pk")
+                .values_list("product_batch_id", "public_batch_id")
+                .first()
+            )
+        return ids
+
+    def _legacy_lookup(self, public_id):
+        return CropBatch.objects.filter(
+            Q(public_batch_id__iexact=public_id)
+            | Q(product_batch_id__iexact=public_id)
+            | Q(product_batch_id__icontains=public_id)
+        ).order_by("-created_at").first()
+
+    def _time(self, lookup, batch_ids):
+        start = time.perf_counter()
+        lookup(batch_ids)
+        return (time.perf_counter() - start) * 1000
+
+    def _report(self, label, timings):
+        timings.sort()
+        self.stdout.write(
+            f"{label:<30} n={len(timings):<5} "
+            f"p50={percentile(timings, 50):8.2f}ms  "
+            f"p95={percentile(timings, 95):8.2f}ms  "
+            f"p99={percentile(timings, 99):8.2f}ms  "
+            f"max={timings[-1]:8.2f}ms"
+        )
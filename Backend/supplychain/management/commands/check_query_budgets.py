@@ -0,0 +1,74 @@
+"""
+Management Command: check_query_budgets
+
+Calls the list action of every router ViewSet that uses QueryPlannerMixin
+as the given user and fails if any issues more queries than its
+`query_budget`. Query counts of planned endpoints do not grow with the
+number of rows, so run it against a database with realistic data.
+
+Usage:
+    python manage.py check_query_budgets --username admin
+    python manage.py check_query_budgets --username farmer1 --verbose
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bsas_supplychain.urls import router
+from supplychain.query_planner import QueryPlannerMixin, assert_max_queries
+
+
+class Command(BaseCommand):
+    help = "Check that planned list endpoints stay within their query budgets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            required=True,
+            help="User the requests are made as.",
+        )
+        parser.add_argument(
+            "--verbose",
+            action="store_true",
+            default=False,
+            help="Print the SQL of endpoints that exceed their budget.",
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"User not found: {options['username']}")
+
+        factory = APIRequestFactory()
+        failures = 0
+        for prefix, viewset, basename in router.registry:
+            if not issubclass(viewset, QueryPlannerMixin) or viewset.query_budget is None:
+                continue
+
+            path = f"/api/{prefix}/"
+            request = factory.get(path)
+            force_authenticate(request, user=user)
+            view = viewset.as_view({"get": "list"})
+            try:
+                with assert_max_queries(viewset.query_budget, label=f"GET {path}") as captured:
+                    response = view(request)
+                    response.render()
+            except AssertionError as e:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"{path:<28} {len(captured):>3} queries (budget {viewset.query_budget})"
+                ))
+                if options["verbose"]:
+                    self.stdout.write(str(e))
+                continue
+
+            data = response.data
+            if isinstance(data, dict) and "results" in data:
+                data = data["results"]
+            rows = len(data) if isinstance(data, list) else "-"
+            self.stdout.write(f"{path:<28} {len(captured):>3} queries (budget {viewset.query_budget}), {rows} row(s)")
+
+        if failures:
+            raise CommandError(f"{failures} endpoint(s) exceeded their query budget")
+        self.stdout.write(self.style.SUCCESS("All planned endpoints are within budget"))
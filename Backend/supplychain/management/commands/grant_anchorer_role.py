@@ -13,6 +13,10 @@ Usage:
 
 After running this once successfully, the backend wallet permanently has
 ANCHORER_ROLE and can call anchorHash() without reverting.
+
+With BLOCKCHAIN_BACKEND=eth-tester or hardhat the command runs against the
+local chain (see supplychain/local_chain.py) and --deployer-key defaults to
+its deployer account.
 """
 
 import os
@@ -21,6 +25,8 @@ from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 
+from supplychain.local_chain import HARDHAT_DEPLOYER_KEY, LocalChainError, get_local_chain, local_chain_enabled
+
 load_dotenv()
 
 
@@ -34,9 +40,9 @@ class Command(BaseCommand):
         parser.add_argument(
             "--deployer-key",
             type=str,
-            required=True,
             help="Private key of the deployer/admin wallet (0x-prefixed). "
-                 "This wallet must hold DEFAULT_ADMIN_ROLE on the contract.",
+                 "This wallet must hold DEFAULT_ADMIN_ROLE on the contract. "
+                 "Required unless a local chain is selected.",
         )
         parser.add_argument(
             "--dry-run",
@@ -49,10 +55,23 @@ class Command(BaseCommand):
         deployer_key = options["deployer_key"]
         dry_run = options["dry_run"]
 
-        # ── Load config from environment ──────────────────────────────────────
-        rpc_url = os.getenv("POLYGON_AMOY_RPC_URL")
-        contract_address = os.getenv("HASH_ANCHOR_CONTRACT_ADDRESS")
-        backend_private_key = os.getenv("ANCHORER_PRIVATE_KEY")
+        # ── Load config from environment (or the local chain) ─────────────────
+        try:
+            local_chain = get_local_chain() if local_chain_enabled() else None
+        except LocalChainError as e:
+            raise CommandError(str(e))
+        if local_chain:
+            rpc_url = str(local_chain)
+            contract_address = local_chain.contract_address
+            backend_private_key = local_chain.anchorer.key
+            deployer_key = deployer_key or HARDHAT_DEPLOYER_KEY
+        else:
+            rpc_url = os.getenv("POLYGON_AMOY_RPC_URL")
+            contract_address = os.getenv("HASH_ANCHOR_CONTRACT_ADDRESS")
+            backend_private_key = os.getenv("ANCHORER_PRIVATE_KEY")
+
+        if not deployer_key:
+            raise CommandError("--deployer-key is required")
 
         if not rpc_url:
             raise CommandError("POLYGON_AMOY_RPC_URL is not set in .env")
@@ -80,8 +99,8 @@ class Command(BaseCommand):
         self.stdout.write(self.style.HTTP_INFO(f"Contract        : {contract_address}"))
 
         # ── Connect to Polygon Amoy ───────────────────────────────────────────
-        self.stdout.write("\nConnecting to Polygon Amoy...")
-        w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.stdout.write(f"\nConnecting to {local_chain or 'Polygon Amoy'}...")
+        w3 = local_chain.web3() if local_chain else Web3(Web3.HTTPProvider(rpc_url))
 
         if not w3.is_connected():
             raise CommandError(f"Could not connect to RPC: {rpc_url}")
@@ -188,7 +207,7 @@ class Command(BaseCommand):
                     "nonce": nonce,
                     "gas": 100000,
                     "gasPrice": gas_price,
-                    "chainId": 80002,  # Polygon Amoy
+                    "chainId": chain_id,
                 }
             )
         except Exception as e:
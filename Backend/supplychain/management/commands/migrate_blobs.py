@@ -0,0 +1,158 @@
+"""
+Management Command: migrate_blobs
+
+Moves file data into the content-addressed blob store (see blob_store.py).
+
+Usage:
+    python manage.py migrate_blobs                         # inline files -> blob pointers
+    python manage.py migrate_blobs --backend filesystem    # ...then move every blob to the filesystem
+    python manage.py migrate_blobs --recount --gc          # repair refcounts, delete unused blobs
+    python manage.py migrate_blobs --dry-run
+
+Rows are converted one at a time under a row lock, the same way a normal
+save stores a new upload, so it is safe to run while the app is serving
+traffic. Run with --recount after any QuerySet.update() or raw SQL that
+changed file columns behind DatabaseFileField's back.
+"""
+
+from collections import Counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from supplychain.blob_store import (
+    blob_store_enabled, delete_unreferenced_blobs, get_backend, get_blob_store_settings, move_blob
+)
+from supplychain.db_file_fields import DatabaseFileField, file_metadata_attname
+from supplychain.models import StoredBlob
+
+
+def _file_fields():
+    """(model, field name, metadata field name) for every blob-capable file column."""
+    for model in apps.get_app_config('supplychain').get_models():
+        field_names = {f.name for f in model._meta.concrete_fields}
+        for field in model._meta.concrete_fields:
+            if isinstance(field, DatabaseFileField) and file_metadata_attname(field.name) in field_names:
+                yield model, field.name, file_metadata_attname(field.name)
+
+
+class Command(BaseCommand):
+    help = "Move inline DatabaseFileField data into the blob store and maintain stored blobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            default=None,
+            help="Also move every stored blob to this backend (e.g. database, filesystem).",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            default=False,
+            help="Recompute blob refcounts from the file metadata columns.",
+        )
+        parser.add_argument(
+            "--gc",
+            action="store_true",
+            default=False,
+            help="Delete blobs that are no longer referenced.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Rows loaded per query (default: 100).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Report what would change without writing.",
+        )
+
+    def handle(self, *args, **options):
+        if not blob_store_enabled():
+            raise CommandError("The blob store is disabled (BLOB_STORE['ENABLED'] is False)")
+        if options["backend"] and options["backend"] not in get_blob_store_settings()["BACKENDS"]:
+            raise CommandError(f"Unknown blob backend: {options['backend']}")
+
+        dry_run = options["dry_run"]
+        prefix = "[dry run] Would convert" if dry_run else "Converted"
+        for model, field_name, meta_name in _file_fields():
+            converted = self._convert_field(model, field_name, meta_name, options["chunk_size"], dry_run)
+            self.stdout.write(f"{prefix} {converted} {model.__name__}.{field_name} file(s)")
+
+        if options["backend"]:
+            self._move_blobs(get_backend(options["backend"]), dry_run)
+        if options["recount"]:
+            self._recount(dry_run)
+        if options["gc"]:
+            if dry_run:
+                unused = StoredBlob.objects.filter(refcount=0).count()
+                self.stdout.write(f"[dry run] Would delete {unused} unreferenced blob(s)")
+            else:
+                self.stdout.write(f"Deleted {delete_unreferenced_blobs()} unreferenced blob(s)")
+
+        self.stdout.write(self.style.SUCCESS("Blob migration finished"))
+
+    def _convert_field(self, model, field_name, meta_name, chunk_size, dry_run):
+        """Re-save rows whose file is still stored inline so it moves into the store."""
+        pending = (
+            model._default_manager.filter(**{f"{field_name}__isnull": False})
+            .exclude(**{f"{meta_name}__has_key": "blob"})
+            .order_by('pk')
+        )
+        converted = 0
+        last_pk = 0
+        while True:
+            pks = list(pending.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            if dry_run:
+                converted += len(pks)
+                continue
+
+            for pk in pks:
+                with transaction.atomic():
+                    row = model._default_manager.select_for_update().only('pk', field_name, meta_name).get(pk=pk)
+                    if not getattr(row, field_name):
+                        continue
+                    row.save(update_fields=[field_name, meta_name])
+                    converted += 1
+        return converted
+
+    def _move_blobs(self, backend, dry_run):
+        pending = StoredBlob.objects.exclude(backend=backend.name).defer('data').order_by('sha256')
+        if dry_run:
+            self.stdout.write(f"[dry run] Would move {pending.count()} blob(s) to {backend.name}")
+            return
+
+        moved = 0
+        for sha256 in pending.values_list('sha256', flat=True).iterator():
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().get(sha256=sha256)
+                if move_blob(blob, backend):
+                    moved += 1
+        self.stdout.write(f"Moved {moved} blob(s) to {backend.name}")
+
+    def _recount(self, dry_run):
+        references = Counter()
+        for model, field_name, meta_name in _file_fields():
+            metas = model._default_manager.filter(**{f"{meta_name}__blob": True}).values_list(meta_name, flat=True)
+            references.update(meta['sha256'] for meta in metas.iterator())
+
+        changed = []
+        for blob in StoredBlob.objects.defer('data').iterator():
+            if blob.refcount != references.get(blob.sha256, 0):
+                blob.refcount = references.get(blob.sha256, 0)
+                changed.append(blob)
+        if not dry_run:
+            StoredBlob.objects.bulk_update(changed, ['refcount'], batch_size=500)
+
+        missing = set(references) - set(StoredBlob.objects.filter(sha256__in=references).values_list('sha256', flat=True))
+        verb = "[dry run] Would correct" if dry_run else "Corrected"
+        self.stdout.write(f"{verb} refcounts of {len(changed)} blob(s)")
+        if missing:
+            self.stdout.write(self.style.ERROR(f"{len(missing)} referenced blob(s) are missing from the store"))
@@ -0,0 +1,87 @@
+"""
+Management Command: rebuild_metrics
+
+Recomputes the StakeholderMetrics dashboard rollup from the batch,
+transport, listing and payment tables (see stakeholder_metrics.py).
+
+Usage:
+    python manage.py rebuild_metrics                 # full recompute
+    python manage.py rebuild_metrics --check         # report drift, change nothing
+    python manage.py rebuild_metrics --profile 12    # only these stakeholders
+
+Migration 0033 fills the table from existing data. Run this with --check
+from cron to catch changes that bypassed the model signals
+(QuerySet.update(), raw SQL). A rebuild
+replaces the rows in one transaction; saves that land while it computes
+can be overwritten, so rebuild at a quiet time or re-run --check after.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from supplychain.models import StakeholderMetrics
+from supplychain.stakeholder_metrics import BUCKET_FIELDS, compute_all_metrics
+
+
+class Command(BaseCommand):
+    help = "Recompute the stakeholder dashboard metrics or check them for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            default=False,
+            help="Only compare stored metrics with recomputed ones.",
+        )
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profiles",
+            help="Stakeholder profile id to rebuild (repeatable; default: all).",
+        )
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"]
+        expected = {
+            key: value for key, value in compute_all_metrics(profiles).items() if any(value)
+        }
+
+        stored_rows = StakeholderMetrics.objects.all()
+        if profiles:
+            stored_rows = stored_rows.filter(profile_id__in=profiles)
+        stored = {
+            tuple(row[:6]): list(row[6:])
+            for row in stored_rows.values_list(*BUCKET_FIELDS, "count", "quantity", "amount").iterator()
+            if any(row[6:])
+        }
+
+        drifted = sorted(
+            {key for key in set(expected) | set(stored) if expected.get(key) != stored.get(key)},
+            key=str,
+        )
+
+        if options["check"]:
+            for key in drifted[:20]:
+                self.stdout.write(f"  {key}: stored {stored.get(key)}, expected {expected.get(key)}")
+            if drifted:
+                raise CommandError(f"{len(drifted)} metric bucket(s) drifted; run rebuild_metrics to repair")
+            self.stdout.write(self.style.SUCCESS(f"All {len(expected)} metric bucket(s) match"))
+            return
+
+        with transaction.atomic():
+            stale = StakeholderMetrics.objects.all()
+            if profiles:
+                stale = stale.filter(profile_id__in=profiles)
+            stale.delete()
+            StakeholderMetrics.objects.bulk_create(
+                [
+                    StakeholderMetrics(**dict(zip(BUCKET_FIELDS, key)), count=count, quantity=quantity, amount=amount)
+                    for key, (count, quantity, amount) in expected.items()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(expected)} metric bucket(s), {len(drifted)} had drifted"
+        ))
@@ -0,0 +1,173 @@
+"""
+Management Command: run_anchor_worker
+
+Drains the AnchorOutbox queue, anchoring queued batch event hashes to the
+HashAnchor contract outside of the HTTP request cycle.
+
+Usage:
+    python manage.py run_anchor_worker
+    python manage.py run_anchor_worker --concurrency 4 --batch-size 50
+    python manage.py run_anchor_worker --once    # drain what is due, then exit
+
+In Merkle mode (BLOCKCHAIN_ANCHOR_MODE = "merkle") pending event rows
+are first rolled into Merkle roots, and only the roots are anchored.
+
+Each loop runs two passes: due PENDING rows are signed and broadcast
+without waiting (so many anchors are in flight at once), then the
+receipts of SUBMITTED rows are collected and stuck transactions are
+rebroadcast with a higher gas price.
+
+Defaults come from the ANCHOR_WORKER setting. Several workers may run at
+once; rows are claimed with SKIP LOCKED so each is processed by one worker.
+"""
+
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from supplychain.anchor_outbox import (
+    ANCHOR_MODE_MERKLE,
+    build_merkle_batch,
+    claim_items,
+    claim_submitted,
+    collect_receipt,
+    get_anchor_mode,
+    get_worker_settings,
+    has_in_flight,
+    record_failure,
+    submit_item,
+)
+from supplychain.blockchain_service import get_blockchain_service
+
+
+class Command(BaseCommand):
+    help = "Anchor queued batch events to the blockchain from the AnchorOutbox table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Number of rows submitted or checked in parallel (default: ANCHOR_WORKER['CONCURRENCY']).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Maximum rows claimed per poll (default: ANCHOR_WORKER['BATCH_SIZE']).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds to sleep when the queue is empty (default: ANCHOR_WORKER['POLL_INTERVAL']).",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=None,
+            help="Attempts before a row is marked FAILED (default: ANCHOR_WORKER['MAX_ATTEMPTS']).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Process the rows that are currently due, wait for their receipts and exit.",
+        )
+
+    def handle(self, *args, **options):
+        config = get_worker_settings()
+        for option, key in [
+            ("concurrency", "CONCURRENCY"),
+            ("batch_size", "BATCH_SIZE"),
+            ("poll_interval", "POLL_INTERVAL"),
+            ("max_attempts", "MAX_ATTEMPTS"),
+        ]:
+            if options[option] is not None:
+                config[key] = options[option]
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        blockchain = get_blockchain_service()
+        if not blockchain.is_healthy():
+            self.stdout.write(self.style.WARNING(
+                "Blockchain service is not healthy; failed attempts will be retried with backoff."
+            ))
+
+        merkle_mode = get_anchor_mode() == ANCHOR_MODE_MERKLE
+
+        self.stdout.write(self.style.HTTP_INFO(
+            f"Anchor worker {worker_id} started "
+            f"(mode={get_anchor_mode()}, concurrency={config['CONCURRENCY']}, batch_size={config['BATCH_SIZE']})"
+        ))
+
+        submitted = anchored = failed = 0
+        with ThreadPoolExecutor(max_workers=config["CONCURRENCY"]) as pool:
+            while not self._stopping:
+                close_old_connections()
+
+                # Roll pending events into Merkle roots; --once flushes the open window
+                if merkle_mode:
+                    while build_merkle_batch(config, force=options["once"]):
+                        pass
+
+                # Pass 1: broadcast due rows
+                items = claim_items(worker_id, config["BATCH_SIZE"], config)
+                if items:
+                    results = list(pool.map(lambda item: self._run(submit_item, item, blockchain, config), items))
+                    submitted += sum(1 for ok in results if ok)
+                    failed += sum(1 for ok in results if not ok)
+
+                # Pass 2: collect receipts of in-flight transactions
+                in_flight = claim_submitted(worker_id, config["BATCH_SIZE"], config)
+                if in_flight:
+                    results = list(pool.map(lambda item: self._run(collect_receipt, item, blockchain, config), in_flight))
+                    anchored += sum(1 for ok in results if ok is True)
+                    failed += sum(1 for ok in results if ok is False)
+
+                if items or in_flight:
+                    self.stdout.write(
+                        f"Submitted {len(items)}, checked {len(in_flight)}: "
+                        f"{submitted} submitted, {anchored} anchored, {failed} failed so far"
+                    )
+                    continue
+
+                if options["once"] and not has_in_flight():
+                    break
+                time.sleep(config["POLL_INTERVAL"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Anchor worker {worker_id} stopped ({anchored} anchored, {failed} failed)"
+        ))
+
+    def _run(self, func, item, blockchain, config):
+        """
+        Run one row through `func` on a pool thread.
+
+        An unexpected error is recorded on the row (retry with backoff)
+        instead of stopping the worker. The thread's DB connection is kept
+        for the next row unless it is broken or past CONN_MAX_AGE.
+        """
+        try:
+            return func(item, blockchain, config)
+        except Exception as e:
+            try:
+                record_failure(item, e, config)
+            except Exception as record_error:
+                # The lease expires and another poll retries the row
+                self.stderr.write(f"Could not record the failure of outbox row {item.id}: {record_error}")
+            return False
+        finally:
+            close_old_connections()
+
+    def _request_stop(self, signum, frame):
+        self.stdout.write(self.style.WARNING("Stop requested; finishing in-flight items..."))
+        self._stopping = True
@@ -0,0 +1,103 @@
+"""
+Management Command: sync_anchor_index
+
+Copies HashAnchored event logs from the HashAnchor contract into the local
+AnchorRecordIndex table, which the anchor-history and verify endpoints
+read instead of making one RPC call per anchor.
+
+Usage:
+    python manage.py sync_anchor_index              # tail the chain forever
+    python manage.py sync_anchor_index --once       # catch up and exit
+    python manage.py sync_anchor_index --from-block 12345678 --once
+
+Only blocks at least ANCHOR_INDEX['CONFIRMATIONS'] deep are indexed, so
+records from reorged blocks never enter the table. Set
+HASH_ANCHOR_DEPLOY_BLOCK so the first sync does not scan from genesis.
+"""
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from supplychain.anchor_index import get_index_settings, sync_anchor_index
+from supplychain.blockchain_service import get_blockchain_service
+from supplychain.models import AnchorIndexCursor
+
+
+class Command(BaseCommand):
+    help = "Index HashAnchored logs into the AnchorRecordIndex table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Sync up to the confirmed head once and exit.",
+        )
+        parser.add_argument(
+            "--from-block",
+            type=int,
+            default=None,
+            help="Reset the cursor and re-index starting at this block.",
+        )
+        parser.add_argument(
+            "--confirmations",
+            type=int,
+            default=None,
+            help="Blocks to stay behind the head (default: ANCHOR_INDEX['CONFIRMATIONS']).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Blocks per eth_getLogs call (default: ANCHOR_INDEX['BLOCK_CHUNK']).",
+        )
+
+    def handle(self, *args, **options):
+        config = get_index_settings()
+        if options["confirmations"] is not None:
+            config["CONFIRMATIONS"] = options["confirmations"]
+        if options["chunk_size"] is not None:
+            config["BLOCK_CHUNK"] = options["chunk_size"]
+
+        blockchain = get_blockchain_service()
+        if not blockchain.is_healthy():
+            raise CommandError(f"Blockchain service is not available: {blockchain._init_error or 'RPC unreachable'}")
+
+        if options["from_block"] is not None:
+            AnchorIndexCursor.objects.update_or_create(
+                contract_address=blockchain.contract.address,
+                defaults={'last_synced_block': options["from_block"] - 1}
+            )
+            self.stdout.write(f"Cursor reset to start at block {options['from_block']}")
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        while not self._stopping:
+            close_old_connections()
+            try:
+                result = sync_anchor_index(blockchain, config)
+            except Exception as e:
+                if options["once"]:
+                    raise CommandError(f"Anchor index sync failed: {e}")
+                self.stdout.write(self.style.WARNING(f"Anchor index sync failed, will retry: {e}"))
+                result = None
+
+            if result and result["to_block"] is not None:
+                self.stdout.write(
+                    f"Indexed blocks {result['from_block']}-{result['to_block']}: {result['records']} anchor(s)"
+                )
+
+            if options["once"]:
+                break
+            time.sleep(config["POLL_INTERVAL"])
+
+        self.stdout.write(self.style.SUCCESS("Anchor index sync finished"))
+
+    def _request_stop(self, signum, frame):
+        self.stdout.write(self.style.WARNING("Stop requested; finishing current range..."))
+        self._stopping = True
@@ -0,0 +1,237 @@
+"""
+Management Command: verify_all_batches
+
+Nightly integrity sweep: recomputes the snapshot hash of every anchored
+event in the catalogue and runs the check verify_batch_integrity runs for
+a single batch (hash_generator.verify_event_hash): the stored (anchored)
+hash must match and, for Merkle-anchored events, the inclusion proof must
+hold and the root must be anchored on chain.
+
+Usage:
+    python manage.py verify_all_batches
+    python manage.py verify_all_batches --workers 8 --chunk-size 1000
+    python manage.py verify_all_batches --workers 0      # hash in-process
+
+Batches are read in keyset-paginated chunks with their parent batch and
+events prefetched. Event payloads are built in this process and hashed
+across a process pool. Mismatches are written to BatchIntegrityLog with
+bulk_create and integrity_status changes are saved with bulk_update.
+Each distinct Merkle root is looked up on chain once per sweep; batches
+whose root cannot be looked up (node unreachable) keep their status and
+are reported as unresolved.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Prefetch
+
+from supplychain.blockchain_service import get_blockchain_service
+from supplychain.hash_generator import generate_event_payload, hash_event_payload, verify_event_hash
+from supplychain.models import BatchEvent, BatchIntegrityLog, CropBatch, IntegrityStatus
+
+
+def _verify_tasks(tasks):
+    """
+    Hash event payloads and check them with verify_event_hash.
+
+    Runs in pool processes, so it only touches plain data.
+
+    Args:
+        tasks: list of (batch_pk, event_type, payload, stored_hex, proof, root_anchored_at)
+               tuples, where proof is (leaf_index, leaf_count, siblings, root_hex) or None
+
+    Returns:
+        list of (batch_pk, event_type, recomputed_hex, stored_hex, matches) tuples;
+        matches is None when the event's root could not be looked up
+    """
+    results = []
+    for batch_pk, event_type, payload, stored_hex, proof, root_anchored_at in tasks:
+        recomputed = hash_event_payload(payload)
+        matches, _ = verify_event_hash(recomputed, stored_hex, proof, root_anchored_at)
+        results.append((batch_pk, event_type, recomputed.hex(), stored_hex, matches))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Verify the anchored event hashes of every batch and record integrity failures."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Batches loaded per keyset page (default: 500).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Hashing processes; 0 hashes in this process (default: CPU count).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        workers = options["workers"]
+
+        anchored_events = BatchEvent.objects.filter(batch=OuterRef('pk'), snapshot_hash__isnull=False)
+        batches = (
+            CropBatch.objects.filter(Exists(anchored_events))
+            .select_related('parent_batch')
+            .prefetch_related(Prefetch(
+                'events',
+                queryset=BatchEvent.objects.select_related('merkle_proof').order_by('timestamp', 'id'),
+                to_attr='ordered_events'
+            ))
+            .order_by('pk')
+        )
+
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers > 0 else None
+        stats = {
+            "batches": 0, "events": 0, "mismatches": 0, "logs": 0, "status_changes": 0,
+            "failed_batches": 0, "unresolved_batches": 0, "roots": 0,
+        }
+        self._root_anchored_at = {}  # root hex -> on-chain timestamp, None if the lookup failed
+        self._blockchain = None
+        started = time.monotonic()
+        last_pk = 0
+
+        try:
+            while True:
+                chunk = list(batches.filter(pk__gt=last_pk)[:chunk_size])
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                self._verify_chunk(chunk, pool, workers, stats)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Verified {stats['batches']} batch(es) / {stats['events']} event(s) "
+                    f"up to id {last_pk} ({stats['batches'] / elapsed:.1f} batches/s)"
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self._report(stats, time.monotonic() - started)
+
+    def _build_tasks(self, batch):
+        """Payloads for a batch's anchored events, numbered like verify_batch_integrity."""
+        tasks = []
+        for i, event in enumerate(batch.ordered_events):
+            if not event.snapshot_hash:
+                continue
+            event_sequence = event.sequence if event.sequence is not None else i + 1
+            payload = generate_event_payload(
+                batch=batch,
+                event_type=event.event_type,
+                event_sequence=event_sequence,
+                actor_id=event.performed_by_id
+            )
+            proof = getattr(event, 'merkle_proof', None)
+            proof_data = (proof.leaf_index, proof.leaf_count, proof.siblings, proof.root_hash) if proof else None
+            tasks.append([batch.pk, event.event_type, payload, event.snapshot_hash, proof_data, None])
+        return tasks
+
+    def _resolve_roots(self, tasks, stats):
+        """Fill in the on-chain timestamp of each task's Merkle root, looking each root up once."""
+        for task in tasks:
+            proof = task[4]
+            if proof is None:
+                continue
+            root_hex = proof[3]
+            if root_hex not in self._root_anchored_at:
+                if self._blockchain is None:
+                    self._blockchain = get_blockchain_service()
+                try:
+                    self._root_anchored_at[root_hex] = self._blockchain.get_root_anchored_at(bytes.fromhex(root_hex))
+                except Exception as e:
+                    self.stderr.write(f"  Could not look up Merkle root {root_hex}: {e}")
+                    self._root_anchored_at[root_hex] = None
+                stats["roots"] += 1
+            task[5] = self._root_anchored_at[root_hex]
+
+    def _verify_chunk(self, chunk, pool, workers, stats):
+        tasks = []
+        for batch in chunk:
+            tasks.extend(self._build_tasks(batch))
+        self._resolve_roots(tasks, stats)
+
+        if pool:
+            size = max(1, len(tasks) // (workers * 4) + 1)
+            slices = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+            results = [result for part in pool.map(_verify_tasks, slices) for result in part]
+        else:
+            results = _verify_tasks(tasks)
+
+        failed_batches = set()
+        unresolved_batches = set()
+        mismatches = []
+        for batch_pk, event_type, recomputed_hex, stored_hex, matches in results:
+            if matches is None:
+                unresolved_batches.add(batch_pk)
+            elif not matches:
+                failed_batches.add(batch_pk)
+                mismatches.append((batch_pk, event_type, stored_hex, recomputed_hex))
+
+        # Skip mismatches that are already logged, like get_or_create in verify_batch_integrity
+        existing = set(
+            BatchIntegrityLog.objects.filter(batch_id__in=failed_batches)
+            .values_list('batch_id', 'event_type', 'blockchain_hash', 'recomputed_hash')
+        )
+        new_logs = [
+            BatchIntegrityLog(
+                batch_id=batch_pk,
+                event_type=event_type,
+                blockchain_hash=stored_hex,
+                recomputed_hash=recomputed_hex
+            )
+            for batch_pk, event_type, stored_hex, recomputed_hex in set(mismatches)
+            if (batch_pk, event_type, stored_hex, recomputed_hex) not in existing
+        ]
+        BatchIntegrityLog.objects.bulk_create(new_logs)
+
+        changed = []
+        for batch in chunk:
+            if batch.pk in unresolved_batches and batch.pk not in failed_batches:
+                continue
+            new_status = IntegrityStatus.INTEGRITY_FAILED if batch.pk in failed_batches else IntegrityStatus.VERIFIED
+            if batch.integrity_status != new_status:
+                batch.integrity_status = new_status
+                changed.append(batch)
+        CropBatch.objects.bulk_update(changed, ['integrity_status'])
+
+        stats["batches"] += len(chunk)
+        stats["events"] += len(results)
+        stats["mismatches"] += len(mismatches)
+        stats["logs"] += len(new_logs)
+        stats["status_changes"] += len(changed)
+        stats["failed_batches"] += len(failed_batches)
+        stats["unresolved_batches"] += len(unresolved_batches - failed_batches)
+
+    def _report(self, stats, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        self.stdout.write("")
+        self.stdout.write(self.style.HTTP_INFO("Integrity sweep summary"))
+        self.stdout.write(f"  Batches verified      : {stats['batches']}")
+        self.stdout.write(f"  Events verified       : {stats['events']}")
+        self.stdout.write(f"  Batches failing       : {stats['failed_batches']}")
+        self.stdout.write(f"  Event mismatches      : {stats['mismatches']} ({stats['logs']} newly logged)")
+        self.stdout.write(f"  Status changes        : {stats['status_changes']}")
+        self.stdout.write(f"  Merkle roots checked  : {stats['roots']}")
+        self.stdout.write(f"  Batches unresolved    : {stats['unresolved_batches']}")
+        self.stdout.write(f"  Elapsed               : {elapsed:.2f}s")
+        self.stdout.write(f"  Throughput            : {stats['batches'] / elapsed:.1f} batches/s, "
+                          f"{stats['events'] / elapsed:.1f} events/s")
+
+        if stats["failed_batches"]:
+            self.stdout.write(self.style.ERROR(f"{stats['failed_batches']} batch(es) failed integrity verification"))
+        elif stats["unresolved_batches"]:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['unresolved_batches']} batch(es) could not be checked against the chain"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("All anchored batches verified"))
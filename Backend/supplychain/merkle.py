@@ -0,0 +1,100 @@
+"""
+Merkle Tree Module
+
+Builds Merkle trees over event snapshot hashes so a single on-chain anchor
+(the root) covers many events, and verifies inclusion proofs.
+
+Hashing is SHA256 with domain separation: leaves are hashed as
+sha256(0x00 || leaf) and inner nodes as sha256(0x01 || left || right), so
+an inner node can never be passed off as a leaf. When a level has an odd
+number of nodes the last one is promoted to the next level unchanged
+(rather than paired with itself), which is why verification needs the
+leaf count as well as the sibling path.
+"""
+
+import hashlib
+from typing import List
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def _hash_leaf(leaf: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + leaf).digest()
+
+
+def _hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    Build every level of the tree, from hashed leaves up to the root.
+
+    Args:
+        leaves: Snapshot hashes in leaf order
+
+    Returns:
+        list: Levels of node hashes; levels[-1][0] is the root
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    level = [_hash_leaf(leaf) for leaf in leaves]
+    levels = [level]
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level), 2):
+            if i + 1 < len(level):
+                next_level.append(_hash_node(level[i], level[i + 1]))
+            else:
+                next_level.append(level[i])
+        levels.append(next_level)
+        level = next_level
+    return levels
+
+
+def merkle_root(levels: List[List[bytes]]) -> bytes:
+    """Return the root of a tree built by build_levels()."""
+    return levels[-1][0]
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[str]:
+    """
+    Sibling path for the leaf at `index`, bottom-up, as hex strings.
+
+    Levels where the node was promoted without a sibling contribute nothing.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling].hex())
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: bytes, index: int, leaf_count: int, proof: List[str], root: bytes) -> bool:
+    """
+    Check that `leaf` sits at `index` in a tree of `leaf_count` leaves with the given root.
+
+    Returns:
+        bool: True if the proof reproduces the root exactly
+    """
+    if leaf_count < 1 or not 0 <= index < leaf_count:
+        return False
+
+    node = _hash_leaf(leaf)
+    siblings = list(proof)
+    width = leaf_count
+    while width > 1:
+        sibling = index ^ 1
+        if sibling < width:
+            if not siblings:
+                return False
+            sibling_hash = bytes.fromhex(siblings.pop(0))
+            node = _hash_node(sibling_hash, node) if index & 1 else _hash_node(node, sibling_hash)
+        index //= 2
+        width = (width + 1) // 2
+
+    return not siblings and node == root
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0026_anchor_nonce_pipelining'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anchoroutbox',
+            name='merkle_root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='merkle_leaves', to='supplychain.anchoroutbox'),
+        ),
+        migrations.AlterField(
+            model_name='anchoroutbox',
+            name='event',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='anchor_outbox', to='supplychain.batchevent'),
+        ),
+        migrations.AlterField(
+            model_name='anchoroutbox',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('BATCHED', 'Batched into Merkle root'), ('SUBMITTED', 'Submitted'), ('ANCHORED', 'Anchored'), ('FAILED', 'Failed')], default='PENDING', max_length=16),
+        ),
+        migrations.CreateModel(
+            name='MerkleProof',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('root_hash', models.CharField(db_index=True, max_length=64)),
+                ('anchor_batch_id', models.CharField(max_length=100)),
+                ('leaf_index', models.PositiveIntegerField()),
+                ('leaf_count', models.PositiveIntegerField()),
+                ('siblings', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='merkle_proof', to='supplychain.batchevent')),
+            ],
+        ),
+    ]
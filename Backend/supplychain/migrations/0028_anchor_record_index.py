@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0027_merkle_anchoring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnchorIndexCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42, unique=True)),
+                ('last_synced_block', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnchorRecordIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_key', models.CharField(max_length=64)),
+                ('record_index', models.PositiveBigIntegerField()),
+                ('snapshot_hash', models.CharField(max_length=64)),
+                ('anchored_at', models.PositiveBigIntegerField()),
+                ('anchored_by', models.CharField(max_length=42)),
+                ('context', models.TextField(blank=True)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('block_number', models.PositiveBigIntegerField()),
+                ('log_index', models.PositiveIntegerField()),
+                ('indexed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['batch_key', 'record_index'],
+                'constraints': [models.UniqueConstraint(fields=('batch_key', 'record_index'), name='unique_anchor_record')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0028_anchor_record_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchevent',
+            name='sequence',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='batchevent',
+            constraint=models.UniqueConstraint(fields=('batch', 'sequence'), name='unique_batch_event_sequence'),
+        ),
+    ]
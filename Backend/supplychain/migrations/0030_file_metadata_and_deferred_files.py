@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:27
+
+import supplychain.db_file_fields
+from django.db import migrations
+
+FILE_FIELDS = {
+    'CropBatch': ['qr_code_image', 'organic_certificate', 'quality_test_report'],
+    'KYCRecord': ['document_file'],
+    'TransportRequest': ['delivery_proof'],
+    'InspectionReport': ['report_file'],
+}
+
+
+def backfill_file_metadata(apps, schema_editor):
+    """
+    Fill the *_meta columns for files stored before they existed.
+    Loads one file column at a time so large BYTEA values are not all in memory.
+    """
+    for model_name, field_names in FILE_FIELDS.items():
+        Model = apps.get_model('supplychain', model_name)
+        for field_name in field_names:
+            rows = Model.objects.filter(**{f'{field_name}__isnull': False}).only('pk', field_name)
+            for row in rows.iterator(chunk_size=100):
+                stored = getattr(row, field_name)
+                metadata = supplychain.db_file_fields.compute_file_metadata(stored.data if stored else None)
+                Model.objects.filter(pk=row.pk).update(**{f'{field_name}_meta': metadata})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0029_batchevent_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cropbatch',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='inspectionreport',
+            options={'base_manager_name': 'objects', 'ordering': ['created_at']},
+        ),
+        migrations.AlterModelOptions(
+            name='kycrecord',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='transportrequest',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AddField(
+            model_name='cropbatch',
+            name='organic_certificate_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='organic_certificate'),
+        ),
+        migrations.AddField(
+            model_name='cropbatch',
+            name='qr_code_image_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='qr_code_image'),
+        ),
+        migrations.AddField(
+            model_name='cropbatch',
+            name='quality_test_report_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='quality_test_report'),
+        ),
+        migrations.AddField(
+            model_name='inspectionreport',
+            name='report_file_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='report_file'),
+        ),
+        migrations.AddField(
+            model_name='kycrecord',
+            name='document_file_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='document_file'),
+        ),
+        migrations.AddField(
+            model_name='transportrequest',
+            name='delivery_proof_meta',
+            field=supplychain.db_file_fields.FileMetadataField(blank=True, editable=False, null=True, source='delivery_proof'),
+        ),
+        migrations.RunPython(backfill_file_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:33
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_cumulative_transport_fees(apps, schema_editor):
+    """
+    Sum DELIVERED transporter fees over each batch and its ancestors,
+    as CropBatchSerializer.get_total_transport_fees used to per request.
+    """
+    CropBatch = apps.get_model('supplychain', 'CropBatch')
+    TransportRequest = apps.get_model('supplychain', 'TransportRequest')
+
+    own_fees = dict(
+        TransportRequest.objects.filter(status='DELIVERED')
+        .values('batch_id').annotate(total=Sum('transporter_fee_per_unit'))
+        .values_list('batch_id', 'total')
+    )
+    parents = dict(CropBatch.objects.values_list('pk', 'parent_batch_id'))
+    totals = {}
+
+    def cumulative(batch_id):
+        # Iterative walk so deep split chains cannot hit the recursion limit
+        chain = []
+        while batch_id is not None and batch_id not in totals and batch_id not in chain:
+            chain.append(batch_id)
+            batch_id = parents.get(batch_id)
+        total = totals.get(batch_id, Decimal('0'))
+        for pk in reversed(chain):
+            total += own_fees.get(pk) or Decimal('0')
+            totals[pk] = total
+
+    for batch_id in parents:
+        cumulative(batch_id)
+
+    batches = [
+        CropBatch(pk=pk, cumulative_transport_fee_per_unit=total)
+        for pk, total in totals.items() if total
+    ]
+    CropBatch.objects.bulk_update(batches, ['cumulative_transport_fee_per_unit'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0031_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cropbatch',
+            name='cumulative_transport_fee_per_unit',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cumulative_transport_fees, migrations.RunPython.noop),
+    ]
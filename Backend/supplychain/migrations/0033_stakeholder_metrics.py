@@ -0,0 +1,146 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:41
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+ZERO = Decimal('0')
+
+
+def _month(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+# Bucket contributions of each tracked row, as stakeholder_metrics.py
+# computed them when this migration was written: model -> (values() fields,
+# row -> [(profile_id, month, metric, status, dimension, role), (count, quantity, amount)])
+def _batch_contributions(row):
+    month = _month(row['created_at'])
+    quantity = row['quantity']
+    if not row['is_child_batch']:
+        yield (
+            (row['farmer_id'], month, 'farmer_batches', row['status'], row['crop_type'], ''),
+            (1, quantity, quantity * row['farmer_base_price_per_unit']),
+        )
+    if row['current_owner__stakeholderprofile']:
+        yield (
+            (row['current_owner__stakeholderprofile'], month, 'owned_batches', row['status'], row['crop_type'], ''),
+            (1, quantity, quantity * row['distributor_margin_per_unit']),
+        )
+
+
+def _transport_contributions(row):
+    month = _month(row['created_at'])
+    yield (row['from_party_id'], month, 'outgoing_transports', row['status'], '', ''), (1, ZERO, ZERO)
+    yield (row['to_party_id'], month, 'incoming_transports', row['status'], '', ''), (1, ZERO, ZERO)
+    if row['transporter_id']:
+        yield (
+            (row['transporter_id'], month, 'assigned_transports', row['status'], '', row['from_party__role']),
+            (1, ZERO, row['transporter_fee_per_unit']),
+        )
+
+
+def _listing_contributions(row):
+    month = _month(row['created_at'])
+    crop_type = row['batch__crop_type'] or ''
+    if row['is_for_sale'] and row['remaining_quantity'] > 0:
+        yield (
+            (row['retailer_id'], month, 'listing_stock', '', crop_type, ''),
+            (1, row['remaining_quantity'], row['remaining_quantity'] * row['selling_price_per_unit']),
+        )
+    if row['units_sold'] > 0:
+        yield (
+            (row['retailer_id'], month, 'listing_sales', '', crop_type, ''),
+            (1, row['units_sold'], row['total_revenue_generated']),
+        )
+
+
+def _payment_contributions(row):
+    month = _month(row['created_at'])
+    values = (1, ZERO, row['amount'])
+    yield (row['payer_id'], month, 'payments_made', row['status'], row['payment_type'], row['payee_role']), values
+    yield (row['payee_id'], month, 'payments_received', row['status'], row['payment_type'], row['payer_role']), values
+
+
+TRACKED_MODELS = {
+    'CropBatch': (
+        ('farmer_id', 'is_child_batch', 'current_owner__stakeholderprofile', 'status', 'crop_type',
+         'quantity', 'farmer_base_price_per_unit', 'distributor_margin_per_unit', 'created_at'),
+        _batch_contributions,
+    ),
+    'TransportRequest': (
+        ('from_party_id', 'to_party_id', 'transporter_id', 'from_party__role', 'status',
+         'transporter_fee_per_unit', 'created_at'),
+        _transport_contributions,
+    ),
+    'RetailListing': (
+        ('retailer_id', 'is_for_sale', 'remaining_quantity', 'selling_price_per_unit', 'units_sold',
+         'total_revenue_generated', 'batch__crop_type', 'created_at'),
+        _listing_contributions,
+    ),
+    'Payment': (
+        ('payer_id', 'payee_id', 'payer_role', 'payee_role', 'payment_type', 'status', 'amount', 'created_at'),
+        _payment_contributions,
+    ),
+}
+
+
+def backfill_stakeholder_metrics(apps, schema_editor):
+    """
+    Fill the rollup from the existing rows, as `manage.py rebuild_metrics`
+    does, so the dashboards do not start from zeros.
+    """
+    StakeholderMetrics = apps.get_model('supplychain', 'StakeholderMetrics')
+    totals = defaultdict(lambda: [0, ZERO, ZERO])
+    for model_name, (fields, contribute) in TRACKED_MODELS.items():
+        rows = apps.get_model('supplychain', model_name)._base_manager.order_by().values(*fields)
+        for row in rows.iterator(chunk_size=2000):
+            for key, (count, quantity, amount) in contribute(row):
+                bucket = totals[key]
+                bucket[0] += count
+                bucket[1] += quantity
+                bucket[2] += amount
+
+    bucket_fields = ('profile_id', 'month', 'metric', 'status', 'dimension', 'role')
+    StakeholderMetrics.objects.bulk_create(
+        [
+            StakeholderMetrics(**dict(zip(bucket_fields, key)), count=count, quantity=quantity, amount=amount)
+            for key, (count, quantity, amount) in totals.items() if count or quantity or amount
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0032_cropbatch_cumulative_transport_fee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StakeholderMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('metric', models.CharField(max_length=32)),
+                ('status', models.CharField(blank=True, default='', max_length=32)),
+                ('dimension', models.CharField(blank=True, default='', max_length=120)),
+                ('role', models.CharField(blank=True, default='', max_length=32)),
+                ('count', models.BigIntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('amount', models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='supplychain.stakeholderprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('profile', 'month', 'metric', 'status', 'dimension', 'role'), name='unique_stakeholder_metrics_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_stakeholder_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:51
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_prefix_index(apps, schema_editor):
+    """Prefix (LIKE 'X%') search on UPPER(product_batch_id); text_pattern_ops is Postgres-only."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS cropbatch_product_id_prefix "
+        "ON supplychain_cropbatch (UPPER(product_batch_id) text_pattern_ops)"
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS cropbatch_product_id_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0033_stakeholder_metrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cropbatch',
+            index=models.Index(django.db.models.functions.text.Upper('public_batch_id'), name='cropbatch_public_id_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='cropbatch',
+            index=models.Index(django.db.models.functions.text.Upper('product_batch_id'), name='cropbatch_product_id_upper'),
+        ),
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
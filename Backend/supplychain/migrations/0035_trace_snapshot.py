@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0034_cropbatch_trace_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.JSONField()),
+                ('etag', models.CharField(max_length=64)),
+                ('has_qr_code', models.BooleanField(default=False)),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trace_snapshot', to='supplychain.cropbatch')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplychain', '0035_trace_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anchorernonce',
+            name='released_nonces',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
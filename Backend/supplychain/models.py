@@ -1,7 +1,12 @@
+from decimal import Decimal
+
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
-from .db_file_fields import DatabaseFileField, DatabaseImageField
+from .db_file_fields import (
+    DatabaseFileField, DatabaseFileModelMixin, DatabaseImageField, DeferredFileManager, DeferredFileQuerySet, FileMetadataField
+)
 
 
 class StakeholderRole(models.TextChoices):
@@ -36,13 +41,14 @@ class StakeholderProfile(models.Model):
         return f"{self.user.username} ({self.role})"
 
 
-class KYCRecord(models.Model):
+class KYCRecord(DatabaseFileModelMixin, models.Model):
     profile = models.ForeignKey(
         StakeholderProfile, on_delete=models.CASCADE, related_name="kyc_records"
     )
     document_type = models.CharField(max_length=100)
     document_number = models.CharField(max_length=255)
     document_file = DatabaseFileField(blank=True, null=True)
+    document_file_meta = FileMetadataField(source="document_file")
     status = models.CharField(
         max_length=32, choices=KYCStatus.choices, default=KYCStatus.PENDING
     )
@@ -56,6 +62,11 @@ class KYCRecord(models.Model):
     verified_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DeferredFileManager()
+
+    class Meta:
+        base_manager_name = "objects"
+
     def __str__(self) -> str:
         return f"{self.profile.user.username} - {self.document_type}"
 
@@ -97,7 +108,40 @@ class BatchPhase(models.TextChoices):
     RETAILER_PHASE = "RETAILER_PHASE", "Retailer Phase"
 
 
-class CropBatch(models.Model):
+class CropBatchQuerySet(DeferredFileQuerySet):
+    """
+    Batch totals computed by the database in Decimal.
+
+        CropBatch.objects.filter(farmer=profile, status=BatchStatus.SOLD).revenue_for_farmer()
+
+    The with_* variants annotate instead, so after values() they give one
+    total per group.
+    """
+
+    def _sum_value(self, price_field):
+        # quantity and prices have 2 decimal places, so products need 4
+        value = models.DecimalField(max_digits=24, decimal_places=4)
+        return models.Sum(
+            models.ExpressionWrapper(models.F('quantity') * models.F(price_field), output_field=value),
+            output_field=value,
+        )
+
+    def revenue_for_farmer(self):
+        """Sum of quantity x farmer_base_price_per_unit over these batches."""
+        return self.aggregate(total=self._sum_value('farmer_base_price_per_unit'))['total'] or Decimal('0')
+
+    def margin_for_distributor(self):
+        """Sum of quantity x distributor_margin_per_unit over these batches."""
+        return self.aggregate(total=self._sum_value('distributor_margin_per_unit'))['total'] or Decimal('0')
+
+    def with_farmer_revenue(self):
+        return self.annotate(farmer_revenue=self._sum_value('farmer_base_price_per_unit'))
+
+    def with_distributor_margin(self):
+        return self.annotate(distributor_margin=self._sum_value('distributor_margin_per_unit'))
+
+
+class CropBatch(DatabaseFileModelMixin, models.Model):
     farmer = models.ForeignKey(
         StakeholderProfile, on_delete=models.PROTECT, related_name="crop_batches"
     )
@@ -126,13 +170,19 @@ class CropBatch(models.Model):
     product_batch_id = models.CharField(max_length=100, unique=True, blank=True)
     public_batch_id = models.CharField(max_length=100, unique=True, blank=True, null=True)
     qr_code_image = DatabaseImageField(blank=True, null=True)
+    qr_code_image_meta = FileMetadataField(source="qr_code_image")
     qr_code_data = models.TextField(blank=True)
     organic_certificate = DatabaseFileField(blank=True, null=True)
+    organic_certificate_meta = FileMetadataField(source="organic_certificate")
     quality_test_report = DatabaseFileField(blank=True, null=True)
+    quality_test_report_meta = FileMetadataField(source="quality_test_report")
     
     # Linear Pricing Fields
     farmer_base_price_per_unit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     distributor_margin_per_unit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Sum of DELIVERED transporter fees per unit over this batch and its ancestors
+    # (maintained by transport_fees.py)
+    cumulative_transport_fee_per_unit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     # Financial State Machine Fields
     financial_status = models.CharField(
@@ -164,7 +214,23 @@ class CropBatch(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
+    # Documents that split children share with their parent batch
+    SHARED_DOCUMENT_FIELDS = ("organic_certificate", "quality_test_report")
+
+    # File columns are deferred; related lookups (event.batch etc.) go through this manager too
+    objects = DeferredFileManager.from_queryset(CropBatchQuerySet)()
+
+    class Meta:
+        base_manager_name = "objects"
+        indexes = [
+            # Case-insensitive trace lookups (trace_lookup.py); the Postgres-only
+            # prefix index cropbatch_product_id_prefix is created by migration 0034
+            models.Index(Upper("public_batch_id"), name="cropbatch_public_id_upper"),
+            models.Index(Upper("product_batch_id"), name="cropbatch_product_id_upper"),
+        ]
+
+    def assign_identifiers(self):
+        """Generate the product and public batch ids if not set (bulk_create skips save())."""
         if not self.product_batch_id:
             import uuid
             import datetime
@@ -174,6 +240,9 @@ class CropBatch(models.Model):
         if not self.public_batch_id:
             import uuid
             self.public_batch_id = str(uuid.uuid4())
+
+    def save(self, *args, **kwargs):
+        self.assign_identifiers()
         
         # Auto-set owner to farmer's user if not set
         if not self.current_owner and self.farmer:
@@ -225,23 +294,175 @@ class BatchEvent(models.Model):
         related_name="batch_events"
     )
     timestamp = models.DateTimeField(auto_now_add=True)
+    # 1-based position in the batch's history, assigned by log_batch_event
+    sequence = models.PositiveIntegerField(blank=True, null=True)
     metadata = models.JSONField(default=dict, blank=True)
     
     # Blockchain integration fields
     blockchain_tx_hash = models.CharField(max_length=128, blank=True, null=True)
     blockchain_block_number = models.BigIntegerField(blank=True, null=True)
     snapshot_hash = models.CharField(max_length=64, blank=True, null=True)
+
+    objects = DeferredFileManager()
     
     class Meta:
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['batch', '-timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['batch', 'sequence'], name='unique_batch_event_sequence'),
+        ]
     
     def __str__(self):
         return f"{self.batch.product_batch_id} - {self.event_type} at {self.timestamp}"
 
 
+class AnchorOutboxStatus(models.TextChoices):
+    PENDING = "PENDING", "Pending"
+    IN_PROGRESS = "IN_PROGRESS", "In Progress"
+    BATCHED = "BATCHED", "Batched into Merkle root"
+    SUBMITTED = "SUBMITTED", "Submitted"
+    ANCHORED = "ANCHORED", "Anchored"
+    FAILED = "FAILED", "Failed"
+
+
+class AnchorOutbox(models.Model):
+    """
+    Durable queue of batch events waiting to be anchored on-chain.
+    Rows are written in the same transaction as their BatchEvent and
+    drained by `manage.py run_anchor_worker`.
+    In Merkle mode the worker adds one row without an event per Merkle
+    root; the event rows it covers point at it through `merkle_root`.
+    """
+    event = models.OneToOneField(
+        BatchEvent, on_delete=models.CASCADE, related_name="anchor_outbox",
+        blank=True, null=True
+    )
+    merkle_root = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, related_name="merkle_leaves",
+        blank=True, null=True
+    )
+    batch_identifier = models.CharField(max_length=100)
+    snapshot_hash = models.CharField(max_length=64)
+    context = models.CharField(max_length=64)
+    status = models.CharField(
+        max_length=16, choices=AnchorOutboxStatus.choices, default=AnchorOutboxStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=128, blank=True)
+    last_error = models.TextField(blank=True)
+    # In-flight transaction, set once the row is SUBMITTED
+    tx_hash = models.CharField(max_length=66, blank=True)
+    nonce = models.PositiveBigIntegerField(blank=True, null=True)
+    gas_price = models.PositiveBigIntegerField(blank=True, null=True)
+    replaced_tx_hashes = models.JSONField(default=list, blank=True)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DeferredFileManager()
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.batch_identifier} - {self.context} ({self.status})"
+
+
+class MerkleProof(models.Model):
+    """
+    Inclusion proof of an event's snapshot hash in an anchored Merkle root.
+    `siblings` holds the hex sibling hashes from the leaf up to the root.
+    """
+    event = models.OneToOneField(
+        BatchEvent, on_delete=models.CASCADE, related_name="merkle_proof"
+    )
+    root_hash = models.CharField(max_length=64, db_index=True)
+    anchor_batch_id = models.CharField(max_length=100)
+    leaf_index = models.PositiveIntegerField()
+    leaf_count = models.PositiveIntegerField()
+    siblings = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Proof for event {self.event_id} in {self.root_hash[:16]}..."
+
+
+class AnchorRecordIndex(models.Model):
+    """
+    Local copy of a HashAnchored event log, built by `manage.py sync_anchor_index`.
+    `batch_key` is the keccak256 batch id used on-chain (hex, no 0x prefix).
+    """
+    batch_key = models.CharField(max_length=64)
+    record_index = models.PositiveBigIntegerField()
+    snapshot_hash = models.CharField(max_length=64)
+    anchored_at = models.PositiveBigIntegerField()
+    anchored_by = models.CharField(max_length=42)
+    context = models.TextField(blank=True)
+    tx_hash = models.CharField(max_length=66)
+    block_number = models.PositiveBigIntegerField()
+    log_index = models.PositiveIntegerField()
+    indexed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['batch_key', 'record_index']
+        constraints = [
+            models.UniqueConstraint(fields=['batch_key', 'record_index'], name='unique_anchor_record'),
+        ]
+
+    def __str__(self):
+        return f"Anchor {self.batch_key[:16]}...#{self.record_index} (block {self.block_number})"
+
+
+class AnchorIndexCursor(models.Model):
+    """Last block of HashAnchored logs fully copied into AnchorRecordIndex, per contract."""
+    contract_address = models.CharField(max_length=42, unique=True)
+    last_synced_block = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.contract_address} @ block {self.last_synced_block}"
+
+
+class AnchorerNonce(models.Model):
+    """
+    Next transaction nonce for an anchorer wallet.
+    The row is locked while a nonce is handed out so several worker
+    threads and processes can sign transactions without colliding.
+    """
+    address = models.CharField(max_length=42, unique=True)
+    next_nonce = models.PositiveBigIntegerField(default=0)
+    # Nonces below next_nonce whose transactions were never broadcast
+    released_nonces = models.JSONField(default=list, blank=True)
+    synced_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} (next nonce {self.next_nonce})"
+
+
+class StoredBlob(models.Model):
+    """
+    Content-addressed file data shared by DatabaseFileField columns (see blob_store.py).
+    `backend` names where the bytes live; `data` is only used by the database backend.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    backend = models.CharField(max_length=32)
+    data = models.BinaryField(blank=True, null=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:16]}... ({self.size} bytes, {self.backend}, {self.refcount} refs)"
+
+
 class Certificate(models.Model):
     batch = models.ForeignKey(CropBatch, on_delete=models.CASCADE)
     certificate_type = models.CharField(max_length=120)
@@ -249,7 +470,7 @@ class Certificate(models.Model):
     issued_at = models.DateField(null=True, blank=True)
 
 
-class TransportRequest(models.Model):
+class TransportRequest(DatabaseFileModelMixin, models.Model):
     batch = models.ForeignKey(
         CropBatch, on_delete=models.CASCADE, related_name="transport_requests"
     )
@@ -281,12 +502,18 @@ class TransportRequest(models.Model):
     pickup_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
     delivery_proof = DatabaseFileField(blank=True, null=True)
+    delivery_proof_meta = FileMetadataField(source="delivery_proof")
     
     # Linear Pricing Fields
     transporter_fee_per_unit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DeferredFileManager()
+
+    class Meta:
+        base_manager_name = "objects"
+
     def __str__(self) -> str:
         return f"Transport {self.batch.product_batch_id}"
 
@@ -313,7 +540,7 @@ class InspectionStage(models.TextChoices):
     RETAILER = "retailer", "Retailer"
 
 
-class InspectionReport(models.Model):
+class InspectionReport(DatabaseFileModelMixin, models.Model):
     batch = models.ForeignKey(
         CropBatch, on_delete=models.CASCADE, related_name="inspection_reports"
     )
@@ -325,6 +552,7 @@ class InspectionReport(models.Model):
         max_length=32, choices=InspectionResult.choices, default=InspectionResult.PASS
     )
     report_file = DatabaseFileField(blank=True, null=True)
+    report_file_meta = FileMetadataField(source="report_file")
     # Legacy field - kept for backward compatibility
     storage_conditions = models.TextField(blank=True)
     passed = models.BooleanField(default=False)
@@ -347,8 +575,11 @@ class InspectionReport(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     inspected_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DeferredFileManager()
+
     class Meta:
         ordering = ['created_at']
+        base_manager_name = "objects"
 
     def __str__(self):
         return f"Inspection {self.batch.product_batch_id} - {self.stage}"
@@ -377,6 +608,8 @@ class BatchSplit(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DeferredFileManager()
+
     def __str__(self) -> str:
         return f"{self.parent_batch.product_batch_id} - {self.split_label}"
 
@@ -405,6 +638,8 @@ class RetailListing(models.Model):
     is_for_sale = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DeferredFileManager()
+
     @property
     def total_price(self) -> float:
         """Total price per unit (selling price)"""
@@ -491,6 +726,8 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DeferredFileManager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -503,6 +740,60 @@ class Payment(models.Model):
         return f"Payment {self.id} - {self.batch.product_batch_id} - {self.status}"
 
 
+class StakeholderMetrics(models.Model):
+    """
+    Dashboard rollup: totals per stakeholder, month, metric and dimension.
+
+    Maintained incrementally from batch, transport, listing and payment saves
+    (see stakeholder_metrics.py); `manage.py rebuild_metrics` recomputes it.
+    `month` is the creation month of the rows counted. `status`, `dimension`
+    (crop type or payment type) and `role` (the other party's role) are ''
+    where a metric does not use them.
+    """
+    profile = models.ForeignKey(
+        StakeholderProfile, on_delete=models.CASCADE, related_name="metrics"
+    )
+    month = models.DateField()
+    metric = models.CharField(max_length=32)
+    status = models.CharField(max_length=32, blank=True, default='')
+    dimension = models.CharField(max_length=120, blank=True, default='')
+    role = models.CharField(max_length=32, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+    quantity = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    amount = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile', 'month', 'metric', 'status', 'dimension', 'role'],
+                name='unique_stakeholder_metrics_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.profile_id} {self.month:%Y-%m} {self.metric} {self.status} {self.dimension} {self.role}"
+
+
+class TraceSnapshot(models.Model):
+    """
+    Pre-rendered public trace document of a LISTED or SOLD batch.
+
+    Rendered by trace_snapshots.py when the batch is listed and again after
+    each later event; `etag` is the SHA-256 of the canonical JSON. The QR
+    code URL is signed per request and added when the document is served.
+    """
+    batch = models.OneToOneField(
+        CropBatch, on_delete=models.CASCADE, related_name="trace_snapshot"
+    )
+    document = models.JSONField()
+    etag = models.CharField(max_length=64)
+    has_qr_code = models.BooleanField(default=False)
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Trace {self.batch_id} @ {self.etag[:12]}"
+
+
 # Later phase: After all payments declared, generate SHA256 hash and push to blockchain module.
 
 
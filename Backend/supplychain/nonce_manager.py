@@ -0,0 +1,125 @@
+"""
+Nonce Manager
+
+Hands out transaction nonces for the anchorer wallet locally instead of
+asking the RPC node for `get_transaction_count` before every anchor.
+
+The next nonce lives in the AnchorerNonce table and is read and bumped
+under a row lock (SELECT ... FOR UPDATE), so worker threads and separate
+worker processes never sign two transactions with the same nonce. The
+row is seeded from the node's `pending` transaction count.
+
+The counter never moves below a nonce another worker may still be
+broadcasting: a released nonce that is not the latest allocation is kept
+in `released_nonces` and handed out again before new ones, and a resync
+after a nonce conflict only moves the counter up to the node's pending
+count. (Broadcast transactions the node dropped keep their nonces; the
+anchor worker rebroadcasts them.)
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AnchorerNonce
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """
+    Allocates sequential nonces for one wallet address.
+
+    Usage:
+        nonce = manager.allocate()
+        try:
+            send(tx with nonce)
+        except NonceConflict:
+            manager.resync()
+        except Exception:
+            manager.release(nonce)
+    """
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+
+    def _pending_count(self) -> int:
+        """Next nonce according to the node, including mempool transactions."""
+        return self.w3.eth.get_transaction_count(self.address, 'pending')
+
+    def _lock_row(self) -> AnchorerNonce:
+        """Lock (creating and seeding if needed) the nonce row. Call inside a transaction."""
+        row = AnchorerNonce.objects.select_for_update().filter(address=self.address).first()
+        if row is None:
+            AnchorerNonce.objects.get_or_create(
+                address=self.address,
+                defaults={'next_nonce': self._pending_count(), 'synced_at': timezone.now()}
+            )
+            row = AnchorerNonce.objects.select_for_update().get(address=self.address)
+        return row
+
+    def allocate(self) -> int:
+        """
+        Reserve the next nonce.
+
+        Returns:
+            int: Nonce to sign the next transaction with
+        """
+        with transaction.atomic():
+            row = self._lock_row()
+            if row.released_nonces:
+                # Fill gaps first; later transactions wait on them
+                nonce = min(row.released_nonces)
+                row.released_nonces.remove(nonce)
+                row.save(update_fields=['released_nonces', 'updated_at'])
+                return nonce
+            nonce = row.next_nonce
+            row.next_nonce = nonce + 1
+            row.save(update_fields=['next_nonce', 'updated_at'])
+        return nonce
+
+    def release(self, nonce: int) -> None:
+        """
+        Return a nonce whose transaction was never broadcast.
+
+        If it was the most recent allocation the counter simply steps back.
+        Otherwise later nonces are already in use, so it is kept as a gap
+        for the next allocate().
+        """
+        with transaction.atomic():
+            row = self._lock_row()
+            gaps = set(row.released_nonces)
+            if nonce >= row.next_nonce or nonce in gaps:
+                return
+            gaps.add(nonce)
+            while row.next_nonce - 1 in gaps:
+                row.next_nonce -= 1
+                gaps.remove(row.next_nonce)
+            row.released_nonces = sorted(gaps)
+            row.save(update_fields=['next_nonce', 'released_nonces', 'updated_at'])
+
+    def resync(self) -> int:
+        """
+        Catch up with the node after it reported a nonce conflict.
+
+        Moves the counter up to the node's pending transaction count if
+        that is ahead (nonces used outside this manager) and forgets
+        released nonces the node has already seen. Never moves it down,
+        since nonces above the node's count may be in flight.
+
+        Returns:
+            int: The new next nonce
+        """
+        with transaction.atomic():
+            row = self._lock_row()
+            pending = self._pending_count()
+            if pending > row.next_nonce:
+                logger.warning(f"Resyncing nonce for {self.address}: local {row.next_nonce}, node {pending}")
+            row.next_nonce = max(pending, row.next_nonce)
+            row.released_nonces = [nonce for nonce in row.released_nonces if nonce >= pending]
+            row.synced_at = timezone.now()
+            row.save(update_fields=['next_nonce', 'released_nonces', 'synced_at', 'updated_at'])
+        return row.next_nonce
@@ -0,0 +1,37 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered on the primary key, newest first, and the cursor holds
+the id of the last row seen, so each page is one indexed range scan
+(`WHERE id < <cursor> ORDER BY id DESC LIMIT n`) no matter how deep the
+client pages. Rows inserted while a client is paging get higher ids and
+never shift or duplicate rows on the pages it has not fetched yet.
+
+Pagination is opt-in so existing clients that expect a plain list keep
+working: a request is paginated when it sends `cursor` or `page_size`,
+or always when PAGINATE_LISTS_BY_DEFAULT is enabled.
+
+    GET /api/crop-batches/?page_size=50
+    -> {"next": ".../?cursor=cD0xMjM%3D&page_size=50", "previous": null, "results": [...]}
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_requested(self, request):
+        """Whether this list request should be paginated."""
+        if getattr(settings, "PAGINATE_LISTS_BY_DEFAULT", False):
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
@@ -0,0 +1,118 @@
+"""
+Payment Analytics
+
+Every payment total the payment summary and the role dashboards show,
+for one or many stakeholders, computed from the Payment rows with
+conditional aggregates (`Sum(..., filter=Q(...))`) over the (payer, status)
+and (payee, status) indexes:
+
+    summary = get_payment_summary(profile)           # one query
+    summary.paid_transport                           # Decimal
+    summaries = get_payment_summaries([3, 7, 12])    # {profile_id: PaymentSummary}, one query per side
+
+The figures come from the payments themselves, not the StakeholderMetrics
+rollup, so they are right even after writes that bypassed its signals.
+"""
+
+from dataclasses import asdict, dataclass, fields
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import Payment, PaymentStatus, PaymentType, StakeholderRole
+
+SETTLED = [PaymentStatus.SETTLED]
+UNSETTLED = [PaymentStatus.PENDING, PaymentStatus.AWAITING_CONFIRMATION]
+
+RECEIVED = "payee"
+MADE = "payer"
+
+# field -> (side the profile is on, aggregate, payment filter)
+SUMMARY_AGGREGATES = {
+    "received_settled": (RECEIVED, Sum, Q(status__in=SETTLED)),
+    "received_settled_count": (RECEIVED, Count, Q(status__in=SETTLED)),
+    "received_batch_payments": (RECEIVED, Sum, Q(status__in=SETTLED, payment_type=PaymentType.BATCH_PAYMENT)),
+    "received_from_retailers": (RECEIVED, Sum, Q(status__in=SETTLED, payer_role=StakeholderRole.RETAILER)),
+    "received_pending": (RECEIVED, Sum, Q(status=PaymentStatus.PENDING)),
+    "received_unsettled": (RECEIVED, Sum, Q(status__in=UNSETTLED)),
+    "received_unsettled_count": (RECEIVED, Count, Q(status__in=UNSETTLED)),
+    "awaiting_confirmation_count": (RECEIVED, Count, Q(status=PaymentStatus.AWAITING_CONFIRMATION)),
+    "paid_to_farmers": (MADE, Sum, Q(status__in=SETTLED, payee_role=StakeholderRole.FARMER)),
+    "paid_to_distributors": (MADE, Sum, Q(status__in=SETTLED, payee_role=StakeholderRole.DISTRIBUTOR)),
+    "paid_transport": (MADE, Sum, Q(status__in=SETTLED, payment_type=PaymentType.TRANSPORT_SHARE)),
+    "paid_pending": (MADE, Sum, Q(status=PaymentStatus.PENDING)),
+    "paid_pending_count": (MADE, Count, Q(status=PaymentStatus.PENDING)),
+}
+
+
+def _aggregate(aggregate, condition):
+    return aggregate("amount" if aggregate is Sum else "id", filter=condition)
+
+
+@dataclass(frozen=True)
+class PaymentSummary:
+    """Payment totals of one stakeholder: amounts as Decimal, counts as numbers of payments."""
+
+    profile_id: int
+    received_settled: Decimal = Decimal("0")
+    received_settled_count: int = 0
+    received_batch_payments: Decimal = Decimal("0")
+    received_from_retailers: Decimal = Decimal("0")
+    received_pending: Decimal = Decimal("0")
+    received_unsettled: Decimal = Decimal("0")
+    received_unsettled_count: int = 0
+    awaiting_confirmation_count: int = 0
+    paid_to_farmers: Decimal = Decimal("0")
+    paid_to_distributors: Decimal = Decimal("0")
+    paid_transport: Decimal = Decimal("0")
+    paid_pending: Decimal = Decimal("0")
+    paid_pending_count: int = 0
+
+    def as_dict(self):
+        """JSON-ready dict, amounts as floats like the other API responses."""
+        return {
+            key: float(value) if isinstance(value, Decimal) else value
+            for key, value in asdict(self).items()
+        }
+
+
+def _summary(profile_id, row):
+    defaults = {field.name: field.default for field in fields(PaymentSummary) if field.name != "profile_id"}
+    values = {name: row.get(name) if row.get(name) is not None else defaults[name] for name in SUMMARY_AGGREGATES}
+    return PaymentSummary(profile_id=profile_id, **values)
+
+
+def get_payment_summaries(profile_ids):
+    """
+    Payment summaries for many stakeholders: one grouped query for the
+    payments they received and one for the payments they made.
+
+    Returns:
+        dict: profile id -> PaymentSummary (zeros for profiles without payments)
+    """
+    rows = {profile_id: {} for profile_id in profile_ids}
+    if not rows:
+        return {}
+    for side in (RECEIVED, MADE):
+        side_rows = (
+            Payment.objects.filter(**{f"{side}_id__in": list(rows)})
+            .values(f"{side}_id")
+            .annotate(**{
+                name: _aggregate(aggregate, condition)
+                for name, (name_side, aggregate, condition) in SUMMARY_AGGREGATES.items()
+                if name_side == side
+            })
+            .order_by()
+        )
+        for row in side_rows:
+            rows[row.pop(f"{side}_id")].update(row)
+    return {profile_id: _summary(profile_id, row) for profile_id, row in rows.items()}
+
+
+def get_payment_summary(profile):
+    """Payment summary of one stakeholder profile (one query)."""
+    row = Payment.objects.filter(Q(payer_id=profile.pk) | Q(payee_id=profile.pk)).aggregate(**{
+        name: _aggregate(aggregate, condition & Q(**{f"{side}_id": profile.pk}))
+        for name, (side, aggregate, condition) in SUMMARY_AGGREGATES.items()
+    })
+    return _summary(profile.pk, row)
@@ -4,7 +4,7 @@ Backend-controlled financial state machine with manual UPI execution
 and strict confirmation checkpoints.
 """
 from django.db import transaction
-from django.db.models import Q, Sum, Count
+from django.db.models import Q
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -15,6 +15,14 @@ from django.shortcuts import get_object_or_404
 from django.conf import settings
 
 from . import models, serializers
+from .fieldsets import SparseFieldsetMixin
+from .query_planner import QueryPlannerMixin
+from .admin_views import IsAdminUser
+from .payment_analytics import get_payment_summaries, get_payment_summary
+
+# Upper bound on profile ids per /api/payments/summary/batch/ request
+MAX_BATCH_SUMMARY_PROFILES = 500
+
 
 def get_upi_id(payee):
     if getattr(settings, "PAYMENT_MODE", "demo") == "demo":
@@ -22,13 +30,14 @@ def get_upi_id(payee):
     return payee.wallet_id or ""
 
 
-class PaymentViewSet(ModelViewSet):
+class PaymentViewSet(SparseFieldsetMixin, QueryPlannerMixin, ModelViewSet):
     """
     ViewSet for managing payments.
     Role-agnostic - users see payments where they are payer or payee.
     """
     serializer_class = serializers.PaymentSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 3
 
     def get_queryset(self):
         user = self.request.user
@@ -50,7 +59,7 @@ class PaymentViewSet(ModelViewSet):
     def summary(self, request):
         """
         Get payment summary statistics for the current user based on their role.
-        All values derived from Payment model only, using SETTLED status.
+        All values come from one payment-analytics query, using SETTLED status.
         """
         try:
             profile = request.user.stakeholderprofile
@@ -58,34 +67,14 @@ class PaymentViewSet(ModelViewSet):
             return Response({"error": "User profile not found"}, status=status.HTTP_400_BAD_REQUEST)
 
         role = profile.role
+        summary = get_payment_summary(profile)
 
         if role == models.StakeholderRole.FARMER:
-            total_received = models.Payment.objects.filter(
-                payee=profile,
-                payment_type=models.PaymentType.BATCH_PAYMENT,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            total_paid_transport = models.Payment.objects.filter(
-                payer=profile,
-                payment_type=models.PaymentType.TRANSPORT_SHARE,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_confirmations = models.Payment.objects.filter(
-                payee=profile,
-                status=models.PaymentStatus.AWAITING_CONFIRMATION
-            ).count()
-
-            pending_to_pay = models.Payment.objects.filter(
-                payer=profile,
-                status=models.PaymentStatus.PENDING
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_to_receive = models.Payment.objects.filter(
-                payee=profile,
-                status=models.PaymentStatus.PENDING
-            ).aggregate(total=Sum('amount'))['total'] or 0
+            total_received = summary.received_batch_payments
+            total_paid_transport = summary.paid_transport
+            pending_confirmations = summary.awaiting_confirmation_count
+            pending_to_pay = summary.paid_pending
+            pending_to_receive = summary.received_pending
 
             return Response({
                 "role": "farmer",
@@ -105,33 +94,11 @@ class PaymentViewSet(ModelViewSet):
             })
 
         elif role == models.StakeholderRole.DISTRIBUTOR:
-            total_paid_farmers = models.Payment.objects.filter(
-                payer=profile,
-                payee_role=models.StakeholderRole.FARMER,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            total_received_retailers = models.Payment.objects.filter(
-                payee=profile,
-                payer_role=models.StakeholderRole.RETAILER,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            total_paid_transport = models.Payment.objects.filter(
-                payer=profile,
-                payment_type=models.PaymentType.TRANSPORT_SHARE,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_payments = models.Payment.objects.filter(
-                payer=profile,
-                status=models.PaymentStatus.PENDING
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_confirmations = models.Payment.objects.filter(
-                payee=profile,
-                status=models.PaymentStatus.AWAITING_CONFIRMATION
-            ).count()
+            total_paid_farmers = summary.paid_to_farmers
+            total_received_retailers = summary.received_from_retailers
+            total_paid_transport = summary.paid_transport
+            pending_payments = summary.paid_pending
+            pending_confirmations = summary.awaiting_confirmation_count
 
             return Response({
                 "role": "distributor",
@@ -150,25 +117,10 @@ class PaymentViewSet(ModelViewSet):
             })
 
         elif role == models.StakeholderRole.TRANSPORTER:
-            total_earnings = models.Payment.objects.filter(
-                payee=profile,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_count = models.Payment.objects.filter(
-                payee=profile,
-                status__in=[models.PaymentStatus.PENDING, models.PaymentStatus.AWAITING_CONFIRMATION]
-            ).count()
-
-            settled_count = models.Payment.objects.filter(
-                payee=profile,
-                status=models.PaymentStatus.SETTLED
-            ).count()
-
-            pending_amount = models.Payment.objects.filter(
-                payee=profile,
-                status__in=[models.PaymentStatus.PENDING, models.PaymentStatus.AWAITING_CONFIRMATION]
-            ).aggregate(total=Sum('amount'))['total'] or 0
+            total_earnings = summary.received_settled
+            pending_count = summary.received_unsettled_count
+            settled_count = summary.received_settled_count
+            pending_amount = summary.received_unsettled
 
             return Response({
                 "role": "transporter",
@@ -185,27 +137,10 @@ class PaymentViewSet(ModelViewSet):
             })
 
         elif role == models.StakeholderRole.RETAILER:
-            total_paid_distributor = models.Payment.objects.filter(
-                payer=profile,
-                payee_role=models.StakeholderRole.DISTRIBUTOR,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            total_paid_transport = models.Payment.objects.filter(
-                payer=profile,
-                payment_type=models.PaymentType.TRANSPORT_SHARE,
-                status=models.PaymentStatus.SETTLED
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_payments = models.Payment.objects.filter(
-                payer=profile,
-                status=models.PaymentStatus.PENDING
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            pending_count = models.Payment.objects.filter(
-                payer=profile,
-                status=models.PaymentStatus.PENDING
-            ).count()
+            total_paid_distributor = summary.paid_to_distributors
+            total_paid_transport = summary.paid_transport
+            pending_payments = summary.paid_pending
+            pending_count = summary.paid_pending_count
 
             return Response({
                 "role": "retailer",
@@ -223,6 +158,49 @@ class PaymentViewSet(ModelViewSet):
 
         return Response({"error": "Unknown role"}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        methods=['get', 'post'],
+        url_path='summary/batch',
+        permission_classes=[IsAuthenticated, IsAdminUser],
+    )
+    def summary_batch(self, request):
+        """
+        Payment summaries of many stakeholders at once (admin only), in two aggregate queries.
+
+        GET ?profile_ids=1,2,3 or POST {"profile_ids": [1, 2, 3]}.
+        """
+        if request.method == 'POST':
+            raw_ids = request.data.get('profile_ids', [])
+        else:
+            raw_ids = request.query_params.get('profile_ids', '').split(',')
+        if not isinstance(raw_ids, list):
+            return Response({"error": "profile_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            profile_ids = list(dict.fromkeys(int(pk) for pk in raw_ids if str(pk).strip()))
+        except (TypeError, ValueError):
+            return Response({"error": "profile_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not profile_ids:
+            return Response({"error": "profile_ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(profile_ids) > MAX_BATCH_SUMMARY_PROFILES:
+            return Response(
+                {"error": f"At most {MAX_BATCH_SUMMARY_PROFILES} profile_ids per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        roles = dict(
+            models.StakeholderProfile.objects.filter(id__in=profile_ids).values_list('id', 'role')
+        )
+        summaries = get_payment_summaries([pk for pk in profile_ids if pk in roles])
+        return Response({
+            "results": [
+                {**summaries[pk].as_dict(), "role": roles[pk]}
+                for pk in profile_ids if pk in roles
+            ],
+            "missing_profile_ids": [pk for pk in profile_ids if pk not in roles],
+        })
+
 
 class PaymentDeclareView(APIView):
     """
@@ -344,12 +322,13 @@ def check_phase_completion(batch):
             batch.save()
 
 
-def create_payment_records_on_delivery(batch, transport_request):
+def create_payment_records_on_delivery(transition, batch, transport_request):
     """
     Create payment records when a batch is delivered.
     Transporter fees are split 50-50 between sender and receiver.
     Sets batch financial state: current_phase, financial_status, is_locked.
-    All wrapped in transaction.atomic().
+    Writes go through the delivery's Transition (see transitions.py), so
+    the batch is saved once with the rest of the delivery.
     """
     from_party = transport_request.from_party
     to_party = transport_request.to_party
@@ -367,116 +346,116 @@ def create_payment_records_on_delivery(batch, transport_request):
 
     to_party_role = to_party.role
 
-    with transaction.atomic():
-        # Re-fetch batch with lock
-        batch = models.CropBatch.objects.select_for_update().get(pk=batch.pk)
-
-        if to_party_role == models.StakeholderRole.DISTRIBUTOR:
-            phase = models.BatchPhase.DISTRIBUTOR_PHASE
+    if to_party_role == models.StakeholderRole.DISTRIBUTOR:
+        phase = models.BatchPhase.DISTRIBUTOR_PHASE
 
-            # Set batch financial state
-            batch.current_phase = phase
-            batch.financial_status = models.FinancialStatus.PAYMENT_PENDING
-            batch.is_locked = True
-            batch.save()
+        # Set batch financial state
+        transition.update(
+            batch,
+            current_phase=phase,
+            financial_status=models.FinancialStatus.PAYMENT_PENDING,
+            is_locked=True,
+        )
 
-            # 1. Distributor → Farmer (BATCH_PAYMENT)
-            models.Payment.objects.create(
+        # 1. Distributor → Farmer (BATCH_PAYMENT)
+        transition.add(models.Payment(
+            batch=batch,
+            payer=to_party,
+            payee=batch.farmer,
+            payer_role=models.StakeholderRole.DISTRIBUTOR,
+            payee_role=models.StakeholderRole.FARMER,
+            payment_type=models.PaymentType.BATCH_PAYMENT,
+            phase=phase,
+            amount=farmer_base_price,
+            status=models.PaymentStatus.PENDING,
+            payee_upi_id=get_upi_id(batch.farmer),
+        ))
+
+        # 2. Distributor → Transporter (TRANSPORT_SHARE)
+        if receiver_transport_share > 0:
+            transition.add(models.Payment(
                 batch=batch,
                 payer=to_party,
-                payee=batch.farmer,
+                payee=transporter,
                 payer_role=models.StakeholderRole.DISTRIBUTOR,
-                payee_role=models.StakeholderRole.FARMER,
-                payment_type=models.PaymentType.BATCH_PAYMENT,
+                payee_role=models.StakeholderRole.TRANSPORTER,
+                payment_type=models.PaymentType.TRANSPORT_SHARE,
                 phase=phase,
-                amount=farmer_base_price,
+                amount=receiver_transport_share,
                 status=models.PaymentStatus.PENDING,
-                payee_upi_id=get_upi_id(batch.farmer),
-            )
+                payee_upi_id=get_upi_id(transporter),
+            ))
 
-            # 2. Distributor → Transporter (TRANSPORT_SHARE)
-            if receiver_transport_share > 0:
-                models.Payment.objects.create(
-                    batch=batch,
-                    payer=to_party,
-                    payee=transporter,
-                    payer_role=models.StakeholderRole.DISTRIBUTOR,
-                    payee_role=models.StakeholderRole.TRANSPORTER,
-                    payment_type=models.PaymentType.TRANSPORT_SHARE,
-                    phase=phase,
-                    amount=receiver_transport_share,
-                    status=models.PaymentStatus.PENDING,
-                    payee_upi_id=get_upi_id(transporter),
-                )
-
-            # 3. Farmer → Transporter (TRANSPORT_SHARE)
-            if sender_transport_share > 0:
-                models.Payment.objects.create(
-                    batch=batch,
-                    payer=batch.farmer,
-                    payee=transporter,
-                    payer_role=models.StakeholderRole.FARMER,
-                    payee_role=models.StakeholderRole.TRANSPORTER,
-                    payment_type=models.PaymentType.TRANSPORT_SHARE,
-                    phase=phase,
-                    amount=sender_transport_share,
-                    status=models.PaymentStatus.PENDING,
-                    payee_upi_id=get_upi_id(transporter),
-                )
-
-        elif to_party_role == models.StakeholderRole.RETAILER:
-            phase = models.BatchPhase.RETAILER_PHASE
-
-            # Calculate retailer batch payment (includes farmer price + all transport + distributor margin)
-            distributor_margin = float(batch.distributor_margin_per_unit) * quantity
-            batch_payment_amount = farmer_base_price + transporter_fee + distributor_margin
-
-            # Set batch financial state
-            batch.current_phase = phase
-            batch.financial_status = models.FinancialStatus.PAYMENT_PENDING
-            batch.is_locked = True
-            batch.save()
+        # 3. Farmer → Transporter (TRANSPORT_SHARE)
+        if sender_transport_share > 0:
+            transition.add(models.Payment(
+                batch=batch,
+                payer=batch.farmer,
+                payee=transporter,
+                payer_role=models.StakeholderRole.FARMER,
+                payee_role=models.StakeholderRole.TRANSPORTER,
+                payment_type=models.PaymentType.TRANSPORT_SHARE,
+                phase=phase,
+                amount=sender_transport_share,
+                status=models.PaymentStatus.PENDING,
+                payee_upi_id=get_upi_id(transporter),
+            ))
+
+    elif to_party_role == models.StakeholderRole.RETAILER:
+        phase = models.BatchPhase.RETAILER_PHASE
+
+        # Calculate retailer batch payment (includes farmer price + all transport + distributor margin)
+        distributor_margin = float(batch.distributor_margin_per_unit) * quantity
+        batch_payment_amount = farmer_base_price + transporter_fee + distributor_margin
+
+        # Set batch financial state
+        transition.update(
+            batch,
+            current_phase=phase,
+            financial_status=models.FinancialStatus.PAYMENT_PENDING,
+            is_locked=True,
+        )
 
-            # 1. Retailer → Distributor (BATCH_PAYMENT)
-            models.Payment.objects.create(
+        # 1. Retailer → Distributor (BATCH_PAYMENT)
+        transition.add(models.Payment(
+            batch=batch,
+            payer=to_party,
+            payee=from_party,
+            payer_role=models.StakeholderRole.RETAILER,
+            payee_role=models.StakeholderRole.DISTRIBUTOR,
+            payment_type=models.PaymentType.BATCH_PAYMENT,
+            phase=phase,
+            amount=batch_payment_amount,
+            status=models.PaymentStatus.PENDING,
+            payee_upi_id=get_upi_id(from_party),
+        ))
+
+        # 2. Retailer → Transporter (TRANSPORT_SHARE)
+        if receiver_transport_share > 0:
+            transition.add(models.Payment(
                 batch=batch,
                 payer=to_party,
-                payee=from_party,
+                payee=transporter,
                 payer_role=models.StakeholderRole.RETAILER,
-                payee_role=models.StakeholderRole.DISTRIBUTOR,
-                payment_type=models.PaymentType.BATCH_PAYMENT,
+                payee_role=models.StakeholderRole.TRANSPORTER,
+                payment_type=models.PaymentType.TRANSPORT_SHARE,
                 phase=phase,
-                amount=batch_payment_amount,
+                amount=receiver_transport_share,
                 status=models.PaymentStatus.PENDING,
-                payee_upi_id=get_upi_id(from_party),
-            )
+                payee_upi_id=get_upi_id(transporter),
+            ))
 
-            # 2. Retailer → Transporter (TRANSPORT_SHARE)
-            if receiver_transport_share > 0:
-                models.Payment.objects.create(
-                    batch=batch,
-                    payer=to_party,
-                    payee=transporter,
-                    payer_role=models.StakeholderRole.RETAILER,
-                    payee_role=models.StakeholderRole.TRANSPORTER,
-                    payment_type=models.PaymentType.TRANSPORT_SHARE,
-                    phase=phase,
-                    amount=receiver_transport_share,
-                    status=models.PaymentStatus.PENDING,
-                    payee_upi_id=get_upi_id(transporter),
-                )
-
-            # 3. Distributor → Transporter (TRANSPORT_SHARE)
-            if sender_transport_share > 0:
-                models.Payment.objects.create(
-                    batch=batch,
-                    payer=from_party,
-                    payee=transporter,
-                    payer_role=models.StakeholderRole.DISTRIBUTOR,
-                    payee_role=models.StakeholderRole.TRANSPORTER,
-                    payment_type=models.PaymentType.TRANSPORT_SHARE,
-                    phase=phase,
-                    amount=sender_transport_share,
-                    status=models.PaymentStatus.PENDING,
-                    payee_upi_id=get_upi_id(transporter),
-                )
+        # 3. Distributor → Transporter (TRANSPORT_SHARE)
+        if sender_transport_share > 0:
+            transition.add(models.Payment(
+                batch=batch,
+                payer=from_party,
+                payee=transporter,
+                payer_role=models.StakeholderRole.DISTRIBUTOR,
+                payee_role=models.StakeholderRole.TRANSPORTER,
+                payment_type=models.PaymentType.TRANSPORT_SHARE,
+                phase=phase,
+                amount=sender_transport_share,
+                status=models.PaymentStatus.PENDING,
+                payee_upi_id=get_upi_id(transporter),
+            ))
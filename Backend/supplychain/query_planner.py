@@ -0,0 +1,152 @@
+"""
+Serializer Query Planner
+
+Derives select_related / prefetch_related paths from the fields a
+serializer declares, so nested serializers (CropBatchSerializer inside
+TransportRequestSerializer, StakeholderProfileSerializer -> user_details,
+dotted sources like "current_owner.username") are loaded with the main
+query instead of one query per row and level.
+
+    class TransportRequestViewSet(QueryPlannerMixin, viewsets.ModelViewSet):
+        serializer_class = serializers.TransportRequestSerializer
+        query_budget = 8
+
+Forward FK / one-to-one hops become select_related, reverse FK and
+many-to-many hops become prefetch_related. Plain primary-key related
+fields need no join and are skipped. SerializerMethodFields are not
+inspected; a viewset whose method fields touch relations should add
+those itself.
+
+`assert_max_queries` checks a query budget; `manage.py check_query_budgets`
+runs it against every planned list endpoint.
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+from .fieldsets import apply_fieldset
+
+# Deeper nesting than this is treated as a serializer cycle
+MAX_PLAN_DEPTH = 6
+
+
+def _join(prefix, attr):
+    return f"{prefix}__{attr}" if prefix else attr
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch, depth):
+    if depth > MAX_PLAN_DEPTH:
+        return
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, model, prefix, in_prefetch, select, prefetch, depth + 1)
+            continue
+
+        current_model, path, prefetched = model, prefix, in_prefetch
+        attrs = field.source_attrs
+        for i, attr in enumerate(attrs):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+            if (
+                i == len(attrs) - 1
+                and isinstance(field, serializers.RelatedField)
+                and field.use_pk_only_optimization()
+            ):
+                # Rendered from the FK column, no join needed
+                break
+
+            path = _join(path, attr)
+            if model_field.one_to_many or model_field.many_to_many:
+                prefetched = True
+            (prefetch if prefetched else select).add(path)
+            current_model = model_field.related_model
+        else:
+            if isinstance(field, serializers.ListSerializer):
+                _walk(field.child, current_model, path, True, select, prefetch, depth + 1)
+            elif isinstance(field, serializers.BaseSerializer):
+                _walk(field, current_model, path, prefetched, select, prefetch, depth + 1)
+
+
+@lru_cache(maxsize=256)
+def plan_serializer(serializer_class, fieldset=None):
+    """
+    Relations a serializer reads, cached per serializer class and fieldset.
+
+    Args:
+        fieldset: Sparse fieldset from fieldsets.parse_fieldset, or None
+            for every field
+
+    Returns:
+        tuple: (select_related paths, prefetch_related paths)
+    """
+    serializer = serializer_class(context={})
+    if fieldset is not None:
+        apply_fieldset(serializer, fieldset)
+    select, prefetch = set(), set()
+    _walk(serializer, serializer_class.Meta.model, "", False, select, prefetch, 0)
+    # A select_related path already covers its prefixes
+    select = {path for path in select if not any(other.startswith(path + "__") for other in select)}
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def plan_queryset(queryset, serializer_class, fieldset=None):
+    """Apply a serializer's select_related / prefetch_related plan to a queryset."""
+    select, prefetch = plan_serializer(serializer_class, fieldset)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class QueryPlannerMixin:
+    """
+    ViewSet mixin that plans the queryset from the serializer class.
+
+    Applied in filter_queryset, so it covers every get_queryset branch
+    and both list and detail routes. `query_budget` is the most queries a
+    list request may issue (checked by `manage.py check_query_budgets`).
+    """
+
+    query_budget = None
+
+    def get_fieldset(self):
+        """Fields the response renders; overridden by SparseFieldsetMixin."""
+        return None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return plan_queryset(queryset, self.get_serializer_class(), self.get_fieldset())
+
+
+@contextmanager
+def assert_max_queries(limit, using="default", label=None):
+    """
+    Fail if the block runs more than `limit` queries.
+
+        with assert_max_queries(6, label="GET /api/payments/"):
+            client.get("/api/payments/")
+
+    Raises:
+        AssertionError: listing the captured SQL when over budget
+    """
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > limit:
+        statements = "\n".join(f"  {i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, 1))
+        raise AssertionError(
+            f"{label or 'Block'} ran {len(captured)} queries, budget is {limit}:\n{statements}"
+        )
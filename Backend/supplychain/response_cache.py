@@ -0,0 +1,246 @@
+"""
+Dashboard Response Cache
+
+The role dashboards and the admin stats are polled by the frontend. Their
+responses are cached per stakeholder for a few seconds in the Django cache
+named by DASHBOARD_CACHE["ALIAS"] (local memory in development; a file or
+Redis-compatible cache when several workers must share it, see CACHES in
+settings.py):
+
+    class FarmerDashboardView(APIView):
+        @cache_response("farmer_dashboard")
+        def get(self, request): ...
+
+Entries are never deleted one by one. Each stakeholder has a version
+number, entry keys include it, and invalidating a stakeholder bumps the
+version, so all of their cached responses become unreachable at once and
+age out with the TTL. The bumps are driven by the events that change a
+dashboard and are scoped to the stakeholders the change touches:
+
+- log_batch_event(): the batch's farmer and owner, the parties to its
+  transports and the user who acted
+- Payment saves and deletes: the payer and payee
+- KYC decisions: the stakeholder, and the admin stats
+
+Invalidation runs when the surrounding transaction commits. Changes made
+outside these paths show up within the TTL.
+
+Hit and miss counters are kept in the same cache per scope and served
+by /api/admin/cache/stats/.
+"""
+
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import signals
+from rest_framework.response import Response
+
+from .models import CropBatch, Payment, StakeholderProfile, TransportRequest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_DASHBOARD_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "ALIAS": "dashboards",
+    "TTL": 30,
+}
+
+GLOBAL_OWNER = "global"
+
+# Scopes registered by @cache_response, for the stats endpoint
+SCOPES = set()
+
+
+def get_dashboard_cache_settings():
+    """Return the DASHBOARD_CACHE settings merged over the defaults."""
+    config = dict(DEFAULT_DASHBOARD_CACHE_SETTINGS)
+    config.update(getattr(settings, "DASHBOARD_CACHE", {}))
+    return config
+
+
+def get_cache():
+    return caches[get_dashboard_cache_settings()["ALIAS"]]
+
+
+def _version_key(owner):
+    return f"version:{owner}"
+
+
+def _entry_key(scope, owner, version):
+    return f"response:{scope}:{owner}:{version}"
+
+
+def _counter_key(scope, outcome):
+    return f"stats:{scope}:{outcome}"
+
+
+def _get_version(cache, owner):
+    key = _version_key(owner)
+    version = cache.get(key)
+    if version is None:
+        # A nanosecond timestamp never repeats an evicted version, so entries
+        # stored under the old number cannot come back
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_versions(owners):
+    cache = get_cache()
+    for owner in owners:
+        key = _version_key(owner)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def _count(cache, scope, outcome):
+    key = _counter_key(scope, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def invalidate_stakeholders(profile_ids):
+    """Drop the cached responses of these stakeholder profiles once the transaction commits."""
+    owners = {profile_id for profile_id in profile_ids if profile_id is not None}
+    if not owners or not get_dashboard_cache_settings()["ENABLED"]:
+        return
+
+    def bump():
+        try:
+            _bump_versions(owners)
+        except Exception as e:
+            logger.error(f"Failed to invalidate dashboard cache for profiles {sorted(owners)}: {e}")
+
+    transaction.on_commit(bump)
+
+
+def invalidate_global():
+    """Drop the cached responses shared by all admins (admin stats)."""
+    if not get_dashboard_cache_settings()["ENABLED"]:
+        return
+
+    def bump():
+        try:
+            _bump_versions([GLOBAL_OWNER])
+        except Exception as e:
+            logger.error(f"Failed to invalidate global dashboard cache: {e}")
+
+    transaction.on_commit(bump)
+
+
+def invalidate_batch_stakeholders(batches, user=None):
+    """Invalidate everyone whose dashboard shows these batches (a batch or a list)."""
+    if isinstance(batches, CropBatch):
+        batches = [batches]
+    profile_ids = {batch.farmer_id for batch in batches}
+    for row in TransportRequest.objects.filter(batch_id__in=[batch.pk for batch in batches]).values_list(
+        "requested_by_id", "from_party_id", "to_party_id", "transporter_id"
+    ):
+        profile_ids.update(row)
+    user_ids = {batch.current_owner_id for batch in batches}
+    user_ids.add(getattr(user, "pk", None))
+    user_ids.discard(None)
+    if user_ids:
+        profile_ids.update(
+            StakeholderProfile.objects.filter(user_id__in=user_ids).values_list("id", flat=True)
+        )
+    invalidate_stakeholders(profile_ids)
+
+
+def cache_response(scope, per_user=True):
+    """
+    Cache the successful responses of an APIView handler.
+
+    Applied to `get`, so DRF has already authenticated the request and
+    checked permissions. With per_user, entries are keyed by the caller's
+    stakeholder profile; requests without a profile are not cached.
+    Otherwise one entry is shared (invalidated by invalidate_global()).
+    """
+    SCOPES.add(scope)
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            config = get_dashboard_cache_settings()
+            if not config["ENABLED"]:
+                return handler(self, request, *args, **kwargs)
+
+            if per_user:
+                try:
+                    owner = request.user.stakeholderprofile.pk
+                except StakeholderProfile.DoesNotExist:
+                    return handler(self, request, *args, **kwargs)
+            else:
+                owner = GLOBAL_OWNER
+
+            cache = get_cache()
+            try:
+                key = _entry_key(scope, owner, _get_version(cache, owner))
+                data = cache.get(key)
+            except Exception as e:
+                # A cache outage degrades to uncached responses
+                logger.warning(f"Dashboard cache unavailable for {scope}: {e}")
+                return handler(self, request, *args, **kwargs)
+
+            if data is not None:
+                _count(cache, scope, "hits")
+                response = Response(data)
+                response["X-Cache"] = "HIT"
+                return response
+
+            _count(cache, scope, "misses")
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=config["TTL"])
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_cache_stats():
+    """Hit/miss counters per scope since the last reset."""
+    cache = get_cache()
+    scopes = sorted(SCOPES)
+    counters = cache.get_many([_counter_key(scope, outcome) for scope in scopes for outcome in ("hits", "misses")])
+    stats = {}
+    for scope in scopes:
+        hits = counters.get(_counter_key(scope, "hits"), 0)
+        misses = counters.get(_counter_key(scope, "misses"), 0)
+        stats[scope] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_cache_stats():
+    get_cache().delete_many(
+        [_counter_key(scope, outcome) for scope in SCOPES for outcome in ("hits", "misses")]
+    )
+
+
+def _invalidate_payment_parties(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_stakeholders([instance.payer_id, instance.payee_id])
+
+
+def connect_signals():
+    """Invalidate the payer's and payee's dashboards when a payment changes."""
+    signals.post_save.connect(_invalidate_payment_parties, sender=Payment, dispatch_uid="dashboard_cache_payment_save")
+    signals.post_delete.connect(
+        _invalidate_payment_parties, sender=Payment, dispatch_uid="dashboard_cache_payment_delete"
+    )
@@ -2,8 +2,6 @@
 Retailer Dashboard Views
 Provides analytics and metrics specific to the logged-in retailer.
 """
-from django.db.models import Count, Sum, Q, F
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,7 +9,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
 from . import models
-from .models import StakeholderRole, CropBatch, TransportRequest, RetailListing
+from .models import StakeholderRole
+from .payment_analytics import get_payment_summary
+from .response_cache import cache_response
+from .stakeholder_metrics import INCOMING_TRANSPORTS, LISTING_SALES, LISTING_STOCK, ProfileMetrics
 
 
 class RetailerDashboardView(APIView):
@@ -23,6 +24,7 @@ class RetailerDashboardView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cache_response("retailer_dashboard")
     def get(self, request):
         # Verify user is a retailer
         try:
@@ -38,101 +40,64 @@ class RetailerDashboardView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Totals come from the StakeholderMetrics rollup (one query)
+        metrics = ProfileMetrics(profile)
+
         # --- METRICS SECTION ---
         
         # Incoming Shipments: Transport requests to retailer not yet delivered
-        incoming_shipments = TransportRequest.objects.filter(
-            to_party=profile
-        ).exclude(
-            status__in=['DELIVERED', 'REJECTED']
-        ).count()
-
-        # Get retailer's listings
-        retailer_listings = RetailListing.objects.filter(retailer=profile)
-        
-        # Total Active Listings (listings with remaining_quantity > 0)
-        active_listings = retailer_listings.filter(
-            is_for_sale=True,
-            remaining_quantity__gt=0
-        ).count()
+        incoming_shipments = metrics.count(
+            INCOMING_TRANSPORTS, exclude_statuses=['DELIVERED', 'REJECTED']
+        )
+
+        # Total Active Listings (for sale with remaining_quantity > 0)
+        active_listings = metrics.count(LISTING_STOCK)
         
         # Inventory Value: sum(remaining_quantity × selling_price_per_unit)
         # Only count active listings with remaining stock
-        inventory_value_result = retailer_listings.filter(
-            is_for_sale=True,
-            remaining_quantity__gt=0
-        ).aggregate(
-            total=Sum(F('remaining_quantity') * F('selling_price_per_unit'))
-        )
-        inventory_value = float(inventory_value_result['total'] or 0)
+        inventory_value = float(metrics.amount(LISTING_STOCK))
 
         # Total Sales Revenue: sum(total_revenue_generated) - only from actual sales
-        revenue_result = retailer_listings.filter(
-            units_sold__gt=0
-        ).aggregate(
-            total=Sum('total_revenue_generated')
-        )
-        total_sales_revenue = float(revenue_result['total'] or 0)
+        total_sales_revenue = float(metrics.amount(LISTING_SALES))
         
         # Units sold: sum(units_sold) - total quantity sold, not count of listings
-        units_result = retailer_listings.filter(
-            units_sold__gt=0
-        ).aggregate(
-            total=Sum('units_sold')
-        )
-        units_sold = float(units_result['total'] or 0)
+        units_sold = float(metrics.quantity(LISTING_SALES))
 
         # --- INVENTORY DISTRIBUTION (for Doughnut Chart) ---
         # Group active listings by crop type with remaining_quantity as value
-        inventory_by_crop = retailer_listings.filter(
-            is_for_sale=True,
-            remaining_quantity__gt=0
-        ).select_related('batch').values(
-            'batch__crop_type'
-        ).annotate(
-            count=Count('id'),
-            total_quantity=Sum('remaining_quantity'),
-            total_value=Sum(F('remaining_quantity') * F('selling_price_per_unit'))
-        ).order_by('-total_value')
+        inventory_by_crop = sorted(
+            metrics.group(LISTING_STOCK, by='dimension').items(),
+            key=lambda item: -item[1][2]
+        )
 
         inventory_distribution = {}
-        for item in inventory_by_crop:
-            crop = item['batch__crop_type'] or 'Unknown'
-            inventory_distribution[crop] = {
-                'count': item['count'],
-                'quantity': float(item['total_quantity'] or 0),
-                'value': float(item['total_value'] or 0)
+        for crop, (count, quantity, value) in inventory_by_crop:
+            inventory_distribution[crop or 'Unknown'] = {
+                'count': count,
+                'quantity': float(quantity),
+                'value': float(value)
             }
 
         # --- MONTHLY SALES (for Bar Chart) ---
         # Note: We don't have monthly breakdown by sale date yet
         # For now, we'll aggregate total revenue by listing creation month
         # In production, you'd want a separate SalesTransaction model
-        twelve_months_ago = timezone.now() - timezone.timedelta(days=365)
+        twelve_months_ago = (timezone.now() - timezone.timedelta(days=365)).date().replace(day=1)
         
         # Get monthly data - grouping by listing creation month
         # This is a simplified view - true monthly sales would require tracking each sale date
-        monthly_sales = retailer_listings.filter(
-            units_sold__gt=0,
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            revenue=Sum('total_revenue_generated'),
-            units=Sum('units_sold')
-        ).order_by('month')
+        monthly_sales = metrics.group(LISTING_SALES, by='month', since=twelve_months_ago)
 
         # Build monthly sales map
         months_set = set()
         revenue_map = {}
         units_map = {}
         
-        for item in monthly_sales:
-            if item['month']:
-                month_key = item['month'].strftime('%b')
-                months_set.add(month_key)
-                revenue_map[month_key] = float(item['revenue'] or 0)
-                units_map[month_key] = float(item['units'] or 0)
+        for month, (_, units, revenue) in sorted(monthly_sales.items()):
+            month_key = month.strftime('%b')
+            months_set.add(month_key)
+            revenue_map[month_key] = float(revenue)
+            units_map[month_key] = float(units)
 
         # Sort months chronologically
         month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
@@ -146,19 +111,10 @@ class RetailerDashboardView(APIView):
         }
 
         # --- PAYMENT-DERIVED FINANCIAL METRICS ---
-        from .models import Payment, PaymentStatus as PS, PaymentType as PT, StakeholderRole as SR
-        
-        paid_to_distributor = Payment.objects.filter(
-            payer=profile, payee_role=SR.DISTRIBUTOR, status=PS.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        paid_transport = Payment.objects.filter(
-            payer=profile, payment_type=PT.TRANSPORT_SHARE, status=PS.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        payment_pending_count = Payment.objects.filter(
-            payer=profile, status=PS.PENDING
-        ).count()
+        payments = get_payment_summary(profile)
+        paid_to_distributor = payments.paid_to_distributors
+        paid_transport = payments.paid_transport
+        payment_pending_count = payments.paid_pending_count
 
         # Build response
         response_data = {
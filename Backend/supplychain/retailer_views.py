@@ -2,7 +2,6 @@
 Views for Retailer-specific actions.
 """
 from decimal import Decimal
-from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -11,7 +10,7 @@ from rest_framework.permissions import IsAuthenticated
 from . import models
 from .batch_validators import BatchStatusTransitionValidator
 from .models import StakeholderProfile, StakeholderRole, CropBatch, BatchStatus, BatchEventType, RetailListing
-from .event_logger import log_batch_event
+from .transitions import Transition
 from .view_utils import check_batch_locked
 
 
@@ -128,35 +127,32 @@ class MarkBatchSoldView(APIView):
         # Calculate revenue for this sale
         sale_revenue = sold_quantity * listing.selling_price_per_unit
         
-        # Update listing quantities atomically
-        with transaction.atomic():
-            listing.remaining_quantity -= sold_quantity
-            listing.units_sold += sold_quantity
-            listing.total_revenue_generated += sale_revenue
+        # Update listing quantities, batch status and event atomically
+        with Transition(request.user) as transition:
+            transition.update(
+                listing,
+                remaining_quantity=listing.remaining_quantity - sold_quantity,
+                units_sold=listing.units_sold + sold_quantity,
+                total_revenue_generated=listing.total_revenue_generated + sale_revenue,
+            )
             
             # If all quantity sold, mark listing as not for sale and batch as SOLD
-            if listing.remaining_quantity <= 0:
-                listing.is_for_sale = False
-                batch.status = BatchStatus.SOLD
-                batch.save()
-                is_fully_sold = True
-            else:
-                is_fully_sold = False
+            is_fully_sold = listing.remaining_quantity <= 0
+            if is_fully_sold:
+                transition.update(listing, is_for_sale=False)
+                transition.update(batch, status=BatchStatus.SOLD)
             
-            listing.save()
-        
-        # Log event with quantity details
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.SOLD,
-            user=request.user,
-            metadata={
-                'sold_quantity': float(sold_quantity),
-                'sale_revenue': float(sale_revenue),
-                'remaining_quantity': float(listing.remaining_quantity),
-                'is_fully_sold': is_fully_sold
-            }
-        )
+            # Log event with quantity details
+            transition.log_event(
+                batch,
+                BatchEventType.SOLD,
+                metadata={
+                    'sold_quantity': float(sold_quantity),
+                    'sale_revenue': float(sale_revenue),
+                    'remaining_quantity': float(listing.remaining_quantity),
+                    'is_fully_sold': is_fully_sold
+                }
+            )
         
         return Response({
             "success": True,
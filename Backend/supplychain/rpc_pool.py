@@ -0,0 +1,276 @@
+"""
+Multi-Endpoint RPC Provider
+
+BlockchainService used one Web3.HTTPProvider on POLYGON_AMOY_RPC_URL with
+web3's default session and timeouts, so a slow or failing provider stalled
+anchoring, verification and the status endpoints. RPCPoolProvider is a web3
+provider over several endpoints:
+
+- one keep-alive requests.Session for all HTTP endpoints, with
+  BLOCKCHAIN_RPC["POOL_SIZE"] connections per endpoint
+- per-method timeouts (METHOD_TIMEOUTS, else TIMEOUT) and a CONNECT_TIMEOUT
+- latency-weighted routing: each call starts on an endpoint picked with
+  probability inversely proportional to its recent (EWMA) latency
+- hedged reads: a read-only call (HEDGED_METHODS) still running after
+  HEDGE_DELAY seconds is sent to a second endpoint as well, and the first
+  answer wins
+- failover: transport errors, timeouts and HTTP 429/5xx move the call to
+  the next endpoint, and the failing endpoint is skipped for
+  FAILURE_COOLDOWN seconds (unless every endpoint is cooling down)
+
+JSON-RPC error responses (reverts, nonce errors) are returned as they are,
+since another node would answer the same. eth_sendRawTransaction fails over
+but is never hedged; resending the same signed transaction elsewhere is
+harmless (its hash is fixed and nodes report "already known").
+
+Endpoints are URLs or web3 providers that answer plain JSON-RPC from
+make_request() (HTTPProvider and subclasses such as the simulated endpoints
+of local_chain.py; not EthereumTesterProvider, which depends on its own
+middleware), so the pool also runs against a local hardhat/anvil node:
+
+    w3 = Web3(RPCPoolProvider(["http://127.0.0.1:8545", "https://rpc-amoy.polygon.technology"]))
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from web3.providers.base import JSONBaseProvider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCKCHAIN_RPC_SETTINGS = {
+    "POOL_SIZE": 10,
+    "CONNECT_TIMEOUT": 3,
+    "TIMEOUT": 10,
+    "METHOD_TIMEOUTS": {
+        "eth_getLogs": 30,
+        "eth_sendRawTransaction": 20,
+        "eth_estimateGas": 15,
+    },
+    "HEDGE_DELAY": 0.5,
+    "FAILURE_COOLDOWN": 30,
+    "EWMA_ALPHA": 0.3,
+}
+
+# Read-only calls that are safe to send to two nodes at once
+HEDGED_METHODS = frozenset({
+    "eth_call",
+    "eth_chainId",
+    "eth_blockNumber",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+    "eth_maxPriorityFeePerGas",
+    "eth_feeHistory",
+    "net_version",
+    "web3_clientVersion",
+})
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def get_blockchain_rpc_settings():
+    """Return the BLOCKCHAIN_RPC settings merged over the defaults."""
+    config = dict(DEFAULT_BLOCKCHAIN_RPC_SETTINGS)
+    if settings.configured:
+        config.update(getattr(settings, "BLOCKCHAIN_RPC", {}))
+    return config
+
+
+class RPCUnavailable(ConnectionError):
+    """Every endpoint failed for a call."""
+
+
+class RPCEndpoint:
+    """An RPC endpoint and its routing statistics."""
+
+    def __init__(self, target):
+        self.target = target
+        self.name = str(target)
+        self.latency = None  # EWMA of successful call times, seconds
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.hedges_won = 0
+
+    def stats(self):
+        return {
+            "endpoint": self.name,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class RPCPoolProvider(JSONBaseProvider):
+    """web3 provider that routes, hedges and fails over across RPC endpoints."""
+
+    def __init__(self, endpoints, config=None, session=None):
+        super().__init__()
+        if not endpoints:
+            raise ValueError("RPCPoolProvider needs at least one endpoint")
+        self.config = config or get_blockchain_rpc_settings()
+        self.endpoints = [RPCEndpoint(target) for target in endpoints]
+        self._lock = threading.Lock()
+        self._session = session or self._build_session()
+        # Runs the hedged attempts; a losing attempt finishes in the background
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, self.config["POOL_SIZE"]), thread_name_prefix="rpc-pool"
+        )
+
+    def __str__(self):
+        return f"RPC pool {', '.join(endpoint.name for endpoint in self.endpoints)}"
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(self.endpoints), pool_maxsize=self.config["POOL_SIZE"], max_retries=0
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def timeout_for(self, method):
+        return self.config["METHOD_TIMEOUTS"].get(method, self.config["TIMEOUT"])
+
+    def stats(self):
+        """Routing statistics per endpoint (for the status endpoint and logs)."""
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def _route(self):
+        """Endpoints in the order a call should try them."""
+        now = time.monotonic()
+        with self._lock:
+            available = [e for e in self.endpoints if e.cooldown_until <= now]
+            cooling = sorted(
+                (e for e in self.endpoints if e.cooldown_until > now), key=lambda e: e.cooldown_until
+            )
+            if not available:
+                return cooling
+
+            # Unmeasured endpoints get the best known latency so they are tried too
+            known = [e.latency for e in available if e.latency is not None]
+            floor = min(known) if known else 1.0
+            weights = [1.0 / max(e.latency if e.latency is not None else floor, 0.001) for e in available]
+            first = random.choices(available, weights=weights)[0]
+            rest = sorted(
+                (e for e in available if e is not first),
+                key=lambda e: e.latency if e.latency is not None else floor,
+            )
+        return [first] + rest + cooling
+
+    def _record_success(self, endpoint, elapsed):
+        alpha = self.config["EWMA_ALPHA"]
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.cooldown_until = 0.0
+            endpoint.latency = elapsed if endpoint.latency is None else alpha * elapsed + (1 - alpha) * endpoint.latency
+
+    def _record_failure(self, endpoint, error):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.cooldown_until = time.monotonic() + self.config["FAILURE_COOLDOWN"]
+        logger.warning(f"RPC endpoint {endpoint.name} failed: {error}")
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    def _send(self, endpoint, method, params, request_data):
+        """One attempt against one endpoint; raises on transport failure."""
+        start = time.perf_counter()
+        try:
+            if isinstance(endpoint.target, str):
+                response = self._session.post(
+                    endpoint.target,
+                    data=request_data,
+                    timeout=(self.config["CONNECT_TIMEOUT"], self.timeout_for(method)),
+                )
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status()
+                result = self.decode_rpc_response(response.content)
+            else:
+                result = endpoint.target.make_request(method, params)
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        self._record_success(endpoint, time.perf_counter() - start)
+        return result
+
+    def _send_hedged(self, route, method, params, request_data):
+        """
+        Start on route[0] and return the first success.
+
+        The next endpoint is started when an attempt fails, or once per
+        call (the hedge) when no answer came within HEDGE_DELAY.
+        """
+        queue = list(route)
+        pending = {}
+        hedged = False
+        last_error = None
+
+        def start_next():
+            endpoint = queue.pop(0)
+            pending[self._executor.submit(self._send, endpoint, method, params, request_data)] = endpoint
+
+        start_next()
+        while pending:
+            timeout = self.config["HEDGE_DELAY"] if queue and not hedged else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                start_next()
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    if queue:
+                        start_next()
+                    continue
+                if hedged and endpoint is not route[0]:
+                    with self._lock:
+                        endpoint.hedges_won += 1
+                return result
+        raise last_error
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        route = self._route()
+        hedge = method in HEDGED_METHODS and len(route) > 1 and self.config["HEDGE_DELAY"] is not None
+
+        last_error = None
+        if hedge:
+            try:
+                return self._send_hedged(route, method, params, request_data)
+            except Exception as e:
+                last_error = e
+        else:
+            for endpoint in route:
+                try:
+                    return self._send(endpoint, method, params, request_data)
+                except Exception as e:
+                    last_error = e
+        raise RPCUnavailable(f"All RPC endpoints failed for {method}: {last_error}") from last_error
@@ -1,21 +1,31 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Model
 from rest_framework import serializers
 import base64
 
 from supplychain import models
 from supplychain.db_file_fields import DatabaseFile, DatabaseImageField
+from supplychain.file_serving import file_representation
 
 
 User = get_user_model()
 
 
 class Base64FileField(serializers.Field):
-    """Serializer field for handling file uploads/downloads as base64."""
+    """Serializer field for handling file uploads as base64 and downloads as file URLs."""
+    
+    def get_attribute(self, instance):
+        """Render the file as a download URL, which needs the instance, not just the value."""
+        if isinstance(instance, Model) and len(self.source_attrs) == 1:
+            return file_representation(instance, self.source_attrs[0], self.context.get('request'))
+        return super().get_attribute(instance)
     
     def to_representation(self, value):
-        """Convert database file to base64 data URI for API response."""
+        """Convert database file to a URL or base64 data URI for API response."""
         if not value:
             return None
+        if isinstance(value, str):
+            return value
         # Handle DatabaseFile object (has url property)
         if hasattr(value, 'url') and callable(getattr(value, 'url', None)):
             return value.url
@@ -111,6 +121,7 @@ class KYCRecordSerializer(serializers.ModelSerializer):
             "document_type",
             "document_number",
             "document_file",
+            "document_file_meta",
             "status",
             "verified_by",
             "verified_at",
@@ -138,10 +149,13 @@ class CropBatchSerializer(serializers.ModelSerializer):
             "quantity",
             "harvest_date",
             "organic_certificate",
+            "organic_certificate_meta",
             "quality_test_report",
+            "quality_test_report_meta",
             "product_batch_id",
             "public_batch_id",
             "qr_code_image",
+            "qr_code_image_meta",
             "qr_code_data",
             "created_at",
             "is_child_batch",
@@ -159,14 +173,8 @@ class CropBatchSerializer(serializers.ModelSerializer):
     total_transport_fees = serializers.SerializerMethodField()
 
     def get_total_transport_fees(self, obj):
-        fees = 0
-        current = obj
-        while current:
-            transports = models.TransportRequest.objects.filter(batch=current, status='DELIVERED')
-            for tr in transports:
-                fees += float(tr.transporter_fee_per_unit)
-            current = current.parent_batch
-        return fees
+        # Maintained over the batch lineage by transport_fees.py
+        return float(obj.cumulative_transport_fee_per_unit)
 
 
 
@@ -196,6 +204,7 @@ class TransportRequestSerializer(serializers.ModelSerializer):
             "pickup_at",
             "delivered_at",
             "delivery_proof",
+            "delivery_proof_meta",
             "transporter_fee_per_unit",
         ]
 
@@ -216,6 +225,7 @@ class InspectionReportSerializer(serializers.ModelSerializer):
             "inspection_notes",
             "result",
             "report_file",
+            "report_file_meta",
             "storage_conditions",
             "passed",
             "created_by",
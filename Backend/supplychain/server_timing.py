@@ -0,0 +1,100 @@
+"""
+Server-Timing Header
+
+Reports where a request spent its time in a `Server-Timing` response
+header (shown in the browser devtools' Timing tab):
+
+    Server-Timing: db-connect;dur=212.4;desc="1 new", db-health;dur=0.8;desc="1 check",
+                   db;dur=14.2;desc="9 queries", app;dur=251.0
+
+- db-connect: opening database connections (TLS and auth handshakes, or
+  waiting for a pooled connection), timed by the backend in
+  supplychain/db_backends/postgresql
+- db-health: health checks of reused persistent connections
+- db: executing queries
+- app: the whole request
+
+With persistent or pooled connections db-connect disappears from most
+responses. Enabled by SERVER_TIMING["ENABLED"] (defaults to DEBUG).
+"""
+
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULT_SERVER_TIMING_SETTINGS = {
+    "ENABLED": False,
+}
+
+# metric -> [seconds, count] for the request being handled
+_timings = ContextVar("server_timing", default=None)
+
+DESCRIPTIONS = {
+    "db-connect": "{count} new",
+    "db-health": "{count} check",
+    "db": "{count} queries",
+}
+
+
+def get_server_timing_settings():
+    """Return the SERVER_TIMING settings merged over the defaults."""
+    config = dict(DEFAULT_SERVER_TIMING_SETTINGS)
+    config.update(getattr(settings, "SERVER_TIMING", {}))
+    return config
+
+
+def record_timing(metric, seconds):
+    """Add a duration to a metric of the current request (no-op outside one)."""
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.setdefault(metric, [0.0, 0])
+    entry[0] += seconds
+    entry[1] += 1
+
+
+def _time_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_timing("db", time.perf_counter() - start)
+
+
+def format_server_timing(timings, total):
+    entries = []
+    for metric, (seconds, count) in timings.items():
+        entry = f"{metric};dur={seconds * 1000:.1f}"
+        if metric in DESCRIPTIONS:
+            entry += f';desc="{DESCRIPTIONS[metric].format(count=count)}"'
+        entries.append(entry)
+    entries.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """Add the Server-Timing header; place it first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_server_timing_settings()["ENABLED"]:
+            return self.get_response(request)
+
+        timings = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_time_query))
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        response["Server-Timing"] = format_server_timing(timings, time.perf_counter() - start)
+        return response
@@ -0,0 +1,369 @@
+"""
+Stakeholder Dashboard Metrics
+
+Keeps StakeholderMetrics, a rollup of the counts and sums the role
+dashboards show, up to date as batches, transport requests, retail
+listings and payments are saved, so a dashboard reads one profile's rows
+instead of running a dozen COUNT/SUM queries over its whole history.
+
+Every tracked row contributes to a few buckets, e.g. a crop batch adds
+(1, quantity, quantity x base price) to its farmer's FARMER_BATCHES
+bucket for (creation month, status, crop type). Contributions are
+computed from `values()` rows, before and after each save, and only the
+difference is written, with F() increments so concurrent saves touching
+the same bucket do not lose updates. `manage.py rebuild_metrics` derives
+the same contributions from every row to recompute the table or check
+it for drift (QuerySet.update() and bulk_create() bypass the signals;
+wrap them in `track_metrics`).
+"""
+
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum, signals
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import CropBatch, Payment, RetailListing, StakeholderMetrics, TransportRequest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Metric names
+FARMER_BATCHES = "farmer_batches"          # original batches a farmer created: qty, qty x base price
+OWNED_BATCHES = "owned_batches"            # batches the stakeholder currently owns: qty, qty x margin
+OUTGOING_TRANSPORTS = "outgoing_transports"
+INCOMING_TRANSPORTS = "incoming_transports"
+ASSIGNED_TRANSPORTS = "assigned_transports"  # amount: fee per unit, role: sender's role
+LISTING_STOCK = "listing_stock"            # active listings: remaining qty, remaining x price
+LISTING_SALES = "listing_sales"            # listings with sales: units sold, revenue
+PAYMENTS_MADE = "payments_made"            # dimension: payment type, role: payee's role
+PAYMENTS_RECEIVED = "payments_received"    # dimension: payment type, role: payer's role
+
+ZERO = Decimal("0")
+
+
+def _month(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+def _batch_contributions(row):
+    month = _month(row["created_at"])
+    quantity = row["quantity"]
+    if not row["is_child_batch"]:
+        yield (
+            (row["farmer_id"], month, FARMER_BATCHES, row["status"], row["crop_type"], ""),
+            (1, quantity, quantity * row["farmer_base_price_per_unit"]),
+        )
+    if row["current_owner__stakeholderprofile"]:
+        yield (
+            (row["current_owner__stakeholderprofile"], month, OWNED_BATCHES, row["status"], row["crop_type"], ""),
+            (1, quantity, quantity * row["distributor_margin_per_unit"]),
+        )
+
+
+def _transport_contributions(row):
+    month = _month(row["created_at"])
+    yield (row["from_party_id"], month, OUTGOING_TRANSPORTS, row["status"], "", ""), (1, ZERO, ZERO)
+    yield (row["to_party_id"], month, INCOMING_TRANSPORTS, row["status"], "", ""), (1, ZERO, ZERO)
+    if row["transporter_id"]:
+        yield (
+            (row["transporter_id"], month, ASSIGNED_TRANSPORTS, row["status"], "", row["from_party__role"]),
+            (1, ZERO, row["transporter_fee_per_unit"]),
+        )
+
+
+def _listing_contributions(row):
+    month = _month(row["created_at"])
+    crop_type = row["batch__crop_type"] or ""
+    if row["is_for_sale"] and row["remaining_quantity"] > 0:
+        yield (
+            (row["retailer_id"], month, LISTING_STOCK, "", crop_type, ""),
+            (1, row["remaining_quantity"], row["remaining_quantity"] * row["selling_price_per_unit"]),
+        )
+    if row["units_sold"] > 0:
+        yield (
+            (row["retailer_id"], month, LISTING_SALES, "", crop_type, ""),
+            (1, row["units_sold"], row["total_revenue_generated"]),
+        )
+
+
+def _payment_contributions(row):
+    month = _month(row["created_at"])
+    values = (1, ZERO, row["amount"])
+    yield (row["payer_id"], month, PAYMENTS_MADE, row["status"], row["payment_type"], row["payee_role"]), values
+    yield (row["payee_id"], month, PAYMENTS_RECEIVED, row["status"], row["payment_type"], row["payer_role"]), values
+
+
+# model -> (values() fields, contribution function)
+TRACKED_MODELS = {
+    CropBatch: (
+        ("farmer_id", "is_child_batch", "current_owner__stakeholderprofile", "status", "crop_type",
+         "quantity", "farmer_base_price_per_unit", "distributor_margin_per_unit", "created_at"),
+        _batch_contributions,
+    ),
+    TransportRequest: (
+        ("from_party_id", "to_party_id", "transporter_id", "from_party__role", "status",
+         "transporter_fee_per_unit", "created_at"),
+        _transport_contributions,
+    ),
+    RetailListing: (
+        ("retailer_id", "is_for_sale", "remaining_quantity", "selling_price_per_unit", "units_sold",
+         "total_revenue_generated", "batch__crop_type", "created_at"),
+        _listing_contributions,
+    ),
+    Payment: (
+        ("payer_id", "payee_id", "payer_role", "payee_role", "payment_type", "status", "amount", "created_at"),
+        _payment_contributions,
+    ),
+}
+
+BUCKET_FIELDS = ("profile_id", "month", "metric", "status", "dimension", "role")
+
+
+def collect_contributions(model, rows, totals=None):
+    """
+    Sum the contributions of `values()` rows of a tracked model.
+
+    Returns:
+        dict: bucket key -> [count, quantity, amount]
+    """
+    totals = totals if totals is not None else defaultdict(lambda: [0, ZERO, ZERO])
+    _, contribute = TRACKED_MODELS[model]
+    for row in rows:
+        for key, (count, quantity, amount) in contribute(row):
+            bucket = totals[key]
+            bucket[0] += count
+            bucket[1] += quantity
+            bucket[2] += amount
+    return totals
+
+
+def _load(model, pks):
+    fields, _ = TRACKED_MODELS[model]
+    return collect_contributions(model, model._base_manager.filter(pk__in=pks).values(*fields))
+
+
+def apply_changes(before, after):
+    """Write the difference between two contribution totals to StakeholderMetrics."""
+    for key in set(before) | set(after):
+        old = before.get(key, (0, ZERO, ZERO))
+        new = after.get(key, (0, ZERO, ZERO))
+        count, quantity, amount = new[0] - old[0], new[1] - old[1], new[2] - old[2]
+        if not (count or quantity or amount):
+            continue
+
+        bucket = dict(zip(BUCKET_FIELDS, key))
+        with transaction.atomic():
+            if StakeholderMetrics.objects.filter(**bucket).update(
+                count=F('count') + count, quantity=F('quantity') + quantity, amount=F('amount') + amount
+            ):
+                continue
+            try:
+                with transaction.atomic():
+                    StakeholderMetrics.objects.create(**bucket, count=count, quantity=quantity, amount=amount)
+            except IntegrityError:
+                # Created concurrently by another save touching the same bucket
+                StakeholderMetrics.objects.filter(**bucket).update(
+                    count=F('count') + count, quantity=F('quantity') + quantity, amount=F('amount') + amount
+                )
+
+
+@contextmanager
+def track_metrics(model, pks):
+    """
+    Keep metrics current across changes that bypass model signals.
+
+        with track_metrics(CropBatch, ids):
+            CropBatch.objects.filter(id__in=ids).update(status=...)
+
+    Rows created inside the block are picked up if their pks are in `pks`
+    by the time the block exits (pass a list and extend it).
+    """
+    before = _load(model, list(pks))
+    yield
+    apply_changes(before, _load(model, list(pks)))
+
+
+def _touches_metrics(model, update_fields):
+    if update_fields is None:
+        return True
+    tracked = {field.split("__")[0].removesuffix("_id") for field in TRACKED_MODELS[model][0]}
+    return any(name.removesuffix("_id") in tracked for name in update_fields)
+
+
+def _capture_before(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or instance.pk is None or not _touches_metrics(sender, update_fields):
+        instance._metrics_before = {}
+    else:
+        instance._metrics_before = _load(sender, [instance.pk])
+
+
+def _apply_after_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches_metrics(sender, update_fields):
+        return
+    before = getattr(instance, "_metrics_before", {})
+    instance._metrics_before = {}
+    try:
+        with transaction.atomic():
+            apply_changes(before, _load(sender, [instance.pk]))
+    except Exception as e:
+        # The rollup is derived data; a failed update must not fail the save.
+        # `manage.py rebuild_metrics` repairs the drift.
+        logger.error(f"Failed to update stakeholder metrics for {sender.__name__} {instance.pk}: {e}")
+
+
+def _capture_before_delete(sender, instance, **kwargs):
+    instance._metrics_before = _load(sender, [instance.pk])
+
+
+def _apply_after_delete(sender, instance, **kwargs):
+    try:
+        with transaction.atomic():
+            apply_changes(getattr(instance, "_metrics_before", {}), {})
+    except Exception as e:
+        logger.error(f"Failed to update stakeholder metrics for deleted {sender.__name__} {instance.pk}: {e}")
+
+
+def connect_signals():
+    """Maintain StakeholderMetrics from saves and deletes of the tracked models."""
+    for model in TRACKED_MODELS:
+        signals.pre_save.connect(_capture_before, sender=model, dispatch_uid=f"metrics_pre_save_{model.__name__}")
+        signals.post_save.connect(_apply_after_save, sender=model, dispatch_uid=f"metrics_post_save_{model.__name__}")
+        signals.pre_delete.connect(
+            _capture_before_delete, sender=model, dispatch_uid=f"metrics_pre_delete_{model.__name__}"
+        )
+        signals.post_delete.connect(
+            _apply_after_delete, sender=model, dispatch_uid=f"metrics_post_delete_{model.__name__}"
+        )
+
+
+def _collect_batch_buckets(totals):
+    """
+    Batch contributions grouped and summed by the database.
+
+    Same buckets as _batch_contributions, but the batch history is
+    aggregated in SQL (CropBatchQuerySet) instead of row by row.
+    """
+    month = TruncMonth("created_at", output_field=DateField())
+    batches = CropBatch._base_manager.order_by()
+
+    farmer_buckets = (
+        batches.filter(is_child_batch=False)
+        .values("farmer_id", "status", "crop_type", bucket_month=month)
+        .annotate(batches=Count("id"), total_quantity=Sum("quantity"))
+        .with_farmer_revenue()
+    )
+    for row in farmer_buckets:
+        key = (row["farmer_id"], row["bucket_month"], FARMER_BATCHES, row["status"], row["crop_type"], "")
+        totals[key] = [row["batches"], row["total_quantity"], row["farmer_revenue"]]
+
+    owner_buckets = (
+        batches.filter(current_owner__stakeholderprofile__isnull=False)
+        .values("current_owner__stakeholderprofile", "status", "crop_type", bucket_month=month)
+        .annotate(batches=Count("id"), total_quantity=Sum("quantity"))
+        .with_distributor_margin()
+    )
+    for row in owner_buckets:
+        key = (
+            row["current_owner__stakeholderprofile"], row["bucket_month"], OWNED_BATCHES,
+            row["status"], row["crop_type"], "",
+        )
+        totals[key] = [row["batches"], row["total_quantity"], row["distributor_margin"]]
+
+
+def compute_all_metrics(profile_ids=None):
+    """
+    Contributions of every tracked row, as rebuild_metrics writes them.
+
+    Args:
+        profile_ids: Only keep buckets of these profiles (all when None)
+
+    Returns:
+        dict: bucket key -> [count, quantity, amount]
+    """
+    totals = defaultdict(lambda: [0, ZERO, ZERO])
+    for model, (fields, _) in TRACKED_MODELS.items():
+        if model is CropBatch:
+            _collect_batch_buckets(totals)
+            continue
+        rows = model._base_manager.order_by().values(*fields).iterator(chunk_size=2000)
+        collect_contributions(model, rows, totals)
+    if profile_ids is not None:
+        profile_ids = set(profile_ids)
+        return {key: value for key, value in totals.items() if key[0] in profile_ids}
+    return dict(totals)
+
+
+@dataclass
+class MetricsRow:
+    month: object
+    metric: str
+    status: str
+    dimension: str
+    role: str
+    count: int
+    quantity: Decimal
+    amount: Decimal
+
+
+class ProfileMetrics:
+    """
+    A stakeholder's metric rows, loaded with one query, with helpers to
+    total them the way the dashboards need.
+    """
+
+    def __init__(self, profile):
+        self.rows = [
+            MetricsRow(*values)
+            for values in StakeholderMetrics.objects.filter(profile=profile).values_list(
+                "month", "metric", "status", "dimension", "role", "count", "quantity", "amount"
+            )
+        ]
+
+    def select(self, metric, statuses=None, exclude_statuses=None, dimension=None, role=None, since=None):
+        """Rows of one metric, optionally filtered like a queryset would be."""
+        for row in self.rows:
+            if row.metric != metric or not row.count:
+                continue
+            if statuses is not None and row.status not in statuses:
+                continue
+            if exclude_statuses is not None and row.status in exclude_statuses:
+                continue
+            if dimension is not None and row.dimension != dimension:
+                continue
+            if role is not None and row.role != role:
+                continue
+            if since is not None and row.month < since:
+                continue
+            yield row
+
+    def count(self, metric, **filters):
+        return sum(row.count for row in self.select(metric, **filters))
+
+    def quantity(self, metric, **filters):
+        return sum((row.quantity for row in self.select(metric, **filters)), ZERO)
+
+    def amount(self, metric, **filters):
+        return sum((row.amount for row in self.select(metric, **filters)), ZERO)
+
+    def group(self, metric, by, **filters):
+        """
+        Totals of a metric per value of a row attribute ("status", "dimension", "role" or "month").
+
+        Returns:
+            dict: value -> [count, quantity, amount]
+        """
+        groups = defaultdict(lambda: [0, ZERO, ZERO])
+        for row in self.select(metric, **filters):
+            group = groups[getattr(row, by)]
+            group[0] += row.count
+            group[1] += row.quantity
+            group[2] += row.amount
+        return dict(groups)
@@ -8,7 +8,7 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from . import models
-from .event_logger import log_batch_event
+from .transitions import Transition
 from .models import BatchEventType, BatchStatus, StakeholderRole
 
 
@@ -99,23 +99,22 @@ class SuspendBatchView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Suspend the batch
-        batch.status = BatchStatus.SUSPENDED
-        batch.save()
-
         reason = request.data.get('reason', 'No reason provided')
 
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.SUSPENDED,
-            user=request.user,
-            metadata={
-                "suspended_by_role": user_role,
-                "suspended_by": request.user.username,
-                "suspend_reason": reason,
-            },
-        )
+        with Transition(request.user) as transition:
+            # Suspend the batch
+            transition.update(batch, status=BatchStatus.SUSPENDED)
+
+            # Log event
+            transition.log_event(
+                batch,
+                BatchEventType.SUSPENDED,
+                metadata={
+                    "suspended_by_role": user_role,
+                    "suspended_by": request.user.username,
+                    "suspend_reason": reason,
+                },
+            )
 
         return Response(
             {
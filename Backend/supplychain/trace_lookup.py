@@ -0,0 +1,87 @@
+"""
+Public Trace Lookup
+
+Resolves the id a consumer scanned or typed to a CropBatch without
+scanning the table:
+
+1. exact match on public_batch_id / product_batch_id (their unique indexes)
+2. case-insensitive match on UPPER(...) of either column (functional
+   indexes cropbatch_public_id_upper / cropbatch_product_id_upper)
+3. only in PREFIX mode: UPPER(product_batch_id) LIKE 'PREFIX%', served on
+   Postgres by the text_pattern_ops index cropbatch_product_id_prefix
+   (migration 0034), newest batch first
+
+    batch = resolve_trace_batch("batch-20260101-a1b2")                # exact only
+    batch = resolve_trace_batch("BATCH-20260101-A1", mode=PREFIX)     # with fallback
+
+`manage.py benchmark_trace_lookup` measures each step.
+"""
+
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+from .models import CropBatch
+
+EXACT = "exact"
+PREFIX = "prefix"
+MODES = (EXACT, PREFIX)
+
+# Shorter prefixes match most of the table ("BATCH-...")
+MIN_PREFIX_LENGTH = 8
+
+
+def normalize_trace_id(value):
+    """Form of a scanned id compared against the UPPER() indexes."""
+    return value.strip().upper()
+
+
+def exact_match(queryset, trace_id):
+    """Step 1: the batch whose id is exactly trace_id (unique indexes)."""
+    trace_id = trace_id.strip()
+    return queryset.filter(Q(public_batch_id=trace_id) | Q(product_batch_id=trace_id))
+
+
+def normalized_match(queryset, trace_id):
+    """Step 2: batches whose id equals trace_id ignoring case (UPPER() indexes)."""
+    normalized = normalize_trace_id(trace_id)
+    return (
+        queryset.alias(public_key=Upper("public_batch_id"), product_key=Upper("product_batch_id"))
+        .filter(Q(public_key=normalized) | Q(product_key=normalized))
+        .order_by("-created_at")
+    )
+
+
+def prefix_match(queryset, trace_id):
+    """Step 3: batches whose product id starts with trace_id, newest first."""
+    normalized = normalize_trace_id(trace_id)
+    if len(normalized) < MIN_PREFIX_LENGTH:
+        return queryset.none()
+    return (
+        queryset.alias(product_key=Upper("product_batch_id"))
+        .filter(product_key__startswith=normalized)
+        .order_by("-created_at")
+    )
+
+
+def resolve_trace_batch(trace_id, mode=EXACT, queryset=None):
+    """
+    Batch for a public trace id, or None.
+
+    Args:
+        trace_id: public_batch_id or product_batch_id, any case
+        mode: EXACT, or PREFIX to fall back to a product id prefix search
+        queryset: CropBatch queryset to search (e.g. with select_related)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown trace lookup mode: {mode}")
+    if queryset is None:
+        queryset = CropBatch.objects.all()
+
+    steps = [exact_match, normalized_match]
+    if mode == PREFIX:
+        steps.append(prefix_match)
+    for step in steps:
+        batch = step(queryset, trace_id).first()
+        if batch is not None:
+            return batch
+    return None
@@ -0,0 +1,243 @@
+"""
+Public Trace Snapshots
+
+The document BatchTraceView returns for a LISTED or SOLD batch is
+rendered once into a TraceSnapshot row instead of being reassembled on
+every consumer scan:
+
+- log_batch_event() re-renders it after each event on a listed batch
+  (the LISTED event renders the first one), once the event commits
+- a batch edit re-renders it the same way, and so does saving or
+  deleting its retail listing (prices, retailer)
+- saving a stakeholder profile or user drops the snapshots of the batches
+  that name them (username, organization, address), once the save
+  commits; the next scan renders those again
+- a scan that finds no snapshot (batches listed before snapshots
+  existed, or a failed render) renders it on the spot
+
+The snapshot's ETag is the SHA-256 of the canonical JSON, so identical
+documents get identical validators on every server. Responses carry
+`Cache-Control: public` with TRACE_SNAPSHOT["MAX_AGE"] for browsers and
+["SHARED_MAX_AGE"] for CDNs and reverse proxies; after that they
+revalidate with If-None-Match and get a 304 while nothing changed.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, signals
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import models
+from .file_serving import file_representation
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_SNAPSHOT_SETTINGS = {
+    "MAX_AGE": 60,
+    "SHARED_MAX_AGE": 300,
+}
+
+# Statuses whose trace is public
+TRACEABLE_STATUSES = (models.BatchStatus.LISTED, models.BatchStatus.SOLD)
+
+
+def get_trace_snapshot_settings():
+    """Return the TRACE_SNAPSHOT settings merged over the defaults."""
+    config = dict(DEFAULT_TRACE_SNAPSHOT_SETTINGS)
+    config.update(getattr(settings, "TRACE_SNAPSHOT", {}))
+    return config
+
+
+def build_trace_document(batch):
+    """
+    Public supply chain journey of a batch, without the QR code URL
+    (signed per request, see BatchTraceView).
+    """
+    # Fetch Listing for price breakdown and retailer info
+    listing = models.RetailListing.objects.select_related(
+        'retailer__user'
+    ).filter(batch=batch).last()
+    
+    # Calculate parent batch quantity if split
+    parent_qty = batch.quantity
+    if batch.is_child_batch and batch.parent_batch:
+        parent_qty = batch.parent_batch.quantity
+
+    # Fetch Timeline from BatchEvents
+    # Sorted oldest to newest
+    events = models.BatchEvent.objects.select_related('performed_by').filter(batch=batch).order_by('timestamp')
+    timeline = []
+    for event in events:
+        timeline.append({
+            "stage": event.get_event_type_display(),
+            "actor": event.performed_by.username if event.performed_by else "System",
+            "timestamp": event.timestamp.isoformat()
+        })
+
+    # Fetch stakeholder info from TransportRequests
+    transport_requests = models.TransportRequest.objects.select_related(
+        'transporter__user',
+        'to_party__user',
+        'from_party__user',
+    ).filter(batch=batch).order_by('created_at')
+
+    # First transport request (farmer → distributor leg)
+    transporter_data = None
+    distributor_data = None
+    for tr in transport_requests:
+        if tr.transporter and transporter_data is None:
+            transporter_data = {
+                "name": tr.transporter.user.username,
+                "company_name": tr.transporter.organization or tr.transporter.user.username,
+                "pickup_date": tr.pickup_at.isoformat() if tr.pickup_at else None,
+                "delivery_date": tr.delivered_at.isoformat() if tr.delivered_at else None,
+                "vehicle_details": tr.vehicle_details or None,
+            }
+        # The distributor is the to_party of the first transport request to a distributor
+        if tr.to_party and tr.to_party.role == 'distributor' and distributor_data is None:
+            distributor_data = {
+                "name": tr.to_party.user.username,
+                "company_name": tr.to_party.organization or tr.to_party.user.username,
+                "location": tr.to_party.address or None,
+            }
+
+    # Retailer info from listing
+    retailer_data = None
+    if listing and listing.retailer:
+        retailer_data = {
+            "name": listing.retailer.user.username,
+            "shop_name": listing.retailer.organization or listing.retailer.user.username,
+            "location": listing.retailer.address or None,
+            "listed_date": listing.created_at.isoformat() if listing.created_at else None,
+        }
+    
+    # Build response according to SPEC
+    return {
+        "product_name": batch.crop_type,
+        "batch_id": batch.product_batch_id,
+        "quantity": f"{batch.quantity} kg",
+        "retail_price": listing.total_price if listing else 0,
+        "status": batch.get_status_display(),
+        "origin": {
+            "farmer_name": batch.farmer.user.username,
+            "farm_location": batch.farm_location,
+            "harvest_date": batch.harvest_date.isoformat(),
+            "parent_batch_quantity": f"{parent_qty} kg"
+        },
+        "transporter": transporter_data,
+        "distributor": distributor_data,
+        "retailer": retailer_data,
+        "price_breakdown": {
+            "farmer_price": float(listing.farmer_base_price) if listing else 0,
+            "transport_cost": float(listing.transport_fees) if listing else 0,
+            "distributor_margin": float(listing.distributor_margin) if listing else 0,
+            "retailer_margin": float(listing.retailer_margin) if listing else 0,
+            "total_price": float(listing.total_price) if listing else 0
+        },
+        "timeline": timeline,
+    }
+
+
+def canonical_json(document):
+    """The JSON the ETag is computed over (DRF encoding, sorted keys)."""
+    return json.dumps(document, cls=JSONEncoder, sort_keys=True, separators=(",", ":"))
+
+
+def render_trace_snapshot(batch):
+    """
+    Render and store the trace document of a batch.
+
+    Returns:
+        TraceSnapshot | None: None if the batch's trace is not public
+    """
+    batch = models.CropBatch.objects.select_related("farmer__user", "parent_batch").get(pk=batch.pk)
+    if batch.status not in TRACEABLE_STATUSES:
+        return None
+
+    encoded = canonical_json(build_trace_document(batch))
+    snapshot, _ = models.TraceSnapshot.objects.update_or_create(
+        batch=batch,
+        defaults={
+            "document": json.loads(encoded),
+            "etag": hashlib.sha256(encoded.encode()).hexdigest(),
+            "has_qr_code": file_representation(batch, "qr_code_image") is not None,
+        },
+    )
+    return snapshot
+
+
+def get_trace_snapshot(batch):
+    """The stored snapshot of a batch, rendering it if there is none yet."""
+    try:
+        return batch.trace_snapshot
+    except models.TraceSnapshot.DoesNotExist:
+        return render_trace_snapshot(batch)
+
+
+def refresh_trace_snapshot(batch):
+    """Re-render the snapshot of a listed batch once the current transaction commits."""
+    if batch.status not in TRACEABLE_STATUSES:
+        return
+
+    def render():
+        try:
+            render_trace_snapshot(batch)
+        except Exception as e:
+            # Drop the stale document; the next scan renders it again
+            logger.error(f"Failed to render trace snapshot for batch {batch.pk}: {e}")
+            models.TraceSnapshot.objects.filter(batch_id=batch.pk).delete()
+
+    transaction.on_commit(render)
+
+
+# Profile fields that appear in the trace document
+PROFILE_TRACE_FIELDS = {"organization", "address", "user", "user_id"}
+
+
+def _refresh_listing_batch(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_trace_snapshot(instance.batch)
+
+
+def _drop_snapshots_naming(profile_lookup, value):
+    """Delete, after commit, the snapshots of batches a stakeholder appears in."""
+    mentions = Q()
+    for path in ("batch__farmer", "batch__transport_requests__transporter",
+                 "batch__transport_requests__to_party", "batch__retail_listings__retailer"):
+        mentions |= Q(**{f"{path}__{profile_lookup}": value})
+    transaction.on_commit(lambda: models.TraceSnapshot.objects.filter(mentions).delete())
+
+
+def _drop_profile_snapshots(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw or created or (update_fields is not None and not PROFILE_TRACE_FIELDS & set(update_fields)):
+        return
+    _drop_snapshots_naming("pk", instance.pk)
+
+
+def _drop_user_snapshots(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # Logins save last_login only
+    if raw or created or (update_fields is not None and "username" not in update_fields):
+        return
+    _drop_snapshots_naming("user_id", instance.pk)
+
+
+def connect_signals():
+    """Keep snapshots current when listings, profiles or users they show change."""
+    signals.post_save.connect(
+        _refresh_listing_batch, sender=models.RetailListing, dispatch_uid="trace_snapshot_listing_save"
+    )
+    signals.post_delete.connect(
+        _refresh_listing_batch, sender=models.RetailListing, dispatch_uid="trace_snapshot_listing_delete"
+    )
+    signals.post_save.connect(
+        _drop_profile_snapshots, sender=models.StakeholderProfile, dispatch_uid="trace_snapshot_profile_save"
+    )
+    signals.post_save.connect(
+        _drop_user_snapshots, sender=get_user_model(), dispatch_uid="trace_snapshot_user_save"
+    )
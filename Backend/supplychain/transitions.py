@@ -0,0 +1,142 @@
+"""
+Lifecycle Transitions
+
+A unit of work for one batch lifecycle transition (deliver, store, sell,
+suspend, split, ...). Views record what changes instead of saving as
+they go, and everything is written when the block exits, inside one
+transaction:
+
+    with Transition(request.user) as transition:
+        transition.update(transport_request, status='DELIVERED', delivered_at=timezone.now())
+        transition.update(batch, status=next_status, current_owner=receiver)
+        transition.log_event(batch, BatchEventType.DELIVERED_TO_DISTRIBUTOR)
+        transition.add(models.Payment(...))
+
+- update() sets the attributes right away and saves each row once at
+  the end with only the changed columns (`save(update_fields=...)`), so
+  the deferred file columns and fields other code updated in SQL are
+  not rewritten
+- add() queues new rows; they are written with one bulk_create per model,
+  models in the order they were first added (add a parent row before the
+  rows pointing at it). Rollup metrics, blob refcounts and dashboard
+  caches are updated as a save would; save() itself is not called
+- log_event() queues batch events; they go through log_batch_events(),
+  one INSERT for the events and one for their anchoring outbox rows.
+  With defer_anchoring=True critical events always go to the outbox
+
+Rows are written in that order: updates, new rows, events. An exception
+inside the block rolls everything back and nothing is written.
+"""
+
+from django.db import transaction
+
+from .blob_store import batched_blob_references
+from .event_logger import log_batch_events, ownership_transfer_metadata
+from .models import Payment
+from .response_cache import invalidate_stakeholders
+from .stakeholder_metrics import TRACKED_MODELS, track_metrics
+
+
+def _invalidate_payment_parties(payments):
+    invalidate_stakeholders({profile_id for p in payments for profile_id in (p.payer_id, p.payee_id)})
+
+
+# Side effects a save would trigger through signals, for bulk-created rows
+AFTER_BULK_CREATE = {
+    Payment: _invalidate_payment_parties,
+}
+
+
+class Transition:
+    """Collects the writes of one transition and flushes them together."""
+
+    def __init__(self, user=None, defer_anchoring=False):
+        self.user = user
+        self.defer_anchoring = defer_anchoring
+        self._updates = {}
+        self._new_rows = []
+        self._events = []
+        self._atomic = None
+
+    def __enter__(self):
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+        except BaseException as error:
+            self._atomic.__exit__(type(error), error, error.__traceback__)
+            raise
+        return self._atomic.__exit__(exc_type, exc, traceback)
+
+    def update(self, instance, **changes):
+        """Change fields of an existing row; saved once, with update_fields, on flush."""
+        for name, value in changes.items():
+            setattr(instance, name, value)
+        key = (type(instance), instance.pk)
+        if key in self._updates:
+            saved_instance, fields = self._updates[key]
+            if saved_instance is not instance:
+                # Another copy of the same row: carry the values over
+                for name, value in changes.items():
+                    setattr(saved_instance, name, value)
+            fields.update(changes)
+        else:
+            self._updates[key] = (instance, set(changes))
+        return instance
+
+    def add(self, instance):
+        """Queue a new row for bulk creation on flush."""
+        self._new_rows.append(instance)
+        return instance
+
+    def log_event(self, batch, event_type, metadata=None, anchor_to_blockchain=True):
+        """Queue a batch event (see log_batch_event)."""
+        self._events.append((batch, event_type, metadata, anchor_to_blockchain))
+
+    def log_ownership_transfer(self, batch, from_user, to_user, event_type, reason=None):
+        """Queue an ownership transfer event (see log_ownership_transfer)."""
+        self.log_event(batch, event_type, ownership_transfer_metadata(from_user, to_user, reason))
+
+    def flush(self):
+        """Write everything collected so far."""
+        with transaction.atomic(savepoint=False):
+            for instance, fields in self._updates.values():
+                auto_now = [
+                    field.name for field in instance._meta.concrete_fields if getattr(field, "auto_now", False)
+                ]
+                instance.save(update_fields=sorted(fields | set(auto_now)))
+
+            by_model = {}
+            for instance in self._new_rows:
+                by_model.setdefault(type(instance), []).append(instance)
+            for model, instances in by_model.items():
+                self._bulk_create(model, instances)
+
+            for anchor in (True, False):
+                entries = [
+                    (batch, event_type, metadata)
+                    for batch, event_type, metadata, anchor_to_blockchain in self._events
+                    if bool(anchor_to_blockchain) == anchor
+                ]
+                if entries:
+                    log_batch_events(
+                        entries, self.user, anchor_to_blockchain=anchor, defer_anchoring=self.defer_anchoring
+                    )
+
+        self._updates, self._new_rows, self._events = {}, [], []
+
+    def _bulk_create(self, model, instances):
+        with batched_blob_references():
+            if model in TRACKED_MODELS:
+                pks = []
+                with track_metrics(model, pks):
+                    model.objects.bulk_create(instances)
+                    pks.extend(instance.pk for instance in instances)
+            else:
+                model.objects.bulk_create(instances)
+        if model in AFTER_BULK_CREATE:
+            AFTER_BULK_CREATE[model](instances)
@@ -0,0 +1,50 @@
+"""
+Cumulative Transport Fees
+
+A batch's transport cost per unit is the sum of the DELIVERED transporter
+fees of the batch and every ancestor it was split from. It is kept on
+CropBatch.cumulative_transport_fee_per_unit so serializers and listings
+read one column instead of walking the parent chain with a query per level:
+
+- a delivery adds its fee to the batch and all of its split descendants
+- a split child starts from its parent's value
+"""
+
+from django.db.models import F
+
+from .models import CropBatch
+
+
+def descendant_ids(batch):
+    """Ids of every batch split (directly or transitively) from `batch`, one query per generation."""
+    ids = []
+    generation = [batch.pk]
+    while generation:
+        generation = list(
+            CropBatch.objects.filter(parent_batch_id__in=generation).values_list('pk', flat=True)
+        )
+        ids.extend(generation)
+    return ids
+
+
+def record_delivered_transport_fee(transport_request):
+    """
+    Add a DELIVERED request's fee to its batch lineage.
+
+    Call after the batch itself has been saved: the column is updated in
+    SQL and the in-memory batch is brought in line with it.
+    """
+    fee = transport_request.transporter_fee_per_unit
+    if not fee:
+        return
+
+    batch = transport_request.batch
+    CropBatch.objects.filter(pk__in=[batch.pk] + descendant_ids(batch)).update(
+        cumulative_transport_fee_per_unit=F('cumulative_transport_fee_per_unit') + fee
+    )
+    batch.cumulative_transport_fee_per_unit += fee
+
+
+def inherited_transport_fee(parent_batch):
+    """Model kwargs for a child batch split from `parent_batch`."""
+    return {"cumulative_transport_fee_per_unit": parent_batch.cumulative_transport_fee_per_unit}
@@ -7,9 +7,10 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from . import models, serializers
 from .batch_validators import BatchStatusTransitionValidator
-from .event_logger import log_batch_event, log_ownership_transfer
 from .models import BatchEventType, BatchStatus
 from .payment_views import create_payment_records_on_delivery
+from .transitions import Transition
+from .transport_fees import record_delivered_transport_fee
 from .view_utils import check_batch_locked
 
 
@@ -77,29 +78,28 @@ class TransportRequestCreateView(APIView):
             role=models.StakeholderRole.DISTRIBUTOR
         )
         
-        # Create transport request
-        transport_request = models.TransportRequest.objects.create(
-            batch=batch,
-            requested_by=user_profile,
-            from_party=user_profile,
-            to_party=distributor,
-            status='PENDING'
-        )
-        
-        # Update batch status
-        batch.status = models.BatchStatus.TRANSPORT_REQUESTED
-        batch.save()
-        
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.TRANSPORT_REQUESTED,
-            user=request.user,
-            metadata={
-                'distributor': distributor.user.username,
-                'transport_request_id': transport_request.id,
-            }
-        )
+        with Transition(request.user) as transition:
+            # Create transport request (its id goes into the event metadata)
+            transport_request = models.TransportRequest.objects.create(
+                batch=batch,
+                requested_by=user_profile,
+                from_party=user_profile,
+                to_party=distributor,
+                status='PENDING'
+            )
+            
+            # Update batch status
+            transition.update(batch, status=models.BatchStatus.TRANSPORT_REQUESTED)
+            
+            # Log event
+            transition.log_event(
+                batch,
+                BatchEventType.TRANSPORT_REQUESTED,
+                metadata={
+                    'distributor': distributor.user.username,
+                    'transport_request_id': transport_request.id,
+                }
+            )
         
         return Response({
             "success": True,
@@ -172,27 +172,29 @@ class TransportAcceptView(APIView):
         print(f"DEBUG: TransportAcceptView request.data={request.data}")
         fee = request.data.get('transporter_fee_per_unit', 0)
         try:
-            transport_request.transporter_fee_per_unit = float(fee)
+            fee = float(fee)
         except (ValueError, TypeError):
-            transport_request.transporter_fee_per_unit = 0
+            fee = 0
             
-        transport_request.transporter = user_profile
-        transport_request.status = 'ACCEPTED'
-        transport_request.save()
-        
-        # Update batch status based on destination
-        batch.status = next_status
-        batch.save()
-        
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=BatchEventType.TRANSPORT_ACCEPTED,
-            user=request.user,
-            metadata={
-                'transport_request_id': transport_request.id,
-            }
-        )
+        with Transition(request.user) as transition:
+            transition.update(
+                transport_request,
+                transporter_fee_per_unit=fee,
+                transporter=user_profile,
+                status='ACCEPTED',
+            )
+            
+            # Update batch status based on destination
+            transition.update(batch, status=next_status)
+            
+            # Log event
+            transition.log_event(
+                batch,
+                BatchEventType.TRANSPORT_ACCEPTED,
+                metadata={
+                    'transport_request_id': transport_request.id,
+                }
+            )
         
         return Response({
             "success": True,
@@ -261,29 +263,26 @@ class TransportDeliverView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update transport request
-        transport_request.status = 'DELIVERED'
-        transport_request.delivered_at = timezone.now()
-        transport_request.save()
-        
-        # Update batch status and owner
-        batch.status = next_status
-        batch.current_owner = transport_request.to_party.user
-        batch.save()
-        
-        # Log event
-        from .event_logger import log_ownership_transfer
-        log_ownership_transfer(
-            batch=batch,
-            from_user=transport_request.from_party.user,
-            to_user=transport_request.to_party.user,
-            event_type=event_type,
-            user_performing_action=request.user,
-            reason=f"Delivery to {to_party_role} confirmed by transporter after receiver arrival confirmation"
-        )
-        
-        # Create payment records for this delivery
-        create_payment_records_on_delivery(batch, transport_request)
+        with Transition(request.user) as transition:
+            # Update transport request
+            transition.update(transport_request, status='DELIVERED', delivered_at=timezone.now())
+            
+            # Update batch status and owner
+            transition.update(batch, status=next_status, current_owner=transport_request.to_party.user)
+            # Updated in SQL; the batch save above leaves the column alone
+            record_delivered_transport_fee(transport_request)
+            
+            # Log event
+            transition.log_ownership_transfer(
+                batch,
+                from_user=transport_request.from_party.user,
+                to_user=transport_request.to_party.user,
+                event_type=event_type,
+                reason=f"Delivery to {to_party_role} confirmed by transporter after receiver arrival confirmation"
+            )
+            
+            # Create payment records for this delivery
+            create_payment_records_on_delivery(transition, batch, transport_request)
         
         return Response({
             "success": True,
@@ -333,13 +332,10 @@ class TransportArriveView(APIView):
             return Response({"success": False, "message": err}, status=status.HTTP_400_BAD_REQUEST)
             
         # Update
-        transport_request.status = 'ARRIVED'
-        transport_request.save()
-        
-        batch.status = next_status
-        batch.save()
-        
-        log_batch_event(batch=batch, event_type=event_type, user=request.user)
+        with Transition(request.user) as transition:
+            transition.update(transport_request, status='ARRIVED')
+            transition.update(batch, status=next_status)
+            transition.log_event(batch, event_type)
         
         return Response({
             "success": True, 
@@ -388,13 +384,10 @@ class TransportConfirmArrivalView(APIView):
             return Response({"success": False, "message": err}, status=status.HTTP_400_BAD_REQUEST)
             
         # Update
-        transport_request.status = 'ARRIVAL_CONFIRMED'
-        transport_request.save()
-        
-        batch.status = next_status
-        batch.save()
-        
-        log_batch_event(batch=batch, event_type=event_type, user=request.user)
+        with Transition(request.user) as transition:
+            transition.update(transport_request, status='ARRIVAL_CONFIRMED')
+            transition.update(batch, status=next_status)
+            transition.log_event(batch, event_type)
         
         return Response({
             "success": True, 
@@ -433,27 +426,24 @@ class TransportRejectView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        # Update transport request
-        transport_request.status = 'REJECTED'
-        transport_request.save()
-        
-        # Reset batch status based on where it came from
-        if batch.status == models.BatchStatus.TRANSPORT_REQUESTED:
-            batch.status = models.BatchStatus.CREATED
-        elif batch.status == models.BatchStatus.TRANSPORT_REQUESTED_TO_RETAILER:
-            batch.status = models.BatchStatus.STORED_BY_DISTRIBUTOR
-        
-        batch.save()
-        
-        # Log event
-        log_batch_event(
-            batch=batch,
-            event_type=models.BatchEventType.TRANSPORT_REJECTED,
-            user=request.user,
-            metadata={
-                'transport_request_id': transport_request.id,
-            }
-        )
+        with Transition(request.user) as transition:
+            # Update transport request
+            transition.update(transport_request, status='REJECTED')
+            
+            # Reset batch status based on where it came from
+            if batch.status == models.BatchStatus.TRANSPORT_REQUESTED:
+                transition.update(batch, status=models.BatchStatus.CREATED)
+            elif batch.status == models.BatchStatus.TRANSPORT_REQUESTED_TO_RETAILER:
+                transition.update(batch, status=models.BatchStatus.STORED_BY_DISTRIBUTOR)
+            
+            # Log event
+            transition.log_event(
+                batch,
+                models.BatchEventType.TRANSPORT_REJECTED,
+                metadata={
+                    'transport_request_id': transport_request.id,
+                }
+            )
         
         return Response({
             "success": True,
@@ -2,14 +2,17 @@
 Transporter Dashboard Views
 Provides analytics and metrics specific to the logged-in transporter.
 """
-from django.db.models import Count, Sum, Q
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
 from . import models
-from .models import StakeholderRole, TransportRequest
+from .models import StakeholderRole
+from .payment_analytics import get_payment_summary
+from .response_cache import cache_response
+from .stakeholder_metrics import ASSIGNED_TRANSPORTS, ProfileMetrics
 
 
 class TransporterDashboardView(APIView):
@@ -21,6 +24,7 @@ class TransporterDashboardView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cache_response("transporter_dashboard")
     def get(self, request):
         # Verify user is a transporter
         try:
@@ -36,37 +40,29 @@ class TransporterDashboardView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get all transport requests assigned to this transporter
-        transporter_requests = TransportRequest.objects.filter(transporter=profile)
+        # Totals come from the StakeholderMetrics rollup (one query);
+        # ASSIGNED_TRANSPORTS are keyed by the sender's role
+        metrics = ProfileMetrics(profile)
 
         # --- METRICS SECTION ---
         # Count by requester role (farmer vs distributor)
-        farmer_shipments = transporter_requests.filter(
-            from_party__role=StakeholderRole.FARMER
-        ).count()
+        farmer_shipments = metrics.count(ASSIGNED_TRANSPORTS, role=StakeholderRole.FARMER)
 
-        distributor_shipments = transporter_requests.filter(
-            from_party__role=StakeholderRole.DISTRIBUTOR
-        ).count()
+        distributor_shipments = metrics.count(ASSIGNED_TRANSPORTS, role=StakeholderRole.DISTRIBUTOR)
 
         # In Transit: Accepted or any transit-related status
         in_transit_statuses = ['ACCEPTED', 'IN_TRANSIT', 'IN_TRANSIT_TO_RETAILER', 'ARRIVED', 'ARRIVAL_CONFIRMED']
-        in_transit = transporter_requests.filter(
-            status__in=in_transit_statuses
-        ).count()
+        in_transit = metrics.count(ASSIGNED_TRANSPORTS, statuses=in_transit_statuses)
 
         # Completed: Delivered status
-        completed = transporter_requests.filter(status='DELIVERED').count()
+        completed = metrics.count(ASSIGNED_TRANSPORTS, statuses=['DELIVERED'])
 
         # Total Earnings: Sum of transporter_fee_per_unit for delivered shipments
-        total_earnings_result = transporter_requests.filter(
-            status='DELIVERED'
-        ).aggregate(total=Sum('transporter_fee_per_unit'))
-        total_earnings = float(total_earnings_result['total'] or 0)
+        total_earnings = float(metrics.amount(ASSIGNED_TRANSPORTS, statuses=['DELIVERED']))
 
         # --- STATUS DISTRIBUTION (for Doughnut Chart) ---
         # Aggregate counts by status
-        status_counts = transporter_requests.values('status').annotate(count=Count('id'))
+        status_counts = metrics.group(ASSIGNED_TRANSPORTS, by='status')
         
         # Initialize with 0 for all relevant statuses
         status_distribution = {
@@ -77,9 +73,7 @@ class TransporterDashboardView(APIView):
             'Completed': 0,  # Maps to DELIVERED for chart purposes
         }
 
-        for item in status_counts:
-            s = item['status']
-            count = item['count']
+        for s, (count, _, _) in status_counts.items():
             if s == 'ACCEPTED':
                 status_distribution['Accepted'] += count
             elif s in ['IN_TRANSIT', 'IN_TRANSIT_TO_RETAILER']:
@@ -94,22 +88,18 @@ class TransporterDashboardView(APIView):
                 status_distribution['Completed'] += count
 
         # Total deliveries for center of doughnut
-        total_deliveries = transporter_requests.count()
+        total_deliveries = metrics.count(ASSIGNED_TRANSPORTS)
 
         # --- EARNINGS OVERVIEW (for Bar Chart) ---
         # Earnings from farmer shipments
-        farmer_earnings_result = transporter_requests.filter(
-            status='DELIVERED',
-            from_party__role=StakeholderRole.FARMER
-        ).aggregate(total=Sum('transporter_fee_per_unit'))
-        farmer_earnings = float(farmer_earnings_result['total'] or 0)
+        farmer_earnings = float(metrics.amount(
+            ASSIGNED_TRANSPORTS, statuses=['DELIVERED'], role=StakeholderRole.FARMER
+        ))
 
         # Earnings from distributor shipments
-        distributor_earnings_result = transporter_requests.filter(
-            status='DELIVERED',
-            from_party__role=StakeholderRole.DISTRIBUTOR
-        ).aggregate(total=Sum('transporter_fee_per_unit'))
-        distributor_earnings = float(distributor_earnings_result['total'] or 0)
+        distributor_earnings = float(metrics.amount(
+            ASSIGNED_TRANSPORTS, statuses=['DELIVERED'], role=StakeholderRole.DISTRIBUTOR
+        ))
 
         earnings_overview = {
             'farmer_earnings': farmer_earnings,
@@ -118,35 +108,19 @@ class TransporterDashboardView(APIView):
         }
 
         # --- MONTHLY ACTIVITY TREND (Optional Line Chart Data) ---
-        from django.db.models.functions import TruncMonth
-        from django.utils import timezone
-        
         # Get monthly shipment counts for the last 12 months
-        twelve_months_ago = timezone.now() - timezone.timedelta(days=365)
-        monthly_activity = transporter_requests.filter(
-            created_at__gte=twelve_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
+        twelve_months_ago = (timezone.now() - timezone.timedelta(days=365)).date().replace(day=1)
+        monthly_activity = metrics.group(ASSIGNED_TRANSPORTS, by='month', since=twelve_months_ago)
 
         monthly_trend = {}
-        for item in monthly_activity:
-            if item['month']:
-                month_key = item['month'].strftime('%b %Y')
-                monthly_trend[month_key] = item['count']
+        for month, (count, _, _) in sorted(monthly_activity.items()):
+            month_key = month.strftime('%b %Y')
+            monthly_trend[month_key] = count
 
         # --- PAYMENT-DERIVED FINANCIAL METRICS ---
-        from .models import Payment, PaymentStatus as PS
-        
-        payment_earnings = Payment.objects.filter(
-            payee=profile, status=PS.SETTLED
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        payment_pending_count = Payment.objects.filter(
-            payee=profile
-        ).exclude(status=PS.SETTLED).count()
+        payments = get_payment_summary(profile)
+        payment_earnings = payments.received_settled
+        payment_pending_count = payments.received_unsettled_count
 
         # Build response
         response_data = {
@@ -46,6 +46,6 @@ def generate_batch_qr(batch):
     # Update Model Field
     batch.qr_code_image = qr_file
     batch.qr_code_data = qr_url  # Storing the URL as well for convenience
-    batch.save(update_fields=['qr_code_image', 'qr_code_data'])
+    batch.save(update_fields=['qr_code_image', 'qr_code_image_meta', 'qr_code_data'])
     
     return batch.qr_code_image.url
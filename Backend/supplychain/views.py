@@ -6,6 +6,11 @@ from rest_framework.exceptions import ValidationError
 
 from . import models, serializers
 from .event_logger import log_batch_event
+from .db_file_fields import copy_file_fields
+from .file_serving import file_representation
+from .fieldsets import SparseFieldsetMixin
+from .query_planner import QueryPlannerMixin
+from .transport_fees import inherited_transport_fee
 from .models import BatchEventType, BatchStatus
 from .view_utils import raise_if_locked
 
@@ -20,21 +25,24 @@ class UserViewSet(viewsets.ModelViewSet):
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 
-class StakeholderProfileViewSet(viewsets.ModelViewSet):
+class StakeholderProfileViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     queryset = models.StakeholderProfile.objects.select_related("user").all()
     serializer_class = serializers.StakeholderProfileSerializer
+    query_budget = 2
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['organization', 'user__username']
     filterset_fields = ['role', 'kyc_status']
 
 
-class KYCRecordViewSet(viewsets.ModelViewSet):
+class KYCRecordViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     queryset = models.KYCRecord.objects.select_related("profile", "verified_by").all()
     serializer_class = serializers.KYCRecordSerializer
+    query_budget = 2
 
 
-class CropBatchViewSet(viewsets.ModelViewSet):
+class CropBatchViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     serializer_class = serializers.CropBatchSerializer
+    query_budget = 3
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -83,8 +91,9 @@ class CropBatchViewSet(viewsets.ModelViewSet):
             raise e
 
 
-class TransportRequestViewSet(viewsets.ModelViewSet):
+class TransportRequestViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     serializer_class = serializers.TransportRequestSerializer
+    query_budget = 3
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -234,11 +243,12 @@ class FarmerViewSet(viewsets.ViewSet):
             )
 
 
-class InspectionReportViewSet(viewsets.ModelViewSet):
+class InspectionReportViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     queryset = models.InspectionReport.objects.select_related(
         "batch", "created_by", "distributor"
     ).all()
     serializer_class = serializers.InspectionReportSerializer
+    query_budget = 3
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'post', 'head', 'options']  # Disable PUT, PATCH, DELETE
 
@@ -414,7 +424,7 @@ class InspectionReportViewSet(viewsets.ModelViewSet):
                 "inspection_notes": inspection.inspection_notes,
                 "created_by": inspection.created_by.username if inspection.created_by else None,
                 "created_at": inspection.created_at.isoformat(),
-                "report_file": inspection.report_file.url if inspection.report_file else None,
+                "report_file": file_representation(inspection, "report_file", request),
             })
 
         return Response(data)
@@ -444,6 +454,8 @@ class BatchSplitViewSet(viewsets.ModelViewSet):
         # Create child crop batch
         import uuid
         child_batch = models.CropBatch.objects.create(
+            **copy_file_fields(parent_batch, models.CropBatch.SHARED_DOCUMENT_FIELDS),
+            **inherited_transport_fee(parent_batch),
             product_batch_id=f"BATCH-{uuid.uuid4().hex[:8].upper()}",
             crop_type=parent_batch.crop_type,
             quantity=quantity,
@@ -462,9 +474,10 @@ class BatchSplitViewSet(viewsets.ModelViewSet):
         serializer.save(child_batch=child_batch)
 
 
-class RetailListingViewSet(viewsets.ModelViewSet):
+class RetailListingViewSet(SparseFieldsetMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     queryset = models.RetailListing.objects.select_related("batch", "retailer").all()
     serializer_class = serializers.RetailListingSerializer
+    query_budget = 3
     permission_classes = [IsAuthenticated]
     def perform_create(self, serializer):
         # Get the retailer's profile from the current user
@@ -492,19 +505,7 @@ class RetailListingViewSet(viewsets.ModelViewSet):
             distributor_margin = batch.distributor_margin_per_unit
             
             # 3. Transport Fees (Cumulative over batch lineage)
-            transport_fees = 0
-            current_lookup_batch = batch
-            while current_lookup_batch:
-                # Get all completed transport requests for this batch
-                batch_transports = models.TransportRequest.objects.filter(
-                    batch=current_lookup_batch,
-                    status='DELIVERED'
-                )
-                for tr in batch_transports:
-                    transport_fees += tr.transporter_fee_per_unit
-                
-                # If this is a child batch, traverse to parent to catch earlier transport legs
-                current_lookup_batch = current_lookup_batch.parent_batch
+            transport_fees = batch.cumulative_transport_fee_per_unit
             
             # 4. Retailer Margin
             # retailer_margin is handled via serializer data
@@ -19,6 +19,9 @@ contract HashAnchor is AccessControl {
     // batchId => append-only proof records
     mapping(bytes32 => AnchorRecord[]) private _batchAnchors;
 
+    // Merkle root => block timestamp it was anchored at (0 if never)
+    mapping(bytes32 => uint64) private _rootAnchoredAt;
+
     event HashAnchored(
         bytes32 indexed batchId,
         bytes32 indexed snapshotHash,
@@ -28,6 +31,13 @@ contract HashAnchor is AccessControl {
         string context
     );
 
+    event RootAnchored(
+        bytes32 indexed root,
+        uint256 leafCount,
+        uint64 anchoredAt,
+        address anchoredBy
+    );
+
     constructor(address admin, address initialAnchorer) {
         require(admin != address(0), "HashAnchor: admin is zero address");
         require(initialAnchorer != address(0), "HashAnchor: anchorer is zero address");
@@ -71,6 +81,26 @@ contract HashAnchor is AccessControl {
         );
     }
 
+    /// @notice Stores a Merkle root covering many event snapshot hashes in one transaction.
+    /// @dev Cheaper than anchorHash for batching: one storage slot, no context string.
+    ///      Inclusion proofs for the individual hashes are kept off-chain.
+    /// @param root Merkle root of the batched snapshot hashes.
+    /// @param leafCount Number of snapshot hashes under the root.
+    function anchorRoot(bytes32 root, uint256 leafCount) external onlyRole(ANCHORER_ROLE) {
+        require(root != bytes32(0), "HashAnchor: root is zero");
+        require(leafCount > 0, "HashAnchor: empty root");
+        require(_rootAnchoredAt[root] == 0, "HashAnchor: root already anchored");
+
+        _rootAnchoredAt[root] = uint64(block.timestamp);
+
+        emit RootAnchored(root, leafCount, uint64(block.timestamp), msg.sender);
+    }
+
+    /// @notice Returns when a Merkle root was anchored (0 if it never was).
+    function getRootAnchoredAt(bytes32 root) external view returns (uint64) {
+        return _rootAnchoredAt[root];
+    }
+
     /// @notice Returns the number of hash proofs stored for a batch.
     function getAnchorCount(bytes32 batchId) external view returns (uint256) {
         return _batchAnchors[batchId].length;